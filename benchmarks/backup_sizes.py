@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure the online backup duration vs DB size, on synthetic schools of growing size,
+with the restarts caused by a concurrent writer, the longest it had to wait
+while the backup ran, and the duration of restoring the snapshot.
+"""
+
+import argparse
+from pathlib import Path
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from scripts.data.generate_school import generate_school, write_sqlite
+from src.backup import backup_db, restore_snapshot
+
+SCALES = [(30, 200), (300, 2000), (1000, 8000)]
+
+
+def writer(db_file, stop, waits, pause):
+    """Insert and delete a row every pause seconds until stop is set, timing each write"""
+    conn = sqlite3.connect(db_file, timeout=30)
+    try:
+        while not stop.is_set():
+            start = time.perf_counter()
+            with conn:
+                conn.execute("INSERT INTO constantes (name, value) VALUES ('bench', 0)")
+                conn.execute("DELETE FROM constantes WHERE name = 'bench'")
+            waits.append(time.perf_counter() - start)
+            stop.wait(pause)
+    finally:
+        conn.close()
+
+
+def measure_backup(db_file, snapshot, args):
+    """(backup seconds, restarts, longest concurrent write seconds, restore seconds)"""
+    stop = threading.Event()
+    waits = []
+    thread = threading.Thread(target=writer, args=(db_file, stop, waits, args.write_pause))
+    thread.start()
+    start = time.perf_counter()
+    restarts = backup_db(db_file, snapshot, args.pages, args.sleep, args.max_restarts)
+    backup_seconds = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    start = time.perf_counter()
+    restore_snapshot(snapshot, db_file)
+    return backup_seconds, restarts, max(waits, default=0), time.perf_counter() - start
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Measure the backup duration vs DB size.')
+    parser.add_argument('--pages', type=int, default=256, help='pages copied per backup step')
+    parser.add_argument('--sleep', type=float, default=0.005, help='seconds between steps')
+    parser.add_argument('--max-restarts', type=int, default=3,
+                        help='restarts before copying in a single step')
+    parser.add_argument('--write-pause', type=float, default=0.1,
+                        help='seconds between the concurrent writes')
+    args = parser.parse_args()
+
+    print(f"{'groups':>8}{'teachers':>10}{'MB':>8}{'backup s':>10}{'MB/s':>8}{'restarts':>10}"
+          f"{'max write s':>13}{'restore s':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_groups, n_teachers in SCALES:
+            db_file = Path(tmp_dir) / 'school.db'
+            write_sqlite(generate_school(n_groups, n_teachers), db_file)
+            size = db_file.stat().st_size / 1e6
+            backup_seconds, restarts, write_seconds, restore_seconds = measure_backup(
+                db_file, Path(tmp_dir) / 'snapshot.db', args
+            )
+            print(f"{n_groups:>8}{n_teachers:>10}{size:>8.1f}{backup_seconds:>10.3f}"
+                  f"{size / backup_seconds:>8.1f}{restarts:>10}"
+                  f"{write_seconds:>13.4f}{restore_seconds:>11.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
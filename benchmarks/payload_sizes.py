@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Compare the size of the DataTable payloads, row records with foreign key
+descriptions vs compact columns, plain and gzip compressed,
+on a synthetic school.
+"""
+
+import argparse
+import gzip
+import json
+from pathlib import Path
+import sys
+import tempfile
+
+import src.db
+from scripts.data.generate_school import generate_school, write_sqlite
+
+TABLES = ['grupo_materias', 'prof_grupo_materias', 'disponibilidad_profesores']
+
+
+def payload_sizes(table):
+    """Sizes in bytes of the payloads of a table"""
+    records = json.dumps(src.db.get_table_data_with_fk_descriptions(table)).encode('utf-8')
+    columns = json.dumps(src.db.get_table_columns(table)).encode('utf-8')
+    return {
+        'records': len(records),
+        'records_gzip': len(gzip.compress(records, compresslevel=6)),
+        'columns': len(columns),
+        'columns_gzip': len(gzip.compress(columns, compresslevel=6)),
+    }
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Measure the DataTable payload sizes.')
+    parser.add_argument('--groups', type=int, default=300, help='number of groups')
+    parser.add_argument('--teachers', type=int, default=2000, help='number of teachers')
+    args = parser.parse_args()
+
+    db_file_before = src.db.DB_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src.db.DB_FILE = str(Path(tmp_dir) / 'school.db')
+        write_sqlite(generate_school(args.groups, args.teachers), src.db.DB_FILE)
+        try:
+            print(f"{'table':28}{'records':>12}{'+gzip':>12}{'columns':>12}{'+gzip':>12}")
+            for table in TABLES:
+                sizes = payload_sizes(table)
+                print(f"{table:28}" + ''.join(f"{size:>12,}" for size in sizes.values()))
+        finally:
+            src.db.DB_FILE = db_file_before
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the data layer, the Dash callbacks and the DB loading scripts,
+run on a synthetic school scaled to the given number of groups and teachers.
+
+Results are compared with a JSON baseline, if there is one,
+and the run fails when a benchmark got slower than the allowed tolerance.
+"""
+
+import argparse
+from contextlib import redirect_stdout
+from contextvars import copy_context
+import io
+import json
+from pathlib import Path
+import statistics
+import sys
+import tempfile
+import time
+
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+
+import src.db
+from src import timetable_db_app as tt_app
+from scripts.data.generate_school import generate_school, to_prolog, write_sqlite
+from scripts.data.prolog_facts_to_sqlite import create_and_load_database, extract_facts
+
+SQL_FILE = 'scripts/DDL/tt.sql'
+BASELINE_FILE = 'benchmarks/baseline.json'
+
+
+def measure(func, repeat):
+    """Run func repeat times and return its timings in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'median': statistics.median(timings), 'min': min(timings)}
+
+
+def run_callback(callback, trigger, *args):
+    """Call a Dash callback directly, as if trigger had fired it"""
+    prop_id = json.dumps(trigger, separators=(',', ':')) + '.n_clicks'
+    def call():
+        context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id, 'value': 1}]))
+        return callback(*args)
+    return copy_context().run(call)
+
+
+def load_school(prolog_file, db_file, incremental=False):
+    """Load a school into a new DB, or update it with incremental, quietly"""
+    with redirect_stdout(io.StringIO()):
+        create_and_load_database(prolog_file, SQL_FILE, db_file, incremental=incremental)
+
+
+def crud_cycle():
+    """Create, update and delete a grupos row through the Dash callbacks"""
+    input_ids = [{'type': 'input-field', 'name': 'id'}, {'type': 'input-field', 'name': 'nombre'}]
+    button = {'table': 'grupos', 'type': 'create-button'}
+    run_callback(tt_app.create_entry, button, [1], [999999, 'bench'], input_ids,
+                 [{'table': 'grupos'}])
+    row = {'id': 999999, 'nombre': 'bench'}
+    button = {'table': 'grupos', 'type': 'update-button'}
+    run_callback(tt_app.update_entry, button, [1], [999999, 'bench2'], input_ids,
+                 [{'table': 'grupos'}], [[0]], [[row]], [['id']])
+    button = {'table': 'grupos', 'type': 'delete-button'}
+    run_callback(tt_app.delete_entry, button, [1], [{'table': 'grupos'}], [[0]], [[row]],
+                 [['id']])
+
+
+def run_benchmarks(n_groups, n_teachers, repeat, seed=0):
+    """Run all the benchmarks and return their results"""
+    results = {}
+    db_file_before = src.db.DB_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        school = generate_school(n_groups, n_teachers, seed)
+        prolog_file = Path(tmp_dir) / 'school.pl'
+        prolog_file.write_text(to_prolog(school), encoding='utf-8')
+        db_file = str(Path(tmp_dir) / 'school.db')
+        write_sqlite(school, db_file, SQL_FILE)
+        src.db.DB_FILE = db_file
+
+        scratch_db = str(Path(tmp_dir) / 'scratch.db')
+        benchmarks = {
+            'extract_facts': lambda: extract_facts(prolog_file),
+            'create_and_load_database': lambda: load_school(prolog_file, scratch_db),
+            # facts unchanged since the previous benchmark
+            'create_and_load_database[incremental]':
+                lambda: load_school(prolog_file, scratch_db, incremental=True),
+            'get_table_data_with_fk_descriptions[prof_grupo_materias]':
+                lambda: src.db.get_table_data_with_fk_descriptions('prof_grupo_materias'),
+            'get_table_data_with_fk_descriptions[disponibilidad_profesores]':
+                lambda: src.db.get_table_data_with_fk_descriptions('disponibilidad_profesores'),
+            'get_dropdown_options[profesores]':
+                lambda: src.db.get_dropdown_options('profesores', 'id', 'nombre'),
+            'render_tab_content[disponibilidad_profesores]':
+                lambda: tt_app.render_tab_content('disponibilidad_profesores'),
+            'refresh_tables[grupo_materias]':
+                lambda: tt_app.refresh_tables([None], [{'table': 'grupo_materias'}]),
+            'crud_callbacks[grupos]': crud_cycle,
+        }
+        try:
+            for name, func in benchmarks.items():
+                results[name] = measure(func, repeat)
+        finally:
+            src.db.DB_FILE = db_file_before
+    return {'groups': n_groups, 'teachers': n_teachers, 'results': results}
+
+
+def find_regressions(run, baseline, tolerance):
+    """Names of the benchmarks slower than baseline by more than tolerance"""
+    if (baseline['groups'], baseline['teachers']) != (run['groups'], run['teachers']):
+        print("Baseline was measured at another scale, not comparing", file=sys.stderr)
+        return []
+    return [
+        name for name, timing in run['results'].items()
+        if name in baseline['results']
+        and timing['median'] > baseline['results'][name]['median'] * (1 + tolerance)
+    ]
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Run the timetable DB benchmarks.')
+    parser.add_argument('--groups', type=int, default=200, help='number of groups')
+    parser.add_argument('--teachers', type=int, default=400, help='number of teachers')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per benchmark')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown relative to the baseline, 0.5 = 50%%')
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.groups, args.teachers, args.repeat)
+    for name, timing in run['results'].items():
+        print(f"{timing['median'] * 1000:10.2f} ms  (min {timing['min'] * 1000:10.2f} ms)  {name}")
+
+    baseline_file = Path(args.baseline)
+    if args.save_baseline or not baseline_file.exists():
+        baseline_file.write_text(json.dumps(run, indent=2) + '\n', encoding='utf-8')
+        print(f"Baseline saved to {baseline_file}")
+        return 0
+
+    baseline = json.loads(baseline_file.read_text(encoding='utf-8'))
+    regressions = find_regressions(run, baseline, args.tolerance)
+    for name in regressions:
+        print(f"Regression: {name} slower than baseline by more than {args.tolerance:.0%}",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare the storage and the primary key lookups of the composite key link tables
+created as the spec declares them, STRICT and WITHOUT ROWID, and as plain rowid tables,
+on a synthetic school.
+
+A rowid table stores its rows in the table b-tree and its primary key again in an
+automatic index, a WITHOUT ROWID table only stores the primary key b-tree.
+"""
+
+import argparse
+import copy
+from pathlib import Path
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from config.params import params
+from scripts.DDL.yaml2sql import generate_spec_ddl, primary_key_columns, table_options
+from scripts.data.generate_school import generate_school, write_sqlite
+from src.utils.yaml_loader import load_yaml_file
+
+
+def rowid_spec(spec):
+    """The spec with all its tables as plain rowid tables"""
+    spec = copy.deepcopy(spec)
+    for table in spec['tables']:
+        table.pop('strict', None)
+        table.pop('without_rowid', None)
+    return spec
+
+
+def table_bytes(conn, table):
+    """Bytes of the pages of a table and its indexes"""
+    return conn.execute(
+        "SELECT SUM(pgsize) FROM dbstat WHERE name IN"
+        " (SELECT name FROM sqlite_master WHERE tbl_name = ?)", (table,)
+    ).fetchone()[0]
+
+
+def lookup_seconds(conn, table, key_columns, keys, count):
+    """Seconds taken by count point lookups by primary key of random rows"""
+    sample = random.Random(0).choices(keys, k=count)
+    query = (f"SELECT * FROM {table} WHERE "
+             + ' AND '.join(f"{column} = ?" for column in key_columns))
+    start = time.perf_counter()
+    for key in sample:
+        conn.execute(query, key).fetchone()
+    return time.perf_counter() - start
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Compare the size and lookups of the link'
+                                                 ' tables with and without the table options.')
+    parser.add_argument('--groups', type=int, default=1000, help='number of groups')
+    parser.add_argument('--teachers', type=int, default=8000, help='number of teachers')
+    parser.add_argument('--lookups', type=int, default=100000, help='point lookups per table')
+    args = parser.parse_args()
+
+    spec = load_yaml_file(params['tt_spec'])['DatabaseSpec']
+    tables = [table['name'] for table in spec['tables'] if table_options(table)]
+    school = generate_school(args.groups, args.teachers)
+
+    print(f"{'table':<28}{'layout':<26}{'rows':>9}{'KB':>10}{'lookup us':>11}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for layout, layout_spec in (('rowid', rowid_spec(spec)), ('spec', spec)):
+            sql_file = Path(tmp_dir) / f"{layout}.sql"
+            sql_file.write_text(generate_spec_ddl(layout_spec), encoding='utf-8')
+            db_file = Path(tmp_dir) / f"{layout}.db"
+            write_sqlite(school, db_file, sql_file)
+            conn = sqlite3.connect(db_file)
+            try:
+                conn.execute("VACUUM")
+                for table in layout_spec['tables']:
+                    if table['name'] not in tables:
+                        continue
+                    key_columns = primary_key_columns(table)
+                    keys = conn.execute(
+                        f"SELECT {', '.join(key_columns)} FROM {table['name']}"
+                    ).fetchall()
+                    if not keys:
+                        continue
+                    options = ', '.join(table_options(table)) or 'rowid'
+                    seconds = lookup_seconds(conn, table['name'], key_columns, keys, args.lookups)
+                    print(f"{table['name']:<28}{options:<26}{len(keys):>9}"
+                          f"{table_bytes(conn, table['name']) / 1024:>10.0f}"
+                          f"{seconds / args.lookups * 1e6:>11.2f}")
+                print(f"{'total file':<28}{layout:<26}{'':>9}"
+                      f"{db_file.stat().st_size / 1024:>10.0f}")
+            finally:
+                conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Measure the write throughput of concurrent Dash style writes,
+each committed on its own connection, as without a writer,
+vs queued to the single writer, which commits them in batches,
+on a synthetic school.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from pathlib import Path
+import sqlite3
+import sys
+import tempfile
+import time
+
+from config.params import params
+import src.db
+from scripts.data.generate_school import generate_school, write_sqlite
+from src.writer import execute_write
+
+
+def client(first_id, n_writes):
+    """Create, update and delete grupos rows, as the CRUD callbacks do, counting the errors"""
+    errors = 0
+    for grupo_id in range(first_id, first_id + n_writes // 3):
+        for sql, values in [
+            ("INSERT INTO grupos (id, nombre) VALUES (?, ?)", [grupo_id, f"b{grupo_id}"]),
+            ("UPDATE grupos SET nombre = ? WHERE id = ?", [f"c{grupo_id}", grupo_id]),
+            ("DELETE FROM grupos WHERE id = ?", [grupo_id]),
+        ]:
+            try:
+                execute_write(sql, values)
+            except sqlite3.Error:
+                errors += 1
+    return errors
+
+
+def measure(n_clients, n_writes, writer_enabled):
+    """(writes per second, errors) of n_clients concurrent clients"""
+    params['WRITER'] = {**(params.get('WRITER') or {}), 'enabled': writer_enabled}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_clients) as executor:
+        errors = sum(executor.map(client, range(100000, 100000 + n_clients * n_writes, n_writes),
+                                  [n_writes] * n_clients))
+    elapsed = time.perf_counter() - start
+    return n_clients * (n_writes // 3) * 3 / elapsed, errors
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Measure the concurrent write throughput.')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16, 64],
+                        help='numbers of concurrent clients')
+    parser.add_argument('--writes', type=int, default=300, help='writes per client')
+    args = parser.parse_args()
+
+    # the lock waits without writer are reported by the benchmark, not as slow queries
+    logging.getLogger('src.metrics').setLevel(logging.ERROR)
+    writer_settings = params.get('WRITER')
+    db_file_before = src.db.DB_FILE
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        src.db.DB_FILE = str(Path(tmp_dir) / 'school.db')
+        write_sqlite(generate_school(300, 2000), src.db.DB_FILE)
+        try:
+            print(f"{'clients':>8}{'direct w/s':>12}{'errors':>8}{'writer w/s':>12}{'errors':>8}")
+            for n_clients in args.clients:
+                direct = measure(n_clients, args.writes, False)
+                queued = measure(n_clients, args.writes, True)
+                print(f"{n_clients:>8}{direct[0]:>12.0f}{direct[1]:>8}"
+                      f"{queued[0]:>12.0f}{queued[1]:>8}")
+        finally:
+            src.db.DB_FILE = db_file_before
+            params['WRITER'] = writer_settings
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
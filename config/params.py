@@ -1,31 +1,145 @@
 """
 Params class with single instance
-storing the app params defined in the corresponding yaml file
+storing the app params defined in the corresponding yaml file.
+
+The yaml file is only read on first access to the params,
+so that importing config stays cheap for the scripts that never read them.
+It is read again when its modification time or size changed, checked on access
+at most every PARAMS_RELOAD_SECONDS, and the subscribers to the changed params
+are called, so that running processes apply them without restarting.
 """
 
+import logging
+import os
 from pathlib import Path
-import yaml
+import threading
+import time
+
 from src.utils.singleton import Singleton
 
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
 
 class Params(dict, metaclass=Singleton):
     def __init__(self):
         super().__init__()
-        self._load_params()
-    
-    def _load_params(self):
-        """Load parameters from params.yaml file"""
+        # Path to the YAML file in the same directory as this file
+        self.yaml_file = Path(__file__).parent / 'params.yaml'
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._file_key = None
+        self._next_check = 0.0
+        self._subscribers = []
 
-        # Path of the current script file
-        package_dir = Path(__file__).parent
-        # Path to the YAML file in the same directory
-        yaml_file_path = package_dir / 'params.yaml'
+    def _ensure_loaded(self):
+        """Load the params on first access, and reload them when the file changed"""
+        if self._loaded and time.monotonic() < self._next_check:
+            return
+        with self._lock:
+            check = self._loaded and time.monotonic() >= self._next_check
+            if not self._loaded:
+                self._load_params()
+                self._loaded = True
+            # set first, the reload accesses the params too
+            self._schedule_check()
+        # the subscribers are called without the lock, which they may wait for in other threads
+        if check:
+            self.reload()
 
+    def _schedule_check(self):
+        interval = dict.get(self, 'PARAMS_RELOAD_SECONDS', 0)
+        self._next_check = time.monotonic() + interval if interval else float('inf')
+
+    def _read_file(self):
+        """(file key, params) of the yaml file"""
+        # yaml is only imported on first access
+        from src.utils.yaml_loader import load_yaml  #pylint: disable=import-outside-toplevel
+
+        stat = os.stat(self.yaml_file)
+        with open(self.yaml_file, 'r') as f:
+            values = load_yaml(f) or {}
+        return (stat.st_mtime_ns, stat.st_size), values
+
+    def _load_params(self):
+        """Load parameters from params.yaml file"""
         try:
-            with open(yaml_file_path, 'r') as f:
-                self.update(yaml.safe_load(f))
+            self._file_key, values = self._read_file()
         except FileNotFoundError:
             raise FileNotFoundError("params.yaml not found")
+        dict.update(self, values)
+
+    def reload(self, force=False):
+        """
+        Read params.yaml again if it changed since last read, or if forced,
+        and call the subscribers to the params that changed.
+        The params are kept when the file cannot be read, e.g. while it is edited.
+
+        Returns:
+            set of the names of the changed params
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.yaml_file)
+                if not force and (stat.st_mtime_ns, stat.st_size) == self._file_key:
+                    return set()
+                file_key, values = self._read_file()
+            except Exception as e:      #pylint: disable=broad-exception-caught
+                logger.warning("params.yaml not reloaded: %s", e)
+                return set()
+            # updated in place, so that readers never see the params empty
+            changed = {name for name in set(dict.keys(self)) | set(values)
+                       if dict.get(self, name, _MISSING) != values.get(name, _MISSING)}
+            for name in changed:
+                if name in values:
+                    dict.__setitem__(self, name, values[name])
+                else:
+                    dict.__delitem__(self, name)
+            self._file_key = file_key
+            self._loaded = True
+            subscribers = list(self._subscribers)
+        if changed:
+            logger.info("params.yaml reloaded, changed: %s", ', '.join(sorted(changed)))
+        for names, callback in subscribers:
+            if names is None or names & changed:
+                callback(changed)
+        return changed
+
+    def subscribe(self, callback, names=None):
+        """
+        Call callback(changed param names) whenever some of the named params,
+        or any param if names is None, change on reload
+        """
+        with self._lock:
+            self._subscribers.append((frozenset(names) if names is not None else None, callback))
+        return callback
+
+    def unsubscribe(self, callback):
+        """Stop calling callback on reload"""
+        with self._lock:
+            self._subscribers = [(names, subscriber) for names, subscriber in self._subscribers
+                                 if subscriber != callback]
+
+
+def _loading(name):
+    """dict method name of Params, loading the params first"""
+    method = getattr(dict, name)
+
+    def load_and_call(self, *args, **kwargs):
+        self._ensure_loaded()   #pylint: disable=protected-access
+        return method(self, *args, **kwargs)
+
+    load_and_call.__name__ = name
+    load_and_call.__doc__ = method.__doc__
+    return load_and_call
+
+
+for _name in ('__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__',
+              '__len__', '__repr__', '__eq__', '__ne__', '__or__', '__ior__',
+              'get', 'keys', 'values', 'items', 'copy', 'pop', 'popitem', 'setdefault',
+              'update', 'clear'):
+    setattr(Params, _name, _loading(_name))
 
 params = Params()
-"""Single in-RAM structure to retrieve params from"""
\ No newline at end of file
+"""Single in-RAM structure to retrieve params from"""
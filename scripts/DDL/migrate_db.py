@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+"""
+Migrate a live SQLite DB to the tables of a YAML spec which follows the db_spec_schema.yaml,
+keeping its data.
+
+The spec is compared with the DB structure, as reported by sqlite_master and
+PRAGMA table_info/foreign_key_list/index_list, and the minimal steps are applied
+in a single transaction:
+- tables missing from the DB are created
+- columns appended to a table are added with ALTER TABLE ... ADD COLUMN when SQLite allows it
+- any other table change rebuilds the table, bulk copying the common columns
+  with INSERT ... SELECT
+- tables missing from the spec are dropped only if requested
+- the full text search index is created, or its triggers recreated, and reindexed
+- the triggers of the report summaries, if installed, are recreated around rebuilds
+  and the summaries recomputed; the summary tables are not part of the spec
+"""
+
+import argparse
+from pathlib import Path
+import sqlite3
+import sys
+from typing import Any
+
+from config.params import params
+from scripts.DDL.yaml2sql import (SEARCH_KEYS_TABLE, generate_column_def, generate_create_table,
+                                  generate_search_ddl, generate_search_rebuild,
+                                  generate_search_triggers, is_search_table, searchable_tables,
+                                  table_options, type_to_sqlite)
+from src.reports import is_report_table, refresh_statements, trigger_ddl, trigger_statements
+from src.utils.yaml_loader import load_yaml_file
+
+
+def spec_columns(table: dict[str, Any]) -> list[tuple]:
+    """Columns of a spec table as (name, type, notnull, default, pk position) tuples"""
+    pk_columns = []
+    for constraint in table.get('constraints', []):
+        if constraint['type'] == 'PRIMARY KEY':
+            pk_columns = constraint['columns']
+    columns = []
+    for column in table['columns']:
+        default = None
+        if 'default' in column:
+            # same rendering as yaml2sql, as reported back by PRAGMA table_info
+            default = generate_column_def(column).split(' DEFAULT ', 1)[1]
+        pk = pk_columns.index(column['name']) + 1 if column['name'] in pk_columns else 0
+        columns.append((column['name'], type_to_sqlite(column['type']),
+                        int(column.get('not_null', False)), default, pk))
+    return columns
+
+
+def spec_foreign_keys(table: dict[str, Any]) -> set[tuple]:
+    """Foreign keys of a spec table as (columns, referenced table, referenced columns) tuples"""
+    return {
+        (tuple(constraint['columns']), constraint['references']['table'],
+         tuple(constraint['references']['columns']))
+        for constraint in table.get('constraints', [])
+        if constraint['type'] == 'FOREIGN KEY'
+    }
+
+
+def spec_uniques(table: dict[str, Any]) -> set[tuple]:
+    """UNIQUE constraints of a spec table as column tuples"""
+    return {
+        tuple(constraint['columns'])
+        for constraint in table.get('constraints', [])
+        if constraint['type'] == 'UNIQUE'
+    }
+
+
+def spec_checks(table: dict[str, Any]) -> list[str]:
+    """CHECK constraints of a spec table, as generated by yaml2sql"""
+    return [
+        f"CHECK ({constraint['expression']})"
+        for constraint in table.get('constraints', [])
+        if constraint['type'] == 'CHECK'
+    ]
+
+
+def db_columns(conn: sqlite3.Connection, table_name: str) -> list[tuple]:
+    """Columns of a DB table as (name, type, notnull, default, pk position) tuples"""
+    return [
+        (name, col_type.upper(), notnull, default, pk)
+        for _, name, col_type, notnull, default, pk
+        in conn.execute(f"PRAGMA table_info({table_name})")
+    ]
+
+
+def db_foreign_keys(conn: sqlite3.Connection, table_name: str) -> set[tuple]:
+    """Foreign keys of a DB table as (columns, referenced table, referenced columns) tuples"""
+    fk_columns = {}
+    for fk_id, _, ref_table, from_col, to_col, *_ in conn.execute(
+            f"PRAGMA foreign_key_list({table_name})"):
+        from_cols, _, to_cols = fk_columns.setdefault(fk_id, ([], ref_table, []))
+        from_cols.append(from_col)
+        to_cols.append(to_col)
+    return {
+        (tuple(from_cols), ref_table, tuple(to_cols))
+        for from_cols, ref_table, to_cols in fk_columns.values()
+    }
+
+
+def db_uniques(conn: sqlite3.Connection, table_name: str) -> set[tuple]:
+    """UNIQUE constraints of a DB table as column tuples"""
+    uniques = set()
+    for _, index_name, _, origin, _ in conn.execute(f"PRAGMA index_list({table_name})"):
+        if origin == 'u':
+            uniques.add(tuple(
+                name for _, _, name in conn.execute(f"PRAGMA index_info({index_name})")
+            ))
+    return uniques
+
+
+def db_table_sql(conn: sqlite3.Connection) -> dict[str, str]:
+    """
+    CREATE statements of the DB user tables, by table name,
+    but those of the search index and of the report summaries
+    """
+    return {name: sql for name, sql in conn.execute(
+        "SELECT name, sql FROM sqlite_master"
+        " WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    ) if not is_search_table(name) and not is_report_table(name)}
+
+
+def db_table_options(conn: sqlite3.Connection, table_name: str) -> list[str]:
+    """STRICT and WITHOUT ROWID options of a DB table, as table_options returns them"""
+    _, _, _, _, without_rowid, strict = conn.execute(
+        "SELECT * FROM pragma_table_list WHERE schema = 'main' AND name = ?", (table_name,)
+    ).fetchone()
+    return ['STRICT'] * strict + ['WITHOUT ROWID'] * without_rowid
+
+
+def can_add_column(column: dict[str, Any], pk_position: int) -> bool:
+    """Whether ALTER TABLE ... ADD COLUMN accepts the spec column"""
+    return not pk_position and (not column.get('not_null', False) or 'default' in column)
+
+
+def rebuild_table_steps(table: dict[str, Any], old_columns: list[str]) -> list[str]:
+    """Statements replacing a table by its spec version, copying the common columns"""
+    name = table['name']
+    new_name = f"{name}__migration"
+    common = [column['name'] for column in table['columns'] if column['name'] in old_columns]
+    create = generate_create_table({**table, 'name': new_name})
+    steps = [create]
+    if common:
+        column_list = ', '.join(common)
+        steps.append(f"INSERT INTO {new_name} ({column_list}) SELECT {column_list} FROM {name};")
+    steps.append(f"DROP TABLE {name};")
+    steps.append(f"ALTER TABLE {new_name} RENAME TO {name};")
+    return steps
+
+
+def plan_table(conn: sqlite3.Connection, table: dict[str, Any], table_sql: str) -> list[str]:
+    """Statements migrating an existing DB table to its spec"""
+    name = table['name']
+    wanted = spec_columns(table)
+    current = db_columns(conn, name)
+    same_constraints = (
+        spec_foreign_keys(table) == db_foreign_keys(conn, name)
+        and spec_uniques(table) == db_uniques(conn, name)
+        and all(check in table_sql for check in spec_checks(table))
+        and table_options(table) == db_table_options(conn, name)
+    )
+
+    if same_constraints and wanted == current:
+        return []
+
+    if same_constraints and wanted[:len(current)] == current:
+        added = list(zip(table['columns'][len(current):], wanted[len(current):]))
+        if all(can_add_column(column, spec[4]) for column, spec in added):
+            return [
+                f"ALTER TABLE {name} ADD COLUMN {generate_column_def(column)};"
+                for column, _ in added
+            ]
+
+    return rebuild_table_steps(table, [column[0] for column in current])
+
+
+def plan_migration(conn: sqlite3.Connection, spec: dict[str, Any],
+                   allow_drop: bool = False) -> list[str]:
+    """
+    Compute the statements migrating the DB to the spec
+
+    Args:
+        conn: connection to the DB
+        spec: the DatabaseSpec content of the YAML spec
+        allow_drop: drop DB tables that are not in the spec
+
+    Returns:
+        the statements to execute, empty if the DB already matches the spec
+    """
+    live_tables = db_table_sql(conn)
+    statements = []
+    for table in spec['tables']:
+        if table['name'] in live_tables:
+            statements.extend(plan_table(conn, table, live_tables[table['name']]))
+        else:
+            statements.append(generate_create_table(table))
+
+    spec_names = {table['name'] for table in spec['tables']}
+    for name in live_tables:
+        if name not in spec_names:
+            if allow_drop:
+                statements.append(f"DROP TABLE {name};")
+            else:
+                print(f"Warning: table {name} is not in the spec, keeping it", file=sys.stderr)
+
+    # created or rebuilt tables have no search triggers, and the triggers of the other tables
+    # must not refer to a rebuilt table meanwhile, so all of them are created again
+    has_search = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_KEYS_TABLE,)
+    ).fetchone()
+    search_ddl = generate_search_ddl(spec['tables'])
+    changed_prefixes = ('DROP TABLE',) + tuple(
+        f"CREATE TABLE {table['name']} (" for table in searchable_tables(spec['tables'])
+    )
+    if search_ddl and (not has_search or any(statement.startswith(changed_prefixes)
+                                             for statement in statements)):
+        statements = ([f"DROP TRIGGER IF EXISTS {name};"
+                       for name in generate_search_triggers(spec['tables'])]
+                      + statements + search_ddl + generate_search_rebuild(spec['tables']))
+
+    # the report triggers of the other tables must not refer to a rebuilt table either,
+    # they are created again, if installed, see src/reports.py
+    has_reports = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'rep_%'"
+    ).fetchone()
+    if has_reports and any(statement.startswith(('DROP TABLE', 'CREATE TABLE'))
+                           for statement in statements):
+        statements = ([f"DROP TRIGGER IF EXISTS {name};" for name in trigger_statements()]
+                      + statements + trigger_ddl() + refresh_statements())
+    return statements
+
+
+def apply_migration(conn: sqlite3.Connection, statements: list[str]):
+    """
+    Execute the migration statements in a single transaction
+
+    Raises:
+        sqlite3.IntegrityError: if the migrated data violates a foreign key,
+            in which case nothing is changed
+    """
+    if not statements:
+        return
+    # foreign keys must be off while tables are rebuilt and can only change outside transactions
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                raise sqlite3.IntegrityError(
+                    f"Migration violates foreign keys, first violation: {tuple(violations[0])}"
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+        conn.isolation_level = isolation_level
+
+
+def migrate_db(spec_file: Path, db_file: Path, allow_drop: bool = False,
+               dry_run: bool = False) -> list[str]:
+    """Migrate db_file to the spec in spec_file, returning the statements applied"""
+    spec = load_yaml_file(spec_file, cache_dir=params.get('YAML_CACHE_DIR'))['DatabaseSpec']
+    # a dry run must not create a missing DB file
+    conn = sqlite3.connect(':memory:' if dry_run and not db_file.exists() else db_file)
+    try:
+        statements = plan_migration(conn, spec, allow_drop)
+        if not dry_run:
+            apply_migration(conn, statements)
+        return statements
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Migrate a SQLite DB to a YAML spec.')
+    parser.add_argument('spec_file', type=Path, help='Path to the YAML spec')
+    parser.add_argument('db_file', type=Path, help='Path to the SQLite database file')
+    parser.add_argument('--allow-drop', action='store_true',
+                        help='drop tables that are not in the spec')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only print the migration statements')
+    args = parser.parse_args()
+
+    if not args.spec_file.exists():
+        print(f"Error: File {args.spec_file} not found", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        statements = migrate_db(args.spec_file, args.db_file, args.allow_drop, args.dry_run)
+    except sqlite3.Error as e:
+        print(f"Error migrating {args.db_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for statement in statements:
+        print(statement)
+    if not statements:
+        print(f"{args.db_file} already matches {args.spec_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -48,7 +48,7 @@ CREATE TABLE prof_grupo_materias (
     FOREIGN KEY (profesor_id) REFERENCES profesores(id),
     FOREIGN KEY (grupo_id) REFERENCES grupos(id),
     FOREIGN KEY (materia_id) REFERENCES materias(id)
-    );
+    ) STRICT, WITHOUT ROWID;
 
 CREATE TABLE dias (
     id INTEGER NOT NULL,
@@ -78,5 +78,160 @@ CREATE TABLE disponibilidad_profesores (
     FOREIGN KEY (dia_id) REFERENCES dias(id),
     FOREIGN KEY (bloque_id) REFERENCES bloques(id),
     FOREIGN KEY (leccion_id) REFERENCES lecciones(id)
-    );
+    ) STRICT, WITHOUT ROWID;
+
+CREATE TABLE horario (
+    grupo_id INTEGER NOT NULL,
+    dia_id INTEGER NOT NULL,
+    bloque_id INTEGER NOT NULL,
+    leccion_id INTEGER NOT NULL,
+    materia_id INTEGER NOT NULL,
+    profesor_id INTEGER NOT NULL,
+    PRIMARY KEY (grupo_id, dia_id, bloque_id, leccion_id),
+    FOREIGN KEY (grupo_id) REFERENCES grupos(id),
+    FOREIGN KEY (dia_id) REFERENCES dias(id),
+    FOREIGN KEY (bloque_id) REFERENCES bloques(id),
+    FOREIGN KEY (leccion_id) REFERENCES lecciones(id),
+    FOREIGN KEY (materia_id) REFERENCES materias(id),
+    FOREIGN KEY (profesor_id) REFERENCES profesores(id)
+    ) STRICT, WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS search_keys (
+    id INTEGER PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    UNIQUE (table_name, row_key));
+
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    content, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3');
+
+CREATE TRIGGER IF NOT EXISTS search_grupos_insert AFTER INSERT ON grupos
+BEGIN
+    INSERT INTO search_keys (table_name, row_key) VALUES ('grupos', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE(NEW.nombre, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupos_delete AFTER DELETE ON grupos
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'grupos' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'grupos' AND row_key = json_array(OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupos_update AFTER UPDATE ON grupos
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'grupos' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'grupos' AND row_key = json_array(OLD.id);
+    INSERT INTO search_keys (table_name, row_key) VALUES ('grupos', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE(NEW.nombre, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_materias_insert AFTER INSERT ON materias
+BEGIN
+    INSERT INTO search_keys (table_name, row_key) VALUES ('materias', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE(NEW.nombre, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_materias_delete AFTER DELETE ON materias
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'materias' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'materias' AND row_key = json_array(OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_materias_update AFTER UPDATE ON materias
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'materias' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'materias' AND row_key = json_array(OLD.id);
+    INSERT INTO search_keys (table_name, row_key) VALUES ('materias', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE(NEW.nombre, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_profesores_insert AFTER INSERT ON profesores
+BEGIN
+    INSERT INTO search_keys (table_name, row_key) VALUES ('profesores', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE(NEW.nombre, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_profesores_delete AFTER DELETE ON profesores
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'profesores' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'profesores' AND row_key = json_array(OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_profesores_update AFTER UPDATE ON profesores
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'profesores' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'profesores' AND row_key = json_array(OLD.id);
+    INSERT INTO search_keys (table_name, row_key) VALUES ('profesores', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE(NEW.nombre, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupo_materias_insert AFTER INSERT ON grupo_materias
+BEGIN
+    INSERT INTO search_keys (table_name, row_key) VALUES ('grupo_materias', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE((SELECT nombre FROM grupos WHERE id = NEW.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = NEW.materia_id), ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupo_materias_delete AFTER DELETE ON grupo_materias
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'grupo_materias' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'grupo_materias' AND row_key = json_array(OLD.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupo_materias_update AFTER UPDATE ON grupo_materias
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'grupo_materias' AND row_key = json_array(OLD.id));
+    DELETE FROM search_keys WHERE table_name = 'grupo_materias' AND row_key = json_array(OLD.id);
+    INSERT INTO search_keys (table_name, row_key) VALUES ('grupo_materias', json_array(NEW.id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE((SELECT nombre FROM grupos WHERE id = NEW.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = NEW.materia_id), ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupo_materias_grupo_id_reference AFTER UPDATE ON grupos
+BEGIN
+    UPDATE search_index SET content = (SELECT COALESCE((SELECT nombre FROM grupos WHERE id = r.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = r.materia_id), '') FROM grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'grupo_materias' AND k.row_key = json_array(r.id) WHERE k.id = search_index.rowid)
+    WHERE rowid IN (SELECT k.id FROM grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'grupo_materias' AND k.row_key = json_array(r.id) WHERE r.grupo_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_grupo_materias_materia_id_reference AFTER UPDATE ON materias
+BEGIN
+    UPDATE search_index SET content = (SELECT COALESCE((SELECT nombre FROM grupos WHERE id = r.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = r.materia_id), '') FROM grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'grupo_materias' AND k.row_key = json_array(r.id) WHERE k.id = search_index.rowid)
+    WHERE rowid IN (SELECT k.id FROM grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'grupo_materias' AND k.row_key = json_array(r.id) WHERE r.materia_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_prof_grupo_materias_insert AFTER INSERT ON prof_grupo_materias
+BEGIN
+    INSERT INTO search_keys (table_name, row_key) VALUES ('prof_grupo_materias', json_array(NEW.profesor_id, NEW.grupo_id, NEW.materia_id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE((SELECT nombre FROM profesores WHERE id = NEW.profesor_id), '') || ' ' || COALESCE((SELECT nombre FROM grupos WHERE id = NEW.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = NEW.materia_id), ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_prof_grupo_materias_delete AFTER DELETE ON prof_grupo_materias
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'prof_grupo_materias' AND row_key = json_array(OLD.profesor_id, OLD.grupo_id, OLD.materia_id));
+    DELETE FROM search_keys WHERE table_name = 'prof_grupo_materias' AND row_key = json_array(OLD.profesor_id, OLD.grupo_id, OLD.materia_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_prof_grupo_materias_update AFTER UPDATE ON prof_grupo_materias
+BEGIN
+    DELETE FROM search_index WHERE rowid = (SELECT id FROM search_keys WHERE table_name = 'prof_grupo_materias' AND row_key = json_array(OLD.profesor_id, OLD.grupo_id, OLD.materia_id));
+    DELETE FROM search_keys WHERE table_name = 'prof_grupo_materias' AND row_key = json_array(OLD.profesor_id, OLD.grupo_id, OLD.materia_id);
+    INSERT INTO search_keys (table_name, row_key) VALUES ('prof_grupo_materias', json_array(NEW.profesor_id, NEW.grupo_id, NEW.materia_id));
+    INSERT INTO search_index (rowid, content) VALUES (last_insert_rowid(), COALESCE((SELECT nombre FROM profesores WHERE id = NEW.profesor_id), '') || ' ' || COALESCE((SELECT nombre FROM grupos WHERE id = NEW.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = NEW.materia_id), ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_prof_grupo_materias_profesor_id_reference AFTER UPDATE ON profesores
+BEGIN
+    UPDATE search_index SET content = (SELECT COALESCE((SELECT nombre FROM profesores WHERE id = r.profesor_id), '') || ' ' || COALESCE((SELECT nombre FROM grupos WHERE id = r.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = r.materia_id), '') FROM prof_grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'prof_grupo_materias' AND k.row_key = json_array(r.profesor_id, r.grupo_id, r.materia_id) WHERE k.id = search_index.rowid)
+    WHERE rowid IN (SELECT k.id FROM prof_grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'prof_grupo_materias' AND k.row_key = json_array(r.profesor_id, r.grupo_id, r.materia_id) WHERE r.profesor_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_prof_grupo_materias_grupo_id_reference AFTER UPDATE ON grupos
+BEGIN
+    UPDATE search_index SET content = (SELECT COALESCE((SELECT nombre FROM profesores WHERE id = r.profesor_id), '') || ' ' || COALESCE((SELECT nombre FROM grupos WHERE id = r.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = r.materia_id), '') FROM prof_grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'prof_grupo_materias' AND k.row_key = json_array(r.profesor_id, r.grupo_id, r.materia_id) WHERE k.id = search_index.rowid)
+    WHERE rowid IN (SELECT k.id FROM prof_grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'prof_grupo_materias' AND k.row_key = json_array(r.profesor_id, r.grupo_id, r.materia_id) WHERE r.grupo_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS search_prof_grupo_materias_materia_id_reference AFTER UPDATE ON materias
+BEGIN
+    UPDATE search_index SET content = (SELECT COALESCE((SELECT nombre FROM profesores WHERE id = r.profesor_id), '') || ' ' || COALESCE((SELECT nombre FROM grupos WHERE id = r.grupo_id), '') || ' ' || COALESCE((SELECT nombre FROM materias WHERE id = r.materia_id), '') FROM prof_grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'prof_grupo_materias' AND k.row_key = json_array(r.profesor_id, r.grupo_id, r.materia_id) WHERE k.id = search_index.rowid)
+    WHERE rowid IN (SELECT k.id FROM prof_grupo_materias AS r JOIN search_keys AS k ON k.table_name = 'prof_grupo_materias' AND k.row_key = json_array(r.profesor_id, r.grupo_id, r.materia_id) WHERE r.materia_id = NEW.id);
+END;
 
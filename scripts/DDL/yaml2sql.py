@@ -7,6 +7,9 @@ import sys
 from typing import Any
 import yaml
 
+from config.params import params
+from src.utils.yaml_loader import load_yaml_file
+
 def type_to_sqlite(type_name: str) -> str:
     """Convert spec types to SQLite types."""
     type_map = {
@@ -56,6 +59,17 @@ def generate_constraint(constraint: dict) -> str:
 
     return ''
 
+def table_options(table: dict[str, Any]) -> list[str]:
+    """SQLite table options of the spec table, e.g. ['STRICT', 'WITHOUT ROWID']"""
+    options = []
+    if table.get('strict', False):
+        options.append('STRICT')
+    if table.get('without_rowid', False):
+        if not primary_key_columns(table):
+            raise ValueError(f"Table {table['name']} is without_rowid but has no primary key")
+        options.append('WITHOUT ROWID')
+    return options
+
 def generate_create_table(table: dict[str, Any]) -> str:
     """Generate CREATE TABLE statement from spec."""
     parts = [f"CREATE TABLE {table['name']} ("]
@@ -71,15 +85,155 @@ def generate_create_table(table: dict[str, Any]) -> str:
                 column_defs.append(constraint_def)
 
     parts.append(',\n    '.join(column_defs))
-    parts.append(');')
+    options = table_options(table)
+    parts.append(f") {', '.join(options)};" if options else ');')
 
     return '\n    '.join(parts)
 
+# full text search over the searchable columns of all the tables:
+# search_keys maps each search_index rowid to a table row, by its primary key values
+SEARCH_KEYS_TABLE = 'search_keys'
+SEARCH_INDEX_TABLE = 'search_index'
+
+def is_search_table(name: str) -> bool:
+    """Whether a table is part of the search index, including the FTS5 shadow tables"""
+    return name in (SEARCH_KEYS_TABLE, SEARCH_INDEX_TABLE) or name.startswith(f"{SEARCH_INDEX_TABLE}_")
+
+def primary_key_columns(table: dict[str, Any]) -> list[str]:
+    """Primary key columns of a spec table, in key order"""
+    for constraint in table.get('constraints', []):
+        if constraint['type'] == 'PRIMARY KEY':
+            return constraint['columns']
+    return []
+
+def search_key(table: dict[str, Any], row: str) -> str:
+    """SQL expression of the search key of row, a table alias or NEW/OLD"""
+    return f"json_array({', '.join(f'{row}.{col}' for col in primary_key_columns(table))})"
+
+def search_references(table: dict[str, Any]) -> dict[str, tuple[str, str]]:
+    """Searchable foreign key columns of a table -> (referenced table, referenced column)"""
+    searchable = {column['name'] for column in table['columns'] if column.get('searchable')}
+    return {
+        constraint['columns'][0]: (constraint['references']['table'],
+                                   constraint['references']['columns'][0])
+        for constraint in table.get('constraints', [])
+        if constraint['type'] == 'FOREIGN KEY' and len(constraint['columns']) == 1
+        and constraint['columns'][0] in searchable
+    }
+
+def search_document(table: dict[str, Any], tables: dict[str, dict], row: str) -> str:
+    """
+    SQL expression of the indexed text of row, a table alias or NEW/OLD:
+    its searchable columns, where a searchable foreign key stands for
+    the searchable string columns of the referenced row
+    """
+    references = search_references(table)
+    parts = []
+    for column in table['columns']:
+        if not column.get('searchable'):
+            continue
+        if column['name'] in references:
+            ref_table, ref_col = references[column['name']]
+            parts.extend(
+                f"(SELECT {ref_column['name']} FROM {ref_table}"
+                f" WHERE {ref_col} = {row}.{column['name']})"
+                for ref_column in tables[ref_table]['columns']
+                if ref_column.get('searchable') and ref_column['type'] == 'string'
+            )
+        else:
+            parts.append(f"{row}.{column['name']}")
+    return " || ' ' || ".join(f"COALESCE({part}, '')" for part in parts)
+
+def searchable_tables(spec_tables: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Tables with searchable columns"""
+    return [table for table in spec_tables
+            if any(column.get('searchable') for column in table['columns'])]
+
+def generate_search_triggers(spec_tables: list[dict[str, Any]]) -> dict[str, str]:
+    """Triggers keeping the search index in sync with the tables, by trigger name"""
+    tables = {table['name']: table for table in spec_tables}
+    triggers = {}
+    for table in searchable_tables(spec_tables):
+        name = table['name']
+        insert = (
+            f"INSERT INTO {SEARCH_KEYS_TABLE} (table_name, row_key)"
+            f" VALUES ('{name}', {search_key(table, 'NEW')});\n"
+            f"    INSERT INTO {SEARCH_INDEX_TABLE} (rowid, content)"
+            f" VALUES (last_insert_rowid(), {search_document(table, tables, 'NEW')});"
+        )
+        old_key = f"table_name = '{name}' AND row_key = {search_key(table, 'OLD')}"
+        delete = (
+            f"DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid ="
+            f" (SELECT id FROM {SEARCH_KEYS_TABLE} WHERE {old_key});\n"
+            f"    DELETE FROM {SEARCH_KEYS_TABLE} WHERE {old_key};"
+        )
+        for event, body in (('insert', insert), ('delete', delete),
+                            ('update', f"{delete}\n    {insert}")):
+            trigger = f"search_{name}_{event}"
+            triggers[trigger] = (
+                f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event.upper()} ON {name}\n"
+                f"BEGIN\n    {body}\nEND;"
+            )
+
+        # renaming a referenced row changes the text of the rows referencing it
+        for column, (ref_table, ref_col) in search_references(table).items():
+            keyed_rows = (
+                f"FROM {name} AS r JOIN {SEARCH_KEYS_TABLE} AS k"
+                f" ON k.table_name = '{name}' AND k.row_key = {search_key(table, 'r')}"
+            )
+            trigger = f"search_{name}_{column}_reference"
+            triggers[trigger] = (
+                f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER UPDATE ON {ref_table}\n"
+                f"BEGIN\n"
+                f"    UPDATE {SEARCH_INDEX_TABLE}"
+                f" SET content = (SELECT {search_document(table, tables, 'r')} {keyed_rows}"
+                f" WHERE k.id = {SEARCH_INDEX_TABLE}.rowid)\n"
+                f"    WHERE rowid IN (SELECT k.id {keyed_rows} WHERE r.{column} = NEW.{ref_col});\n"
+                f"END;"
+            )
+    return triggers
+
+def generate_search_ddl(spec_tables: list[dict[str, Any]]) -> list[str]:
+    """Statements creating the search index and its triggers, if there are searchable columns"""
+    if not searchable_tables(spec_tables):
+        return []
+    return [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_KEYS_TABLE} (\n"
+        f"    id INTEGER PRIMARY KEY,\n"
+        f"    table_name TEXT NOT NULL,\n"
+        f"    row_key TEXT NOT NULL,\n"
+        f"    UNIQUE (table_name, row_key));",
+        # prefix indexes make the prefix queries of the search box fast
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_INDEX_TABLE} USING fts5(\n"
+        f"    content, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3');",
+        *generate_search_triggers(spec_tables).values(),
+    ]
+
+def generate_search_rebuild(spec_tables: list[dict[str, Any]]) -> list[str]:
+    """Statements indexing again all the rows of the searchable tables"""
+    tables = {table['name']: table for table in spec_tables}
+    statements = [f"DELETE FROM {SEARCH_INDEX_TABLE};", f"DELETE FROM {SEARCH_KEYS_TABLE};"]
+    for table in searchable_tables(spec_tables):
+        name = table['name']
+        statements.append(
+            f"INSERT INTO {SEARCH_KEYS_TABLE} (table_name, row_key)"
+            f" SELECT '{name}', {search_key(table, 'r')} FROM {name} AS r;"
+        )
+        statements.append(
+            f"INSERT INTO {SEARCH_INDEX_TABLE} (rowid, content)"
+            f" SELECT k.id, {search_document(table, tables, 'r')} FROM {name} AS r"
+            f" JOIN {SEARCH_KEYS_TABLE} AS k"
+            f" ON k.table_name = '{name}' AND k.row_key = {search_key(table, 'r')};"
+        )
+    return statements
+
 def generate_sqlite_ddl(spec_file: Path) -> str:
     """Generate complete SQLite DDL from spec file."""
-    with open(spec_file, encoding='utf-8') as f:
-        spec = yaml.safe_load(f)['DatabaseSpec']
+    spec = load_yaml_file(spec_file, cache_dir=params.get('YAML_CACHE_DIR'))['DatabaseSpec']
+    return generate_spec_ddl(spec)
 
+def generate_spec_ddl(spec: dict[str, Any]) -> str:
+    """Generate complete SQLite DDL from the DatabaseSpec content of a spec."""
     statements = [
         "-- Generated SQLite DDL",
         "PRAGMA encoding = 'UTF-8';",
@@ -92,6 +246,11 @@ def generate_sqlite_ddl(spec_file: Path) -> str:
         statements.append(generate_create_table(table))
         statements.append("")
 
+    # Full text search index
+    for statement in generate_search_ddl(spec['tables']):
+        statements.append(statement)
+        statements.append("")
+
     return '\n'.join(statements)
 
 def main() -> None:
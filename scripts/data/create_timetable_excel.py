@@ -4,8 +4,6 @@ Create an Excel file with sheets corresponding to the timetable tables,
 populated with data from the prolog facts.
 """
 
-import pandas as pd
-
 OUT_FILE = 'data/timetable.xlsx'
 
 #pylint: disable=too-many-locals,too-many-branches,too-many-statements
@@ -14,6 +12,8 @@ def create_timetable_excel():
     Generates an Excel file with sheets corresponding to the timetable tables,
     populated with data from the prolog facts.
     """
+    # pandas and openpyxl are only needed here
+    import pandas as pd  #pylint: disable=import-outside-toplevel
 
     # Data from prolog facts
     constantes_facts = [
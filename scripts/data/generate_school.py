@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic school, consistent with the timetable DB schema,
+scaled to any number of groups and teachers, for load testing.
+
+The school is written directly into a SQLite DB with bulk inserts,
+and optionally as Prolog facts, in the style of specs/timetable_base.pl,
+and as an Excel file with one sheet per table.
+The same seed always produces the same school.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+
+LECC_POR_SEM = 40
+LECC_POR_DIA = 8
+# subject -> weekly lessons range, 'resto' takes the remaining lessons of each group
+SUBJECTS = {
+    'edfís': (2, 2), 'infor': (1, 2), 'inglés': (6, 8), 'música': (1, 1),
+    'arte': (1, 1), 'ciencias': (3, 5), 'español': (4, 6), 'estsoc': (3, 5),
+    'ética': (1, 1), 'mate': (5, 7), 'francés': (0, 2),
+}
+DAYS = ['lun', 'mar', 'mie', 'jue', 'vie']
+BLOCKS = [1, 2, 3, 4]
+LESSONS = ['a', 'b']
+
+# column order of each table, as in scripts/DDL/tt.sql, in FK-safe insertion order
+TABLE_COLUMNS = {
+    'constantes': ['name', 'value'],
+    'grupos': ['id', 'nombre'],
+    'materias': ['id', 'nombre'],
+    'profesores': ['id', 'nombre'],
+    'grupo_materias': ['id', 'grupo_id', 'materia_id', 'lecciones'],
+    'prof_grupo_materias': ['profesor_id', 'grupo_id', 'materia_id'],
+    'dias': ['id', 'nombre'],
+    'bloques': ['id', 'nombre'],
+    'lecciones': ['id', 'nombre'],
+    'disponibilidad_profesores': ['profesor_id', 'dia_id', 'bloque_id', 'leccion_id'],
+}
+
+
+def generate_school(n_groups, n_teachers, seed=0, part_time=0.25):
+    """
+    Generate the rows of every table of a school.
+
+    Every group takes lessons of every subject adding up to LECC_POR_SEM,
+    every teacher specializes in one or two subjects and teaches them to groups,
+    part_time of the teachers are only available on some days,
+    the others are available on every slot.
+
+    Returns:
+        table name -> list of row tuples, in TABLE_COLUMNS order
+    """
+    rng = random.Random(seed)
+    subjects = [*SUBJECTS, 'resto']
+    school = {
+        'constantes': [('lecc_por_sem', LECC_POR_SEM), ('lecc_por_dia', LECC_POR_DIA)],
+        'grupos': [(i, f"g{i:04d}") for i in range(1, n_groups + 1)],
+        'materias': [(i, name) for i, name in enumerate(subjects, 1)],
+        'profesores': [(i, f"p{i:05d}") for i in range(1, n_teachers + 1)],
+        'dias': [(i, name) for i, name in enumerate(DAYS, 1)],
+        'bloques': [(i, name) for i, name in enumerate(BLOCKS, 1)],
+        'lecciones': [(i, name) for i, name in enumerate(LESSONS, 1)],
+    }
+
+    # lessons of each subject per group
+    grupo_materias = []
+    for grupo_id, _ in school['grupos']:
+        lessons = {subject: rng.randint(*SUBJECTS[subject]) for subject in SUBJECTS}
+        lessons['resto'] = LECC_POR_SEM - sum(lessons.values())
+        for materia_id, subject in school['materias']:
+            if lessons[subject] > 0:
+                grupo_materias.append(
+                    (len(grupo_materias) + 1, grupo_id, materia_id, lessons[subject])
+                )
+    school['grupo_materias'] = grupo_materias
+
+    # teachers specialize in subjects and get the groups of their subjects round robin
+    specialists = {materia_id: [] for materia_id, _ in school['materias']}
+    for profesor_id, _ in school['profesores']:
+        for materia_id in rng.sample(sorted(specialists), rng.choice([1, 1, 2])):
+            specialists[materia_id].append(profesor_id)
+    for materia_id, teachers in specialists.items():
+        if not teachers:
+            teachers.append(rng.randint(1, n_teachers))
+    assigned = {materia_id: 0 for materia_id in specialists}
+    prof_grupo_materias = []
+    for _, grupo_id, materia_id, _ in grupo_materias:
+        teachers = specialists[materia_id]
+        prof_grupo_materias.append(
+            (teachers[assigned[materia_id] % len(teachers)], grupo_id, materia_id)
+        )
+        assigned[materia_id] += 1
+    school['prof_grupo_materias'] = prof_grupo_materias
+
+    slots = [(dia_id, bloque_id, leccion_id)
+             for dia_id, _ in school['dias']
+             for bloque_id, _ in school['bloques']
+             for leccion_id, _ in school['lecciones']]
+    disponibilidad = []
+    for profesor_id, _ in school['profesores']:
+        if rng.random() < part_time:
+            days = set(rng.sample(range(1, len(DAYS) + 1), rng.randint(1, 3)))
+            disponibilidad.extend(
+                (profesor_id, *slot) for slot in slots if slot[0] in days
+            )
+        else:
+            disponibilidad.extend((profesor_id, *slot) for slot in slots)
+    school['disponibilidad_profesores'] = disponibilidad
+
+    return school
+
+
+def write_sqlite(school, db_file, sql_file='scripts/DDL/tt.sql'):
+    """Create db_file with the schema in sql_file and bulk insert the school into it"""
+    if os.path.exists(db_file):
+        os.remove(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        with open(sql_file, 'r', encoding='utf-8') as f:
+            conn.executescript(f.read())
+        # a fresh file can be rebuilt if anything fails, so skip the journal
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        with conn:
+            for table, columns in TABLE_COLUMNS.items():
+                placeholders = ', '.join(['?'] * len(columns))
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    school[table]
+                )
+    finally:
+        conn.close()
+
+
+def to_prolog(school):
+    """Convert the school to Prolog facts, in the style of specs/timetable_base.pl"""
+    names = {
+        table: dict(school[table])
+        for table in ('grupos', 'materias', 'profesores')
+    }
+    lines = [f"{name}({value})." for name, value in school['constantes']]
+    lines += [f"grupo({i}, {name})." for i, name in school['grupos']]
+    lines += [f"prof({i}, {name})." for i, name in school['profesores']]
+    lines += [f"materia({i}, {name})." for i, name in school['materias']]
+    lines += [
+        f"grupo_materia_lecciones({i}, {names['grupos'][grupo_id]},"
+        f" {names['materias'][materia_id]}, {lecciones})."
+        for i, grupo_id, materia_id, lecciones in school['grupo_materias']
+    ]
+    lines += [
+        f"prof_grupo_materia({names['profesores'][profesor_id]},"
+        f" {names['grupos'][grupo_id]}, {names['materias'][materia_id]})."
+        for profesor_id, grupo_id, materia_id in school['prof_grupo_materias']
+    ]
+    lines += [f"dia({i}, {name})." for i, name in school['dias']]
+    lines += [f"bloque({i}, {name})." for i, name in school['bloques']]
+    lines += [f"leccion({i}, {name})." for i, name in school['lecciones']]
+    lines += [
+        f"disp_prof_dia_bloque_leccion({names['profesores'][profesor_id]},"
+        f" {dia_id}, {bloque_id}, {leccion_id})."
+        for profesor_id, dia_id, bloque_id, leccion_id in school['disponibilidad_profesores']
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def write_excel(school, filename):
+    """Write the school to an Excel file with one sheet per table"""
+    import pandas as pd  #pylint: disable=import-outside-toplevel
+
+    with pd.ExcelWriter(filename) as writer:
+        for table, columns in TABLE_COLUMNS.items():
+            pd.DataFrame(school[table], columns=columns).to_excel(
+                writer, sheet_name=table, index=False
+            )
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Generate a synthetic school for load testing.')
+    parser.add_argument('db_file', help='Path for the output SQLite database file')
+    parser.add_argument('--groups', type=int, default=300, help='number of groups')
+    parser.add_argument('--teachers', type=int, default=2000, help='number of teachers')
+    parser.add_argument('--part-time', type=float, default=0.25,
+                        help='fraction of teachers only available on some days')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--sql-file', default='scripts/DDL/tt.sql',
+                        help='Path to the SQL schema file')
+    parser.add_argument('--prolog', help='also write the Prolog facts to this file')
+    parser.add_argument('--excel', help='also write the tables to this Excel file')
+    args = parser.parse_args()
+
+    school = generate_school(args.groups, args.teachers, args.seed, args.part_time)
+    write_sqlite(school, args.db_file, args.sql_file)
+    if args.prolog:
+        with open(args.prolog, 'w', encoding='utf-8') as f:
+            f.write(to_prolog(school))
+    if args.excel:
+        write_excel(school, args.excel)
+
+    rows = sum(len(school[table]) for table in TABLE_COLUMNS)
+    print(f"School with {args.groups} groups, {args.teachers} teachers"
+          f" and {rows} rows written to {args.db_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
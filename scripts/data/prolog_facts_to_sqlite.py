@@ -1,342 +1,632 @@
 #!/usr/bin/env python3
-"""Load Prolog facts into SQLite database."""
-
+"""
+Load Prolog facts into SQLite databases.
+
+The prolog entry of each table of the YAML spec declares the predicate loaded
+into the table, the column of each argument, and the foreign key arguments given
+by the name of the referenced row, see specs/db_spec_schema.yaml.
+Besides facts, the generator rules of a predicate are expanded when their body
+only enumerates values with member/2 or with facts of other predicates, e.g.
+    disp_prof_dia_bloque_leccion(alonso, 3, B, L) :- bloque(B, _), leccion(L, _).
+Other rules are skipped with a warning.
+
+Many files, e.g. one per school, are parsed in parallel by a process pool, and
+loaded each into its own DB, or merged into a single DB by one bulk writer.
+Merging is meant for partial files of one school: facts of different files
+giving other values to the same key, as distinct schools do, are rejected.
+
+A hash of the rows of each table is stored in the load_hashes table, so that
+loading into an existing DB only upserts and deletes the rows of the tables
+whose facts changed, unless --full is given.
+"""
+
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 import argparse
+import hashlib
 import os
+from pathlib import Path
 import re
 import sqlite3
 import sys
 
-#pylint: disable=too-many-locals
-def extract_facts(prolog_file):
-    """Extract Prolog facts from the specified Prolog file"""
-
-    # Dictionary to store all extracted facts
-    facts = {
-        'constantes': [],
-        'grupos': [],
-        'materias': [],
-        'profesores': [],
-        'grupo_materias': [],
-        'dias': [],
-        'bloques': [],
-        'lecciones': []
-    }
-
-    # Read the prolog file
+from config.params import params
+from src.utils.yaml_loader import load_yaml_file
+
+# --- Prolog parsing ---
+Var = namedtuple('Var', 'name')
+Term = namedtuple('Term', 'name args')
+Rule = namedtuple('Rule', 'head body')     # head Term, body list of Terms, None if unsupported
+
+
+class Clauses(namedtuple('Clauses', 'facts rules')):
+    """
+    facts: (predicate, arity) -> list of argument tuples
+    rules: (predicate, arity) -> list of Rules
+    """
+
+
+# quoted atoms are kept whole, so that they may contain % and .
+QUOTED = r"'(?:[^'\\]|\\.)*'"
+COMMENT = re.compile(rf"({QUOTED})|%[^\n]*|/\*.*?\*/", re.S)
+CLAUSE = re.compile(rf"((?:{QUOTED}|[^'])*?)\.(?=\s|\Z)", re.S)
+# most clauses are ground facts with atomic arguments, parsed without the tokenizer
+FACT = re.compile(r"([^\W\d_A-Z]\w*)\(([^()\[\]'\"]*)\)", re.S)
+INTEGER = re.compile(r"-?\d+")
+FLOAT = re.compile(r"-?\d+\.\d+")
+TOKEN = re.compile(rf"""
+    \s*(?:
+      (?P<number>-?\d+(?:\.\d+)?)
+    | (?P<quoted>{QUOTED})
+    | (?P<var>[A-Z_]\w*)
+    | (?P<atom>[^\W\d_A-Z]\w*|[-+*/\\^<>=~:.?@#&$]+)
+    | (?P<punct>[(),\[\]|])
+    )""", re.X)
+
+
+def atomic(text):
+    """Python value of an atomic argument: int, float or atom string"""
+    if INTEGER.fullmatch(text):
+        return int(text)
+    if FLOAT.fullmatch(text):
+        return float(text)
+    return text
+
+
+def tokenize(text):
+    """(kind, text) tokens of a clause"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Cannot parse: {text[position:position + 20]!r}")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+def parse_term(tokens, i):
+    """Term starting at tokens[i], and the index after it"""
+    kind, text = tokens[i]
+    if kind == 'number':
+        return atomic(text), i + 1
+    if kind == 'quoted':
+        return text[1:-1].replace("\\'", "'").replace("''", "'"), i + 1
+    if kind == 'var':
+        return Var(text), i + 1
+    if kind == 'punct' and text == '[':
+        items, i = parse_arguments(tokens, i + 1, ']')
+        return list(items), i
+    if kind == 'atom':
+        if i + 1 < len(tokens) and tokens[i + 1] == ('punct', '('):
+            args, i = parse_arguments(tokens, i + 2, ')')
+            return Term(text, args), i
+        return text, i + 1
+    raise ValueError(f"Unexpected {text!r}")
+
+
+def parse_arguments(tokens, i, closing):
+    """Comma separated terms up to the closing bracket, and the index after it"""
+    args = []
+    if tokens[i] == ('punct', closing):
+        return (), i + 1
+    while True:
+        arg, i = parse_term(tokens, i)
+        args.append(arg)
+        if tokens[i] == ('punct', closing):
+            return tuple(args), i + 1
+        if tokens[i] != ('punct', ','):
+            raise ValueError(f"Unexpected {tokens[i][1]!r}")
+        i += 1
+
+
+def split_top_level(tokens, separator):
+    """Split tokens at the separator tokens outside brackets"""
+    parts, current, depth = [], [], 0
+    for token in tokens:
+        if token[0] == 'punct' and token[1] in '([':
+            depth += 1
+        elif token[0] == 'punct' and token[1] in ')]':
+            depth -= 1
+        if depth == 0 and token == separator:
+            parts.append(current)
+            current = []
+        else:
+            current.append(token)
+    parts.append(current)
+    return parts
+
+
+def parse_goal(tokens):
+    """Term of a body goal, or None if it is not a plain term"""
+    try:
+        goal, end = parse_term(tokens, 0)
+    except (ValueError, IndexError):
+        return None
+    return goal if end == len(tokens) else None
+
+
+def is_ground(args):
+    return not any(isinstance(arg, Var) or (isinstance(arg, list) and not is_ground(arg))
+                   for arg in args)
+
+
+def parse_prolog(content):
+    """Facts and rules of Prolog source code; directives and unparsable clauses are skipped"""
+    facts, rules = defaultdict(list), defaultdict(list)
+    content = COMMENT.sub(lambda match: match.group(1) or '', content)
+    for match in CLAUSE.finditer(content):
+        clause = match.group(1).strip()
+        fact = FACT.fullmatch(clause)
+        if fact:
+            args = tuple(atomic(arg.strip()) for arg in fact.group(2).split(','))
+            # arguments starting uppercase or with _ are variables, left to the term parser
+            if not any(isinstance(arg, str) and (arg[:1].isupper() or arg[:1] == '_')
+                       for arg in args):
+                facts[(fact.group(1), len(args))].append(args)
+                continue
+        try:
+            tokens = tokenize(clause)
+        except ValueError:
+            continue
+        if not tokens or tokens[0] == ('atom', ':-'):
+            continue
+        head_tokens, *body = split_top_level(tokens, ('atom', ':-'))
+        head = parse_goal(head_tokens)
+        if isinstance(head, str):
+            head = Term(head, ())
+        if not isinstance(head, Term):
+            continue
+        if not body:
+            if is_ground(head.args):
+                facts[(head.name, len(head.args))].append(head.args)
+            continue
+        goals = [parse_goal(goal) for goal in split_top_level(body[0], ('punct', ','))]
+        rules[(head.name, len(head.args))].append(
+            Rule(head, None if None in goals else goals)
+        )
+    return Clauses(dict(facts), dict(rules))
+
+
+def parse_prolog_file(prolog_file):
+    """Facts and rules of a Prolog file"""
     with open(prolog_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Extract constantes
-    lecc_por_sem_match = re.search(r'lecc_por_sem\((\d+)\)', content)
-    lecc_por_dia_match = re.search(r'lecc_por_dia\((\d+)\)', content)
-
-    if lecc_por_sem_match:
-        facts['constantes'].append(('lecc_por_sem', int(lecc_por_sem_match.group(1))))
-    if lecc_por_dia_match:
-        facts['constantes'].append(('lecc_por_dia', int(lecc_por_dia_match.group(1))))
-
-    # Extract grupos
-    grupo_pattern = r'grupo\((\d+),\s*(\w+)\)'
-    grupos_matches = re.findall(grupo_pattern, content)
-    facts['grupos'] = [(int(id), name) for id, name in grupos_matches]
-
-    # Extract profesores
-    prof_pattern = r'prof\((\d+),\s*(\w+)\)'
-    prof_matches = re.findall(prof_pattern, content)
-    facts['profesores'] = [(int(id), name) for id, name in prof_matches]
-
-    # Extract materias (directly from materia/2 predicate)
-    materia_pattern = r'materia\((\d+),\s*(\w+)\)'
-    materia_matches = re.findall(materia_pattern, content)
-    facts['materias'] = [(int(id), name) for id, name in materia_matches]
-
-    # Extract dias
-    dia_pattern = r'dia\((\d+),\s*(\w+)\)'
-    dia_matches = re.findall(dia_pattern, content)
-    facts['dias'] = [(int(id), name) for id, name in dia_matches]
-
-    # Extract bloques
-    bloque_pattern = r'bloque\((\d+),\s*(\d+)\)'
-    bloque_matches = re.findall(bloque_pattern, content)
-    facts['bloques'] = [(int(id), int(nombre)) for id, nombre in bloque_matches]
-
-    # Extract lecciones
-    leccion_pattern = r'leccion\((\d+),\s*(\w+)\)'
-    leccion_matches = re.findall(leccion_pattern, content)
-    facts['lecciones'] = [(int(id), name) for id, name in leccion_matches]
-
-    # Extract grupo_materia_lecciones
-    gml_pattern = r'grupo_materia_lecciones\((\d+),\s*(\w+|\d+),\s*(\w+),\s*(\d+)\)'
-    gml_matches = re.findall(gml_pattern, content)
-
-    # Convert grupo values if they are numeric strings
-    grupo_materia_facts = []
-    for gid, grupo, materia, lecciones in gml_matches:
-        if grupo.isdigit():
-            grupo = int(grupo)
-        grupo_materia_facts.append((int(gid), grupo, materia, int(lecciones)))
-
-    facts['grupo_materias'] = grupo_materia_facts
-
-    return facts
-
-#pylint: disable=too-many-statements,too-many-branches
-def create_and_load_database(prolog_file, sql_file, db_file):
-    """Create SQLite database and load data from Prolog facts"""
+        return parse_prolog(f.read())
+
+
+def merge_clauses(clauses_list):
+    """Facts and rules of many files, repeated facts only once"""
+    facts, rules = defaultdict(dict), defaultdict(list)
+    for clauses in clauses_list:
+        for key, args_list in clauses.facts.items():
+            facts[key].update(dict.fromkeys(args_list))
+        for key, key_rules in clauses.rules.items():
+            rules[key].extend(key_rules)
+    return Clauses({key: list(args) for key, args in facts.items()}, dict(rules))
+
+
+# --- Rule expansion ---
+def resolve(arg, binding):
+    """Value of arg in binding, or the unbound Var"""
+    return binding.get(arg.name, arg) if isinstance(arg, Var) and arg.name != '_' else arg
+
+
+def unify(args, values, binding):
+    """binding extended so that args match values, or None"""
+    binding = dict(binding)
+    for arg, value in zip(args, values):
+        arg = resolve(arg, binding)
+        if isinstance(arg, Var):
+            if arg.name != '_':
+                binding[arg.name] = value
+        elif arg != value:
+            return None
+    return binding
+
+
+def expand_rule(rule, facts):
+    """Argument tuples generated by a rule, or None if the rule is not supported"""
+    if rule.body is None:
+        return None
+    bindings = [{}]
+    for goal in rule.body:
+        if not isinstance(goal, Term):
+            return None
+        if goal.name == 'member' and len(goal.args) == 2 and isinstance(goal.args[1], list):
+            candidates = [((goal.args[0],), (value,)) for value in goal.args[1]]
+        elif (goal.name, len(goal.args)) in facts:
+            candidates = [(goal.args, values) for values in facts[(goal.name, len(goal.args))]]
+        else:
+            return None
+        bindings = [extended for binding in bindings for args, values in candidates
+                    if (extended := unify(args, values, binding)) is not None]
+    rows = [tuple(resolve(arg, binding) for arg in rule.head.args) for binding in bindings]
+    return rows if all(is_ground(row) for row in rows) else None
+
+
+def predicate_rows(clauses, predicate, arity):
+    """Argument tuples of a predicate, from its facts and expanded rules"""
+    rows = list(clauses.facts.get((predicate, arity), []))
+    for rule in clauses.rules.get((predicate, arity), []):
+        expanded = expand_rule(rule, clauses.facts)
+        if expanded is None:
+            print(f"Warning: skipping a rule of {predicate}/{arity},"
+                  f" only member/2 and fact goals are expanded", file=sys.stderr)
+        else:
+            rows.extend(expanded)
+    return rows
+
+
+# --- Mapping to tables ---
+def load_spec_tables(spec_file=None):
+    """Tables of the spec with a prolog entry, in spec order, which is the foreign key order"""
+    spec = load_yaml_file(spec_file or params['tt_spec'], cache_dir=params.get('YAML_CACHE_DIR'))
+    return [table for table in spec['DatabaseSpec']['tables'] if 'prolog' in table]
+
+
+def table_columns(table):
+    """Columns loaded into a table, in row order"""
+    prolog = table['prolog']
+    return ([prolog['name_column']] if 'name_column' in prolog else []) + prolog['columns']
+
+
+def foreign_key_reference(table, column):
+    """(referenced table, referenced column) of a single column foreign key"""
+    for constraint in table.get('constraints', []):
+        if constraint['type'] == 'FOREIGN KEY' and constraint['columns'] == [column]:
+            return constraint['references']['table'], constraint['references']['columns'][0]
+    raise ValueError(f"{table['name']}.{column} is a lookup but not a foreign key")
+
+
+def map_tables(tables, clauses):
+    """
+    Rows of each table mapped from the clauses, with the names of the lookup
+    arguments resolved to the referenced ids; rows with unknown names are skipped
+
+    Returns:
+        table name -> list of row tuples, in table_columns order
+    """
+    result = {}
+    for table in tables:
+        prolog = table['prolog']
+        predicates = prolog['predicate']
+        if isinstance(predicates, str):
+            predicates = [predicates]
+        lookups = {}
+        for column, name_column in prolog.get('lookups', {}).items():
+            ref_table, ref_column = foreign_key_reference(table, column)
+            ref_columns = table_columns(next(t for t in tables if t['name'] == ref_table))
+            name_index, id_index = ref_columns.index(name_column), ref_columns.index(ref_column)
+            # names compared as text, as stored in the DB, so that 1 matches '1'
+            lookups[prolog['columns'].index(column)] = {
+                str(row[name_index]): row[id_index] for row in result[ref_table]
+            }
+
+        rows, skipped = [], 0
+        for predicate in predicates:
+            for args in predicate_rows(clauses, predicate, prolog['arity']):
+                row = list(args)
+                for index, ids in lookups.items():
+                    row[index] = ids.get(str(row[index]))
+                if any(row[index] is None for index in lookups):
+                    skipped += 1
+                    continue
+                rows.append((predicate, *row) if 'name_column' in prolog else tuple(row))
+        if skipped:
+            print(f"Warning: {skipped} {table['name']} rows skipped, referencing unknown names",
+                  file=sys.stderr)
+        result[table['name']] = rows
+    return result
+
+
+def table_keys(table):
+    """Column lists of the primary key and unique constraints of a spec table"""
+    keys = [constraint['columns'] for constraint in table.get('constraints', [])
+            if constraint['type'] in ('PRIMARY KEY', 'UNIQUE')]
+    return keys + [[column['name']] for column in table['columns'] if column.get('unique')]
+
+
+def check_keys(tables, tables_rows):
+    """
+    Check that no two rows of a table share a key
+
+    Raises:
+        ValueError: naming the first table and key shared, e.g. by the facts of distinct schools
+    """
+    for table in tables:
+        columns = table_columns(table)
+        for key in table_keys(table):
+            if not set(key) <= set(columns):
+                continue
+            indexes = [columns.index(column) for column in key]
+            seen = {}
+            for row in tables_rows.get(table['name'], []):
+                other = seen.setdefault(tuple(row[index] for index in indexes), row)
+                if other != row:
+                    raise ValueError(
+                        f"{table['name']} rows {other} and {row} share the key"
+                        f" ({', '.join(key)}); only partial files of one school can be merged,"
+                        f" load distinct schools each into its own DB")
+
+
+def extract_facts(prolog_file, spec_file=None):
+    """
+    Extract the rows of each table from the specified Prolog file
+
+    Returns:
+        table name -> list of row tuples, in table_columns order
+    """
+    return map_tables(load_spec_tables(spec_file), parse_prolog_file(prolog_file))
+
+
+# --- Loading ---
+# hash of the rows loaded into each table, and of the schema under SCHEMA_KEY,
+# so that loading again only applies the tables whose facts changed
+HASHES_TABLE = 'load_hashes'
+HASHES_DDL = f"""
+CREATE TABLE IF NOT EXISTS {HASHES_TABLE} (
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (name)
+    );
+"""
+SCHEMA_KEY = '<schema>'
+
+
+def content_hash(*values):
+    """Hex digest of values made of ints, floats and strings, in tuples and lists"""
+    return hashlib.sha256(repr(values).encode('utf-8')).hexdigest()
+
+
+def primary_key(table):
+    """Primary key columns of a spec table"""
+    for constraint in table.get('constraints', []):
+        if constraint['type'] == 'PRIMARY KEY':
+            return constraint['columns']
+    raise ValueError(f"{table['name']} has no primary key")
+
+
+def stored_hashes(conn):
+    """name -> hash of the last load, empty if the DB was not loaded by this script"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                        (HASHES_TABLE,)).fetchone():
+        return {}
+    return dict(conn.execute(f"SELECT name, hash FROM {HASHES_TABLE}"))
+
+
+def stage_rows(conn, table, rows):
+    """
+    Copy the rows of a table into a temp table of the same columns
+
+    Returns:
+        the temp table staging the rows
+    """
+    name, columns = table['name'], table_columns(table)
+    staged = f"temp.load_{name}"
+    conn.execute(f"CREATE TEMP TABLE load_{name} AS SELECT {', '.join(columns)}"
+                 f" FROM {name} LIMIT 0")
+    conn.executemany(f"INSERT INTO {staged} VALUES ({', '.join('?' * len(columns))})", rows)
+    return staged
+
+
+def upsert_rows(conn, table, staged):
+    """Insert the staged rows of a table, updating the existing rows only if they differ"""
+    name, columns, keys = table['name'], table_columns(table), primary_key(table)
+    others = [column for column in columns if column not in keys]
+    if others:
+        values = ', '.join(f"excluded.{column}" for column in others)
+        update = (f"DO UPDATE SET ({', '.join(others)}) = ({values})"
+                  f" WHERE ({', '.join(others)}) IS NOT ({values})")
+    else:
+        update = "DO NOTHING"
+    # WHERE true: an INSERT ... SELECT needs it to parse its ON CONFLICT clause
+    conn.execute(f"INSERT INTO {name} ({', '.join(columns)})"
+                 f" SELECT * FROM {staged} WHERE true ON CONFLICT ({', '.join(keys)}) {update}")
+
+
+def foreign_key_violations(conn, parents):
+    """(child table, parent table) -> count of the rows referencing missing rows of the parents"""
+    children = [row[0] for row in conn.execute(
+        "SELECT DISTINCT m.name FROM sqlite_master m, pragma_foreign_key_list(m.name) f"
+        f" WHERE m.type = 'table' AND f.\"table\" IN ({', '.join('?' * len(parents))})",
+        parents)]
+    counts = defaultdict(int)
+    for child in children:
+        for _table, _rowid, parent, _fkid in conn.execute(f"PRAGMA foreign_key_check({child})"):
+            if parent in parents:
+                counts[(child, parent)] += 1
+    return counts
+
+
+def update_tables(conn, tables, tables_rows, hashes):
+    """
+    Make the rows of the tables those given, in one transaction:
+    delete the rows that are gone in reverse foreign key order, children first,
+    so that a row renumbered keeping a unique value does not clash with its old key,
+    then upsert the rows in foreign key order, parents first
+
+    Raises:
+        ValueError: naming the tables whose rows, e.g. of tables not loaded from the facts,
+            still reference deleted rows; nothing is written then
+    """
+    parents = [table['name'] for table in tables]
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("BEGIN")
+    with conn:
+        # the rows already referencing missing rows, not blocking the commit
+        violations = foreign_key_violations(conn, parents)
+        # a child row may move to a new parent, so the foreign keys are checked on commit
+        conn.execute("PRAGMA defer_foreign_keys = ON")
+        staged = {table['name']: stage_rows(conn, table, tables_rows.get(table['name'], []))
+                  for table in tables}
+        for table in reversed(tables):
+            keys = ', '.join(primary_key(table))
+            conn.execute(f"DELETE FROM {table['name']} WHERE ({keys}) NOT IN"
+                         f" (SELECT {keys} FROM {staged[table['name']]})")
+        for table in tables:
+            try:
+                upsert_rows(conn, table, staged[table['name']])
+            except sqlite3.Error as e:
+                print(f"Error updating {table['name']}: {e}", file=sys.stderr)
+                raise
+            conn.execute(f"DROP TABLE {staged[table['name']]}")
+        # checked before the commit, which would fail without naming them
+        blocking = [f"{count - violations[(child, parent)]} {child} rows reference"
+                    f" deleted {parent} rows"
+                    for (child, parent), count in foreign_key_violations(conn, parents).items()
+                    if count > violations[(child, parent)]]
+        if blocking:
+            raise ValueError(f"Cannot update the database: {'; '.join(sorted(blocking))};"
+                             f" delete them, or load the facts with --full")
+        conn.executemany(f"INSERT OR REPLACE INTO {HASHES_TABLE} VALUES (?, ?)",
+                         [(table['name'], hashes[table['name']]) for table in tables])
+
+
+def write_database(tables_rows, sql_file, db_file, spec_file=None, incremental=False):
+    """
+    Create db_file with the sql_file schema, and insert the rows in one transaction.
+
+    With incremental, a DB previously loaded by this script with the same schema
+    is updated instead, only applying the tables whose rows changed since.
+    Changes made to the other tables since the last load are kept.
+
+    Returns:
+        the names of the tables written
+    """
+    tables = load_spec_tables(spec_file)
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        schema = f.read()
+    hashes = {table['name']: content_hash(table_columns(table), tables_rows.get(table['name'], []))
+              for table in tables}
+    hashes[SCHEMA_KEY] = content_hash(schema)
+
+    if incremental and os.path.exists(db_file):
+        conn = sqlite3.connect(db_file)
+        try:
+            stored = stored_hashes(conn)
+            if stored.get(SCHEMA_KEY) == hashes[SCHEMA_KEY]:
+                changed = [table for table in tables
+                           if stored.get(table['name']) != hashes[table['name']]]
+                if changed:
+                    update_tables(conn, changed, tables_rows, hashes)
+                names = [table['name'] for table in changed]
+                print(f"Database updated at {db_file},"
+                      f" changed tables: {', '.join(names) or 'none'}")
+                return names
+        finally:
+            conn.close()
 
     # Create directory for the database if it doesn't exist
     db_dir = os.path.dirname(db_file)
-    if db_dir and not os.path.exists(db_dir):
-        os.makedirs(db_dir)
+    if db_dir:
+        # also created by the workers loading the other files
+        os.makedirs(db_dir, exist_ok=True)
 
     # Delete existing database if it exists
     if os.path.exists(db_file):
         os.remove(db_file)
 
-    # Create connection to new database
     conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-
-    #pylint: disable=too-many-nested-blocks
     try:
-        # Read the SQL schema from the specified SQL file and execute it
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            sql_schema = f.read()
-
-        cursor.executescript(sql_schema)
-
-        # Extract facts from Prolog file
-        facts = extract_facts(prolog_file)
-
-        # Insert constantes
-        try:
-            cursor.executemany(
-                "INSERT INTO constantes (name, value) VALUES (?, ?)",
-                facts['constantes']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting constantes: {e}", file=sys.stderr)
-            raise
-
-        # Insert grupos
-        try:
-            cursor.executemany(
-                "INSERT INTO grupos (id, nombre) VALUES (?, ?)",
-                facts['grupos']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting grupos: {e}", file=sys.stderr)
-            raise
-
-        # Insert materias
-        try:
-            cursor.executemany(
-                "INSERT INTO materias (id, nombre) VALUES (?, ?)",
-                facts['materias']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting materias: {e}", file=sys.stderr)
-            raise
-
-        # Insert profesores
-        try:
-            cursor.executemany(
-                "INSERT INTO profesores (id, nombre) VALUES (?, ?)",
-                facts['profesores']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting profesores: {e}", file=sys.stderr)
-            raise
-
-        # Insert dias
-        try:
-            cursor.executemany(
-                "INSERT INTO dias (id, nombre) VALUES (?, ?)",
-                facts['dias']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting dias: {e}", file=sys.stderr)
-            raise
-
-        # Insert bloques
-        try:
-            cursor.executemany(
-                "INSERT INTO bloques (id, nombre) VALUES (?, ?)",
-                facts['bloques']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting bloques: {e}", file=sys.stderr)
-            raise
-
-        # Insert lecciones
-        try:
-            cursor.executemany(
-                "INSERT INTO lecciones (id, nombre) VALUES (?, ?)",
-                facts['lecciones']
-            )
-        except sqlite3.Error as e:
-            print(f"Error inserting lecciones: {e}", file=sys.stderr)
-            raise
-
-        # Create mappings for foreign key references
-        grupo_mapping = {}
-        for gid, nombre in facts['grupos']:
-            grupo_mapping[nombre] = gid
-
-        materia_mapping = {nombre: id for id, nombre in facts['materias']}
-        profesor_mapping = {nombre: id for id, nombre in facts['profesores']}
-        dia_mapping = {nombre: id for id, nombre in facts['dias']}
-        bloque_mapping = {nombre: id for id, nombre in facts['bloques']}
-        leccion_mapping = {nombre: id for id, nombre in facts['lecciones']}
-
-        # Insert grupo_materias with proper foreign keys
-        for gid, grupo, materia, lecciones in facts['grupo_materias']:
-            # Get grupo_id from mapping
-            grupo_id = grupo_mapping.get(grupo)
-
-            materia_id = materia_mapping.get(materia)
-
-            if grupo_id is not None and materia_id is not None:
+        conn.executescript(schema + HASHES_DDL)
+        with conn:
+            for table in tables:
+                columns = table_columns(table)
                 try:
-                    cursor.execute(
-                        "INSERT INTO grupo_materias"
-                        " (id, grupo_id, materia_id, lecciones) VALUES (?, ?, ?, ?)",
-                        (gid, grupo_id, materia_id, lecciones)
+                    conn.executemany(
+                        f"INSERT INTO {table['name']} ({', '.join(columns)})"
+                        f" VALUES ({', '.join('?' * len(columns))})",
+                        tables_rows.get(table['name'], [])
                     )
                 except sqlite3.Error as e:
-                    print(f"Error inserting grupo_materias {gid}: {e}", file=sys.stderr)
+                    print(f"Error inserting {table['name']}: {e}", file=sys.stderr)
                     raise
-
-        # Extract prof_grupo_materia relations
-        with open(prolog_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        pgm_pattern = r'prof_grupo_materia\((\w+),\s*(\w+|\d+),\s*(\w+)\)'
-        pgm_matches = re.findall(pgm_pattern, content)
-
-        # For each prof_grupo_materia relation
-        for profesor, grupo, materia in pgm_matches:
-            profesor_id = profesor_mapping.get(profesor)
-
-            # Handle grupo which could be a string or a number
-            if grupo.isdigit():
-                grupo_id = grupo_mapping.get(int(grupo))
-            else:
-                grupo_id = grupo_mapping.get(grupo)
-
-            materia_id = materia_mapping.get(materia)
-
-            if profesor_id is not None and grupo_id is not None and materia_id is not None:
-                # Find the grupo_materias entry ID
-                try:
-                    cursor.execute(
-                        "INSERT INTO prof_grupo_materias"
-                        " (profesor_id, grupo_id, materia_id) VALUES (?, ?, ?)",
-                        (profesor_id, grupo_id, materia_id)
-                    )
-                except sqlite3.IntegrityError:
-                    print(
-                        f"IntegrityError processing prof_grupo_materia for"
-                        f" {profesor}, {grupo}, {materia}: {e}",
-                        file=sys.stderr
-                    )
-                    raise
-
-        # Create disponibilidad_profesores entries
-        # Extract disp_prof_dia_bloque_leccion rules from timetable_base.pl
-        disp_patterns = [
-            # Rule 1: angie on Wednesday (id=3) for all blocks and lessons
-            (profesor_mapping.get('angie'), [3], [1, 2, 3, 4], [1, 2]),
-            # Rule 2: mpaula on Mon(1), Tue(2), Thu(4) for all blocks and lessons
-            (profesor_mapping.get('mpaula'), [1, 2, 4], [1, 2, 3, 4], [1, 2]),
-            # Rule 3: alonso on Wednesday (id=3) for all blocks and lessons
-            (profesor_mapping.get('alonso'), [3], [1, 2, 3, 4], [1, 2]),
-            # Rule 4: All other professors for all days, blocks, and lessons
-            ([profesor_mapping.get(p) for p in ['melissa', 'jonathan', 'gina', 'audry', 'daleana',
-                                                'mayela', 'mjose', 'sol', 'alisson']],
-             [1, 2, 3, 4, 5], [1, 2, 3, 4], [1, 2])
-        ]
-
-        # Process the patterns
-        #pylint: disable=too-many-nested-blocks
-        for rule in disp_patterns:
-            prof_ids, dias, bloques, lecciones = rule
-
-            # Convert to lists if not already
-            if not isinstance(prof_ids, list):
-                prof_ids = [prof_ids]
-            if not isinstance(dias, list):
-                dias = [dias]
-            if not isinstance(bloques, list):
-                bloques = [bloques]
-            if not isinstance(lecciones, list):
-                lecciones = [lecciones]
-
-            # Generate all combinations
-            for prof_id in prof_ids:
-                for dia_id in dias:
-                    for bloque_id in bloques:
-                        for leccion_id in lecciones:
-                            if prof_id is not None:
-                                try:
-                                    cursor.execute(
-                                        "INSERT INTO disponibilidad_profesores"
-                                        " (profesor_id, dia_id, bloque_id, leccion_id) VALUES (?, ?, ?, ?)",
-                                        (prof_id, dia_id, bloque_id, leccion_id)
-                                    )
-                                except sqlite3.IntegrityError as e:
-                                    print(
-                                        f"IntegrityError inserting disponibilidad_profesores for"
-                                        f" {prof_id}, {dia_id}, {bloque_id}, {leccion_id}: {e}",
-                                        file=sys.stderr
-                                    )
-                                    raise
-                                except sqlite3.Error as e:
-                                    print(
-                                        f"Error inserting disponibilidad_profesores for"
-                                        f" {prof_id}, {dia_id}, {bloque_id}, {leccion_id}: {e}",
-                                        file=sys.stderr
-                                    )
-                                    raise
-
-        # Commit changes
-        conn.commit()
-        print(f"Database created and loaded successfully at {db_file}")
-
-    except Exception as e:
-        # Rollback in case of error
-        conn.rollback()
-        print(f"Error creating database: {e}", file=sys.stderr)
-        raise
+            conn.executemany(f"INSERT INTO {HASHES_TABLE} VALUES (?, ?)", hashes.items())
     finally:
-        # Close connection
         conn.close()
+    print(f"Database created and loaded successfully at {db_file}")
+    return [table['name'] for table in tables]
+
+
+def create_and_load_database(prolog_file, sql_file, db_file, spec_file=None, incremental=False):
+    """Create SQLite database and load data from Prolog facts, or update it with incremental"""
+    write_database(extract_facts(prolog_file, spec_file), sql_file, db_file, spec_file,
+                   incremental)
+    return db_file
+
+
+def load_prolog_files(prolog_files, sql_file, db_file, spec_file=None, per_file=False,
+                      workers=None, incremental=False):
+    """
+    Load many Prolog files in parallel, into one DB with their merged clauses,
+    or with per_file, each into its own DB named after the file, in the db_file directory.
+    Merging is meant for partial files of one school.
+
+    Returns:
+        the created DB files
+
+    Raises:
+        ValueError: if merged files give other values to the same key
+    """
+    with ProcessPoolExecutor(workers) as executor:
+        if per_file:
+            out_dir = Path(db_file)
+            db_files = [str(out_dir / f"{Path(prolog_file).stem}.db")
+                        for prolog_file in prolog_files]
+            count = len(db_files)
+            return list(executor.map(create_and_load_database, prolog_files,
+                                     [sql_file] * count, db_files, [spec_file] * count,
+                                     [incremental] * count))
+        clauses = merge_clauses(executor.map(parse_prolog_file, prolog_files))
+    tables = load_spec_tables(spec_file)
+    tables_rows = map_tables(tables, clauses)
+    check_keys(tables, tables_rows)
+    write_database(tables_rows, sql_file, db_file, spec_file, incremental)
+    return [db_file]
 
 
 def main():
     """Main logic"""
     parser = argparse.ArgumentParser(description='Load Prolog facts into SQLite database.')
-    parser.add_argument('prolog_file', help='Path to the Prolog facts file')
+    parser.add_argument('prolog_files', nargs='+', metavar='prolog_file',
+                        help='Path to a Prolog facts file')
     parser.add_argument('sql_file', help='Path to the SQL schema file')
-    parser.add_argument('db_file', help='Path for the output SQLite database file')
+    parser.add_argument('db_file',
+                        help='Path for the output SQLite database file,'
+                             ' or its directory with --per-file')
+    parser.add_argument('--per-file', action='store_true',
+                        help='load each Prolog file into its own database, named after it;'
+                             ' without it, the files are merged as partial files of one school')
+    parser.add_argument('--spec', help='YAML spec with the Prolog mapping, tt_spec by default')
+    parser.add_argument('--workers', type=int, help='parallel processes, one per CPU by default')
+    parser.add_argument('--full', action='store_true',
+                        help='create the databases again, instead of only applying'
+                             ' the tables whose facts changed since the last load')
 
     args = parser.parse_args()
 
     # Validate input files exist
-    if not os.path.isfile(args.prolog_file):
-        print(f"Error: Prolog file '{args.prolog_file}' does not exist", file=sys.stderr)
-        return 1
+    for prolog_file in args.prolog_files:
+        if not os.path.isfile(prolog_file):
+            print(f"Error: Prolog file '{prolog_file}' does not exist", file=sys.stderr)
+            return 1
 
     if not os.path.isfile(args.sql_file):
         print(f"Error: SQL file '{args.sql_file}' does not exist", file=sys.stderr)
         return 1
 
     try:
-        create_and_load_database(args.prolog_file, args.sql_file, args.db_file)
+        if len(args.prolog_files) == 1 and not args.per_file:
+            create_and_load_database(args.prolog_files[0], args.sql_file, args.db_file, args.spec,
+                                     incremental=not args.full)
+        else:
+            load_prolog_files(args.prolog_files, args.sql_file, args.db_file, args.spec,
+                              args.per_file, args.workers, incremental=not args.full)
         return 0
     except Exception as e:  #pylint: disable=broad-exception-caught
-        print(f"Error calling create_and_load_database: {str(e)}", file=sys.stderr)
+        print(f"Error loading the Prolog files: {str(e)}", file=sys.stderr)
         return 1
 
 if __name__ == "__main__":
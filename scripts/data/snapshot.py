@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+"""
+Columnar snapshots of the timetable DB, as one Arrow IPC or Parquet file per table.
+
+Every table defined in a YAML spec which follows the db_spec_schema.yaml is
+exported in one read transaction, with the column types taken from the spec.
+Arrow IPC files are written uncompressed, so that consumers can memory map them
+and read the columns without copying.
+A snapshot can be loaded back into a new SQLite DB with bulk inserts.
+
+Requires pyarrow.
+"""
+
+import argparse
+import os
+from pathlib import Path
+import sqlite3
+import sys
+from typing import Any
+
+from config.params import params
+from scripts.DDL.yaml2sql import generate_sqlite_ddl
+from src.utils.yaml_loader import load_yaml_file
+
+FORMATS = {'arrow': '.arrow', 'parquet': '.parquet'}
+
+
+def spec_tables(spec_file: Path) -> list[dict[str, Any]]:
+    """Tables of a spec, in definition order, which is also a FK-safe insertion order"""
+    spec = load_yaml_file(spec_file, cache_dir=params.get('YAML_CACHE_DIR'))
+    return spec['DatabaseSpec']['tables']
+
+
+def arrow_schema(table: dict[str, Any]):
+    """Arrow schema of a spec table"""
+    import pyarrow as pa    #pylint: disable=import-outside-toplevel
+
+    type_map = {
+        'string': pa.string(),
+        'number': pa.float64(),
+        'integer': pa.int64(),
+        'boolean': pa.bool_(),
+    }
+    return pa.schema([
+        pa.field(column['name'], type_map.get(column['type'], pa.string()),
+                 nullable=not column.get('not_null', False))
+        for column in table['columns']
+    ])
+
+
+def export_snapshot(spec_file: Path, db_file: Path, out_dir: Path, fmt: str = 'arrow') -> dict:
+    """
+    Export every spec table of db_file to out_dir, consistently.
+
+    Returns:
+        table name -> number of rows exported
+    """
+    import pyarrow as pa    #pylint: disable=import-outside-toplevel
+    import pyarrow.parquet as pq    #pylint: disable=import-outside-toplevel
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    conn = sqlite3.connect(db_file)
+    try:
+        # a single read transaction sees all the tables at the same point in time
+        conn.execute("BEGIN")
+        for table in spec_tables(spec_file):
+            schema = arrow_schema(table)
+            rows = conn.execute(f"SELECT {', '.join(schema.names)} FROM {table['name']}").fetchall()
+            columns = list(zip(*rows)) if rows else [[] for _ in schema.names]
+            arrow_table = pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            )
+            filename = out_dir / f"{table['name']}{FORMATS[fmt]}"
+            if fmt == 'parquet':
+                pq.write_table(arrow_table, filename)
+            else:
+                with pa.OSFile(str(filename), 'wb') as sink:
+                    with pa.ipc.new_file(sink, schema) as writer:
+                        writer.write_table(arrow_table)
+            counts[table['name']] = len(rows)
+        conn.rollback()
+    finally:
+        conn.close()
+    return counts
+
+
+def read_snapshot_table(filename: Path):
+    """Read a snapshot file as an Arrow table, memory mapped"""
+    import pyarrow as pa    #pylint: disable=import-outside-toplevel
+    import pyarrow.parquet as pq    #pylint: disable=import-outside-toplevel
+
+    if filename.suffix == FORMATS['parquet']:
+        return pq.read_table(filename, memory_map=True)
+    with pa.memory_map(str(filename), 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def snapshot_files(tables: list[dict[str, Any]], snapshot_dir: Path) -> dict[str, Path]:
+    """
+    Snapshot file of each table
+
+    Raises:
+        FileNotFoundError: if a table has no snapshot file
+    """
+    files = {}
+    for table in tables:
+        filenames = [snapshot_dir / f"{table['name']}{suffix}" for suffix in FORMATS.values()]
+        files[table['name']] = next((f for f in filenames if f.exists()), None)
+        if files[table['name']] is None:
+            raise FileNotFoundError(f"No snapshot file for table {table['name']}")
+    return files
+
+
+def load_snapshot(spec_file: Path, snapshot_dir: Path, db_file: Path) -> dict:
+    """
+    Create db_file with the spec tables and bulk insert a snapshot into it.
+
+    The DB is written to a temporary file renamed at the end,
+    so an existing db_file is only replaced once the snapshot is fully loaded.
+
+    Returns:
+        table name -> number of rows loaded
+    """
+    tables = spec_tables(spec_file)
+    files = snapshot_files(tables, snapshot_dir)
+    tmp_file = f"{db_file}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    counts = {}
+    try:
+        conn = sqlite3.connect(tmp_file)
+        try:
+            conn.executescript(generate_sqlite_ddl(spec_file))
+            # a fresh file can be rebuilt if anything fails, so skip the journal
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            with conn:
+                for table in tables:
+                    arrow_table = read_snapshot_table(files[table['name']])
+                    columns = arrow_table.schema.names
+                    placeholders = ', '.join(['?'] * len(columns))
+                    conn.executemany(
+                        f"INSERT INTO {table['name']} ({', '.join(columns)})"
+                        f" VALUES ({placeholders})",
+                        zip(*(column.to_pylist() for column in arrow_table.columns))
+                    )
+                    counts[table['name']] = arrow_table.num_rows
+        finally:
+            conn.close()
+        os.replace(tmp_file, db_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return counts
+
+
+def main() -> int:
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Columnar snapshots of the timetable DB.')
+    parser.add_argument('--spec-file', type=Path, default=Path(params['tt_spec']),
+                        help='Path to the YAML spec of the tables')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='export a DB to a snapshot')
+    export_parser.add_argument('db_file', type=Path, help='Path to the SQLite database file')
+    export_parser.add_argument('snapshot_dir', type=Path, help='Directory of the snapshot files')
+    export_parser.add_argument('--format', choices=FORMATS, default='arrow',
+                               help='snapshot file format')
+    load_parser = subparsers.add_parser('load', help='create a DB from a snapshot')
+    load_parser.add_argument('snapshot_dir', type=Path, help='Directory of the snapshot files')
+    load_parser.add_argument('db_file', type=Path, help='Path for the new SQLite database file')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'export':
+            counts = export_snapshot(args.spec_file, args.db_file, args.snapshot_dir, args.format)
+        else:
+            counts = load_snapshot(args.spec_file, args.snapshot_dir, args.db_file)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    for table, count in counts.items():
+        print(f"{table}: {count} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
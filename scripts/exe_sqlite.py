@@ -2,55 +2,137 @@
 
 """ Run a SQLite script """
 
+import argparse
 from pathlib import Path
-import re
 import sqlite3
 import sys
+import time
+from typing import Iterable, Iterator
 
 
 # con = sqlite3.connect("tutorial.db")
 # cur = con.cursor()
 # cur.execute("CREATE TABLE movie(title, year, score)")
 
-def run_script(db_file: Path):
-    """Run the commands in stdin, and apply them to db_file"""
-    # read commands
-    f = sys.stdin.read()
-    commands = re.split(r';\s*(?=\n|$)', f, maxsplit=0, flags=re.DOTALL)
-    commands = [cmd.strip() + ';' for cmd in commands if cmd.strip()]
-    if not commands:
-        print("empty cmd list", file=sys.stderr)
-        return
+# statements that manage transactions themselves or are no-ops inside one
+NO_TRANSACTION_PREFIXES = ('PRAGMA', 'BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'VACUUM')
+# statements that fail, or end the transaction, inside the batch, which is committed first
+END_BATCH_PREFIXES = ('BEGIN', 'COMMIT', 'END', 'ROLLBACK', 'VACUUM')
+
+
+def iter_statements(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Split a stream of SQL lines into complete statements, also those sharing a line,
+    holding only the current statement in memory
+    """
+    statement = ''
+    for line in lines:
+        while line:
+            # each ; may end the statement, unless it is in a string, comment or trigger body
+            end = line.find(';') + 1
+            if not end:
+                statement += line
+                break
+            statement += line[:end]
+            line = line[end:]
+            if sqlite3.complete_statement(statement):
+                # the end of line, or a trailing comment, stays with its statement
+                if not line.strip() or line.lstrip().startswith('--'):
+                    statement += line
+                    line = ''
+                yield statement.strip()
+                statement = ''
+    if statement.strip():
+        # an unterminated last statement is still run, so SQLite reports its error
+        yield statement.strip()
+
+
+def report(statement: str, elapsed: float, rows: int):
+    """Print the timing and row count of a statement"""
+    first_line = statement.splitlines()[0]
+    rows_str = f"{rows} rows" if rows >= 0 else "-"
+    print(f"{elapsed * 1000:10.2f} ms {rows_str:>12}  {first_line}")
+
 
-    # open connection
-    con = sqlite3.connect(db_file)
+def run_script(db_file: Path, per_statement: bool = False,
+               lines: Iterable[str] | None = None) -> bool:
+    """
+    Run the commands in lines (stdin by default), and apply them to db_file
 
-    # execute commands
-    for command in commands:
-        print(command)
-        try:
-            with con:
-                con.execute(command)
-        except Exception as e:  #pylint: disable=broad-exception-caught
-            print(f"Error: {str(e)}")
+    Args:
+        db_file: database to apply the commands to
+        per_statement: commit each statement on its own and keep going after errors,
+            instead of running all of them in one transaction that is rolled back on error
+        lines: the script lines
 
-    # close the connection
-    con.close()
+    Returns:
+        True if all the statements succeeded
+    """
+    if lines is None:
+        lines = sys.stdin
+    # open connection, transactions are handled here
+    con = sqlite3.connect(db_file, isolation_level=None)
+
+    count = 0
+    ok = True
+    # whether the transaction open was started here, not by the script
+    in_batch = False
+    start = time.perf_counter()
+    try:
+        # execute commands
+        for command in iter_statements(lines):
+            count += 1
+            if in_batch and command.upper().startswith(END_BATCH_PREFIXES):
+                con.execute("COMMIT")
+                in_batch = False
+            batched = not per_statement and not command.upper().startswith(NO_TRANSACTION_PREFIXES)
+            if batched and not con.in_transaction:
+                con.execute("BEGIN")
+                in_batch = True
+            statement_start = time.perf_counter()
+            try:
+                cursor = con.execute(command)
+                # fetch results so SELECT timings include reading the rows
+                rows = sum(1 for _ in cursor) if cursor.description else cursor.rowcount
+            except sqlite3.Error as e:
+                ok = False
+                print(f"Error: {str(e)}\n{command}")
+                if not per_statement:
+                    if con.in_transaction:
+                        con.execute("ROLLBACK")
+                    print("Transaction rolled back")
+                    break
+                continue
+            report(command, time.perf_counter() - statement_start, rows)
+
+        if con.in_transaction:
+            con.execute("COMMIT")
+    finally:
+        # close the connection
+        con.close()
+
+    if count == 0:
+        print("empty cmd list", file=sys.stderr)
+    else:
+        print(f"{count} statements in {(time.perf_counter() - start) * 1000:.2f} ms")
+    return ok
 
 
 def main():
     """Main logic"""
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <db_filename.db>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Run the SQLite script in stdin.')
+    parser.add_argument('db_file', type=Path, help='Path to the SQLite database file')
+    parser.add_argument('--per-statement', action='store_true',
+                        help='commit each statement on its own and continue after errors')
+    args = parser.parse_args()
 
-    db_file = Path(sys.argv[1])
-    if not db_file.exists():
-        print(f"Error: File {db_file} not found")
+    if not args.db_file.exists():
+        print(f"Error: File {args.db_file} not found")
         sys.exit(1)
 
-    run_script(db_file)
-    print(f"Done creating {db_file}")
+    if not run_script(args.db_file, args.per_statement):
+        sys.exit(1)
+    print(f"Done creating {args.db_file}")
 
 
 if __name__ == '__main__':
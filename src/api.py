@@ -0,0 +1,119 @@
+"""
+Read-only JSON API over the timetable database tables.
+
+Routes:
+    /api/            list of tables: those of the tt spec, as in the Dash app,
+                     not the search index nor the report summaries
+    /api/<table>     rows of a table, with foreign key descriptions,
+                     filtered by ?<column>=<value> and paginated by primary key
+                     with ?limit=<n>&cursor=<next cursor of the previous page>
+
+Responses carry an ETag derived from the database data version,
+so clients sending If-None-Match get a 304 while nothing has changed.
+"""
+
+import hashlib
+import json
+
+from flask import Blueprint, Response, request
+
+from config.params import params
+from scripts.DDL.yaml2sql import is_search_table
+from src.db import (
+    decode_cursor,
+    get_data_version,
+    get_primary_key,
+    get_table_names,
+    get_table_page,
+    get_table_schema,
+)
+from src.search import spec_tables
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+RESERVED_ARGS = ('limit', 'cursor')
+
+
+def json_response(doc, status=200):
+    """Build a compact JSON response"""
+    return Response(
+        json.dumps(doc, separators=(',', ':'), ensure_ascii=False),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def error_response(message, status):
+    """Build a JSON error response"""
+    return json_response({'error': message}, status)
+
+
+def compute_etag(*parts):
+    """Compute an ETag from the data version and the request parts"""
+    key = '\x1f'.join([get_data_version(), *map(str, parts)])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def conditional_response(etag, build_doc):
+    """
+    Return 304 if the client already has the etag version,
+    otherwise build the document and return it with its etag
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = json_response(build_doc())
+    response.set_etag(etag)
+    return response
+
+
+def get_api_tables():
+    """Spec tables of the database, in spec order, all of them keyed for the paging"""
+    db_tables = set(get_table_names())
+    return [name for name in spec_tables()
+            if name in db_tables and not is_search_table(name)]
+
+
+@api_bp.route('/')
+def list_tables():
+    """List the tables available through the API"""
+    etag = compute_etag('tables')
+    return conditional_response(etag, lambda: {'tables': get_api_tables()})
+
+
+@api_bp.route('/<table>')
+def get_table(table):
+    """Get rows of a table, with foreign key descriptions joined in"""
+    if table not in get_api_tables():
+        return error_response(f"Unknown table: {table}", 404)
+
+    column_names = [column['name'] for column in get_table_schema(table)]
+    filters = {}
+    for arg, value in request.args.items():
+        if arg in RESERVED_ARGS:
+            continue
+        if arg not in column_names:
+            return error_response(f"Unknown column for {table}: {arg}", 400)
+        filters[arg] = value
+
+    try:
+        limit = int(request.args.get('limit', params.get('API_PAGE_SIZE', 100)))
+    except ValueError:
+        return error_response("limit must be an integer", 400)
+    if not 0 < limit <= params.get('API_MAX_PAGE_SIZE', 1000):
+        return error_response("limit out of range", 400)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            decode_cursor(cursor, len(get_primary_key(table)))
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+    def build_doc():
+        page = get_table_page(table, limit, cursor, filters)
+        return {'table': table, 'columns': page.columns, 'rows': page.rows,
+                'next': page.next_cursor}
+
+    etag = compute_etag(table, sorted(request.args.items(multi=True)))
+    return conditional_response(etag, build_doc)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Online snapshots of the live timetable DB, driven by the BACKUP params.
+
+Snapshots are taken with the SQLite online backup API, copying a few pages
+per step and sleeping in between, so that writers are only blocked for short
+periods. As a write by another connection restarts the backup, after
+max_restarts restarts the rest is copied in a single step.
+The most recent snapshots are kept, the older ones deleted.
+A snapshot is restored by backing it up into the live DB in a single step,
+so that the connections open on it see the restored data.
+"""
+
+import argparse
+from datetime import datetime
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import sys
+import threading
+import time
+
+from config.params import params
+import src.db
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATTERN = '*.db'
+
+
+def get_settings():
+    """The BACKUP params, with defaults"""
+    settings = {
+        'dir': 'backups',
+        'pages': 256,         # pages copied per step
+        'sleep': 0.005,       # seconds between steps
+        'max_restarts': 3,    # restarts by concurrent writes before copying in one step
+        'interval': 0,        # seconds between scheduled snapshots, 0 to disable
+        'keep': 24,
+    }
+    settings.update(params.get('BACKUP') or {})
+    return settings
+
+
+class BackupRestarted(Exception):
+    """The backup restarted more often than allowed"""
+
+
+def backup_db(db_file, dest_file, pages=256, sleep=0.005, max_restarts=3):
+    """
+    Copy db_file to dest_file with the online backup API, in steps of pages,
+    or in a single step after max_restarts restarts by concurrent writes.
+
+    The copy is written to a temporary file renamed at the end,
+    so dest_file is never left half written.
+
+    Returns:
+        number of restarts
+    """
+    tmp_file = f"{dest_file}.tmp"
+    restarts = 0
+    last_remaining = None
+
+    def progress(_status, remaining, _total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > max_restarts:
+                raise BackupRestarted()
+        last_remaining = remaining
+
+    source = sqlite3.connect(db_file)
+    try:
+        dest = sqlite3.connect(tmp_file)
+        try:
+            try:
+                source.backup(dest, pages=pages, progress=progress, sleep=sleep)
+            except BackupRestarted:
+                source.backup(dest)
+        finally:
+            dest.close()
+        os.replace(tmp_file, dest_file)
+    finally:
+        source.close()
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return restarts
+
+
+def list_snapshots(backup_dir=None):
+    """Snapshot files, most recent first"""
+    backup_dir = Path(backup_dir or get_settings()['dir'])
+    return sorted(backup_dir.glob(SNAPSHOT_PATTERN), reverse=True)
+
+
+def prune_snapshots(keep, backup_dir=None):
+    """Delete all but the keep most recent snapshots, and return the deleted files"""
+    old = list_snapshots(backup_dir)[keep:]
+    for snapshot in old:
+        snapshot.unlink()
+    return old
+
+
+def create_snapshot(db_file=None, backup_dir=None):
+    """Snapshot the DB into the backup dir, applying the retention, and return its file"""
+    settings = get_settings()
+    db_file = db_file or src.db.get_db_file()
+    backup_dir = Path(backup_dir or settings['dir'])
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    # names sort in time order
+    snapshot = backup_dir / f"{Path(db_file).stem}-{datetime.now():%Y%m%d-%H%M%S-%f}.db"
+    backup_db(db_file, snapshot, settings['pages'], settings['sleep'], settings['max_restarts'])
+    prune_snapshots(settings['keep'], backup_dir)
+    return snapshot
+
+
+def restore_snapshot(snapshot, db_file=None):
+    """Replace the contents of the DB with those of a snapshot, in one step"""
+    source = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+    try:
+        dest = sqlite3.connect(db_file or src.db.get_db_file())
+        try:
+            source.backup(dest)
+        finally:
+            dest.close()
+    finally:
+        source.close()
+
+
+class BackupScheduler:
+    """Takes a snapshot every interval seconds, from a daemon thread"""
+
+    def __init__(self, interval, db_file=None, backup_dir=None):
+        self.interval = interval
+        self.db_file = db_file
+        self.backup_dir = backup_dir
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                create_snapshot(self.db_file, self.backup_dir)
+            except (sqlite3.Error, OSError) as e:
+                logger.error("Backup failed: %s", e)
+
+    def start(self):
+        """Start taking snapshots"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop taking snapshots"""
+        self._stop.set()
+        self._thread.join()
+
+
+def start_scheduler():
+    """Start the scheduled snapshots, if the BACKUP interval is set"""
+    interval = get_settings()['interval']
+    if not interval:
+        return None
+    scheduler = BackupScheduler(interval)
+    scheduler.start()
+    return scheduler
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(description='Online snapshots of the timetable DB.')
+    parser.add_argument('--db-file', help='SQLite database file, the app DB by default')
+    parser.add_argument('--dir', help='snapshot directory, the BACKUP dir param by default')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('create', help='take a snapshot now')
+    subparsers.add_parser('list', help='list the snapshots, most recent first')
+    restore_parser = subparsers.add_parser('restore', help='restore a snapshot')
+    restore_parser.add_argument('snapshot', nargs='?',
+                                help='snapshot file, the most recent by default')
+    schedule_parser = subparsers.add_parser('schedule', help='take snapshots periodically')
+    schedule_parser.add_argument('--interval', type=float,
+                                 help='seconds between snapshots, the BACKUP interval by default')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'create':
+            print(create_snapshot(args.db_file, args.dir))
+        elif args.command == 'list':
+            for snapshot in list_snapshots(args.dir):
+                print(snapshot)
+        elif args.command == 'restore':
+            snapshots = [args.snapshot] if args.snapshot else list_snapshots(args.dir)[:1]
+            if not snapshots:
+                print("Error: no snapshot to restore", file=sys.stderr)
+                return 1
+            restore_snapshot(snapshots[0], args.db_file)
+            print(f"Restored {snapshots[0]}")
+        else:
+            interval = args.interval or get_settings()['interval']
+            if not interval:
+                print("Error: no snapshot interval", file=sys.stderr)
+                return 1
+            while True:
+                print(create_snapshot(args.db_file, args.dir), flush=True)
+                time.sleep(interval)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
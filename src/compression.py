@@ -0,0 +1,35 @@
+"""
+Gzip compression of the server responses,
+for clients that accept it and responses of at least GZIP_MIN_BYTES.
+"""
+
+import gzip
+
+from flask import Blueprint, request
+
+from config.params import params
+
+compression_bp = Blueprint('compression', __name__)
+
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/plain', 'text/javascript',
+)
+
+
+@compression_bp.after_app_request
+def gzip_response(response):
+    """Compress the response body if worthwhile"""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'gzip' not in request.headers.get('Accept-Encoding', '').lower()):
+        return response
+    data = response.get_data()
+    if len(data) < params.get('GZIP_MIN_BYTES', 1024):
+        return response
+    response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,449 @@
+"""
+Data access layer for the timetable database.
+Shared by the Dash app and the REST API.
+"""
+
+import base64
+from collections import OrderedDict, namedtuple
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from config.params import params
+from src.metrics import InstrumentedConnection
+from src.query_cache import cached_read, close_query_cache
+from src.tenants import current_db_file
+
+# --- Database setup ---
+# database of the requests without a school, see src.tenants
+DB_FILE = params['DB_FILE']
+
+def get_db_file():
+    """Database file of the current school"""
+    return current_db_file.get() or DB_FILE
+
+# --- Connection pool ---
+class PooledConnection(InstrumentedConnection):
+    """Connection returned to its pool, instead of closed, by close()"""
+
+    pool = None
+    db_file = None
+    file_id = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def discard(self):
+        """Really close the connection"""
+        self.pool = None
+        super().close()
+
+class ConnectionPool:
+    """
+    Idle connections of each database file, at most max_idle in all,
+    closing those of the least recently used files first
+    """
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self._idle = OrderedDict()  # database file -> idle connections
+        self._lock = threading.Lock()
+
+    def acquire(self, db_file):
+        """An idle connection to db_file, or a new one"""
+        # a file replaced since the connection was opened has another inode
+        file_id = os.stat(db_file).st_ino if os.path.exists(db_file) else None
+        stale = []
+        conn = None
+        with self._lock:
+            idle = self._idle.get(db_file, [])
+            while idle and conn is None:
+                candidate = idle.pop()
+                if candidate.file_id == file_id:
+                    conn = candidate
+                else:
+                    stale.append(candidate)
+        for candidate in stale:
+            candidate.discard()
+        if conn is None:
+            conn = sqlite3.connect(db_file, factory=PooledConnection, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.db_file = db_file
+            conn.file_id = os.stat(db_file).st_ino
+        conn.pool = self
+        return conn
+
+    def release(self, conn):
+        """Keep conn for reuse, closing the least recently used idle connections if too many"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._idle.setdefault(conn.db_file, []).append(conn)
+            self._idle.move_to_end(conn.db_file)
+            evicted = self._evict()
+        for old in evicted:
+            old.discard()
+
+    def _evict(self):
+        """Remove the least recently used idle connections over max_idle, and return them"""
+        evicted = []
+        while sum(len(idle) for idle in self._idle.values()) > self.max_idle:
+            oldest_file, idle = next(iter(self._idle.items()))
+            evicted.append(idle.pop(0))
+            if not idle:
+                del self._idle[oldest_file]
+        return evicted
+
+    def resize(self, max_idle):
+        """Change max_idle, closing the idle connections over it"""
+        with self._lock:
+            self.max_idle = max_idle
+            evicted = self._evict()
+        for old in evicted:
+            old.discard()
+
+    def clear(self):
+        """Close all the idle connections"""
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.discard()
+
+_pool = ConnectionPool(params.get('DB_POOL_SIZE', 32))
+
+def get_db_connection():
+    """
+    Connection to the database of the current school, with its queries instrumented.
+    Closing it returns it to the pool of connections.
+    """
+    return _pool.acquire(os.path.abspath(get_db_file()))
+
+# --- Metadata cache ---
+def approx_size(value):
+    """Approximate memory size in bytes of a value made of containers and scalars"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(item) for item in value)
+    return size
+
+class SizedLRUCache:
+    """LRU cache holding at most max_bytes of values, as estimated by approx_size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Value of key, computed with compute() when missing"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        value = compute()
+        size = approx_size(value)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.size += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        """Remove the least recently used entries over max_bytes"""
+        while self.size > self.max_bytes:
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self.size -= old_size
+
+    def resize(self, max_bytes):
+        """Change max_bytes, removing the entries over it"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """Remove all the entries"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+# schema and dropdown options of every school, until the data version changes
+_metadata_cache = SizedLRUCache(params.get('DB_CACHE_BYTES', 16 * 1024 * 1024))
+
+def apply_params(_changed):
+    """Resize the connection pool and the metadata cache, when their params changed on reload"""
+    _pool.resize(params.get('DB_POOL_SIZE', 32))
+    _metadata_cache.resize(params.get('DB_CACHE_BYTES', 16 * 1024 * 1024))
+
+params.subscribe(apply_params, ['DB_POOL_SIZE', 'DB_CACHE_BYTES'])
+
+def cached(kind, *args, compute):
+    """Value of compute(), cached for the current school and data version"""
+    key = (get_db_file(), get_data_version(), kind, *args)
+    return _metadata_cache.get(key, compute)
+
+def shared_cached(kind, *args, compute):
+    """Value of compute(conn), shared with the other processes for the current school version"""
+    conn = get_db_connection()
+    try:
+        return cached_read(conn, kind, args, compute)
+    finally:
+        conn.close()
+
+def get_table_names():
+    """Get the names of the user tables defined in the database"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "SELECT name FROM sqlite_master"
+            " WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )
+        return [row['name'] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def _pragma_rows(pragma, table_name):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"PRAGMA {pragma}({table_name})")
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def get_table_schema(table_name):
+    """Get the schema (column names and types) for a given table"""
+    return cached('schema', table_name,
+                  compute=lambda: _pragma_rows('table_info', table_name))
+
+def get_foreign_keys(table_name):
+    """Get foreign key information for a given table"""
+    return cached('foreign_keys', table_name,
+                  compute=lambda: _pragma_rows('foreign_key_list', table_name))
+
+def get_primary_key(table_name):
+    """Get the primary key column names of a table, in key order"""
+    pk_columns = [column for column in get_table_schema(table_name) if column['pk']]
+    return [column['name'] for column in sorted(pk_columns, key=lambda col: col['pk'])]
+
+def get_display_column(table_name):
+    """Get the 'name' or 'nombre' column used to describe rows of a table, if any"""
+    for column in get_table_schema(table_name):
+        if column['name'].lower() in ['nombre', 'name']:
+            return column['name']
+    return None
+
+def get_fk_description_query(table_name):
+    """
+    Build the SELECT ... FROM ... part of a query on table_name
+    with the foreign key descriptions joined in
+    """
+    # Start with the base table
+    query = f"SELECT {table_name}.*"
+    from_clause = f"FROM {table_name}"
+
+    # Add joins for each foreign key that references a table with 'name' or 'nombre'
+    for fk in get_foreign_keys(table_name):
+        ref_table = fk['table']
+        ref_col = fk['to']
+        fk_col = fk['from']
+
+        display_col = get_display_column(ref_table)
+        if display_col:
+            # Add the display column to the SELECT clause
+            alias = f"{fk_col}_description"
+            query += f", {ref_table}.{display_col} AS {alias}"
+            # Add the LEFT JOIN
+            from_clause += f" LEFT JOIN {ref_table} ON {table_name}.{fk_col} = {ref_table}.{ref_col}"
+
+    return f"{query} {from_clause}"
+
+def get_table_data_with_fk_descriptions(table_name):
+    """Get table data with foreign key descriptions joined in"""
+    query = get_fk_description_query(table_name)
+
+    def compute(conn):
+        return [dict(row) for row in conn.execute(query).fetchall()]
+    return shared_cached('table_data', table_name, compute=compute)
+
+def get_table_columns(table_name):
+    """
+    Get the table data in columnar form, without foreign key descriptions,
+    so that column names are not repeated in every row
+
+    Returns:
+        {'columns': column names, 'values': one list of values per column}
+    """
+    def compute(conn):
+        cursor = conn.execute(f"SELECT * FROM {table_name}")
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+        return {'columns': columns, 'values': values}
+    return shared_cached('table_columns', table_name, compute=compute)
+
+def get_table_rows(table_name, filters=None, after=None, limit=None):
+    """
+    Get a page of table rows, with foreign key descriptions joined in,
+    ordered by primary key.
+
+    Args:
+        table_name: table to read
+        filters: dict of column name -> value, rows must match all of them
+        after: primary key values of the last row of the previous page
+        limit: maximum number of rows to return, all of them if None
+
+    Returns:
+        (column names, list of row tuples)
+    """
+    filters = filters or {}
+    primary_key = get_primary_key(table_name)
+    where_clauses = [f"{table_name}.{col} = ?" for col in filters]
+    values = list(filters.values())
+    if after is not None:
+        # row value comparison lets SQLite seek on the primary key index
+        pk_cols = ', '.join(f"{table_name}.{col}" for col in primary_key)
+        where_clauses.append(f"({pk_cols}) > ({', '.join(['?'] * len(primary_key))})")
+        values.extend(after)
+
+    query = get_fk_description_query(table_name)
+    if where_clauses:
+        query += " WHERE " + ' AND '.join(where_clauses)
+    if primary_key:
+        query += " ORDER BY " + ', '.join(f"{table_name}.{col}" for col in primary_key)
+    if limit is not None:
+        query += " LIMIT ?"
+        values.append(limit)
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(query, values)
+        columns = [description[0] for description in cursor.description]
+        rows = [tuple(row) for row in cursor.fetchall()]
+        return columns, rows
+    finally:
+        conn.close()
+
+# --- Keyset pagination ---
+Page = namedtuple('Page', ['columns', 'rows', 'next_cursor'])
+
+def encode_cursor(key_values):
+    """Encode the primary key values of a row as an opaque cursor"""
+    doc = json.dumps(list(key_values), separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(doc.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, key_length):
+    """
+    Decode an opaque cursor back into primary key values
+
+    Raises:
+        ValueError: if the cursor is malformed or does not match the key length
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key_values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(key_values, list) or len(key_values) != key_length:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key_values
+
+def get_table_page(table_name, page_size, cursor=None, filters=None):
+    """
+    Get one page of a table, seeking on its primary key
+    so the cost does not grow with the page position.
+
+    Args:
+        table_name: table to read, it must have a primary key
+        page_size: maximum number of rows in the page
+        cursor: next_cursor of the previous page, None for the first page
+        filters: dict of column name -> value, rows must match all of them
+
+    Returns:
+        Page with the column names, the row tuples
+        and the cursor of the following page, None on the last page
+
+    Raises:
+        ValueError: if the cursor is invalid
+    """
+    primary_key = get_primary_key(table_name)
+    after = decode_cursor(cursor, len(primary_key)) if cursor else None
+    # read one extra row to know whether there is a following page
+    columns, rows = get_table_rows(table_name, filters, after, page_size + 1)
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        key_indexes = [columns.index(col) for col in primary_key]
+        next_cursor = encode_cursor(rows[-1][i] for i in key_indexes)
+    return Page(columns, rows, next_cursor)
+
+def get_dropdown_options(table_name, id_col, display_col=None):
+    """Get options for dropdowns from a table"""
+    # kept by this process too, saving the reads of the shared cache
+    return cached('dropdown_options', table_name, id_col, display_col,
+                  compute=lambda: shared_cached(
+                      'dropdown_options', table_name, id_col, display_col,
+                      compute=lambda conn: _get_dropdown_options(conn, table_name, id_col,
+                                                                 display_col)))
+
+def _get_dropdown_options(conn, table_name, id_col, display_col):
+    if display_col is None:
+        display_col = id_col
+
+    # Get data for the dropdown
+    # Note: rows are read by position, since display_col may be id_col
+    query = f"SELECT {id_col}, {display_col} FROM {table_name}"
+    return [{'label': str(row[1]), 'value': row[0]} for row in conn.execute(query)]
+
+# --- Change tracking ---
+# PRAGMA data_version changes whenever another connection commits,
+# so a long-lived connection that never writes sees every change to the file.
+# Its value is only comparable within that connection, hence the token.
+# The monitors of the least recently used schools are closed, like idle connections,
+# and that of a replaced file, with another inode, is reopened.
+_monitors = OrderedDict()
+_monitor_lock = threading.Lock()
+
+def get_data_version():
+    """
+    Get an opaque string that changes whenever the database content changes.
+    Values obtained in different processes are never equal.
+    """
+    db_file = get_db_file()
+    file_id = os.stat(db_file).st_ino if os.path.exists(db_file) else None
+    with _monitor_lock:
+        if db_file in _monitors and _monitors[db_file][2] != file_id:
+            _monitors.pop(db_file)[1].close()
+        if db_file not in _monitors:
+            token = f"{os.getpid():x}{time.time_ns():x}"
+            conn = sqlite3.connect(db_file, check_same_thread=False)
+            _monitors[db_file] = (token, conn, os.stat(db_file).st_ino)
+            while len(_monitors) > _pool.max_idle:
+                _, (_, old_conn, _) = _monitors.popitem(last=False)
+                old_conn.close()
+        _monitors.move_to_end(db_file)
+        token, conn, _ = _monitors[db_file]
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return f"{token}-{version}"
+
+def close_connections():
+    """
+    Close the idle pooled connections, the change monitors and the shared query cache,
+    e.g. before forking worker processes, which must not share them
+    """
+    _pool.clear()
+    close_query_cache()
+    with _monitor_lock:
+        while _monitors:
+            _, (_, conn, _) = _monitors.popitem()
+            conn.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Pre-solve feasibility checker of the timetable data.
+
+Loads the demand and availability tables into NumPy arrays and runs
+vectorized necessary conditions, so that infeasible inputs are rejected
+in milliseconds, before any expensive timetable search:
+- every subject of a group has a teacher
+- no group has more lessons than lecc_por_sem
+- no teacher has more lessons than available slots
+- per day bipartite matching bounds: a teacher teaches at most one lesson per
+  available slot, and a group takes at most lecc_por_dia lessons per day,
+  only on slots where one of its teachers is available
+"""
+
+import argparse
+from collections import namedtuple
+import sqlite3
+import sys
+
+import numpy as np
+
+from src.db import get_db_connection
+
+Problem = namedtuple('Problem', [
+    'groups', 'teachers', 'subjects', 'n_days', 'constants',
+    'demand', 'assignments', 'availability',
+])
+Problem.__doc__ = """
+Arrays of the timetable data:
+    groups, teachers, subjects: names, in index order
+    n_days: number of days, the slots are ordered by day
+    constants: constantes name -> value
+    demand: group x subject weekly lessons
+    assignments: rows of teacher, group, subject indices, of the subjects taught
+    availability: teacher x slot, whether the teacher is available
+"""
+
+Violation = namedtuple('Violation', ['check', 'name', 'demand', 'capacity'])
+
+
+def index_of(ids, values):
+    """
+    Positions of values in the sorted array ids
+
+    Returns:
+        (positions, found), found False for the values not in ids, whose position is 0
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if not len(ids):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(ids, values), len(ids) - 1)
+    found = ids[positions] == values
+    return np.where(found, positions, 0), found
+
+
+def row_indices(rows, *column_ids):
+    """
+    Positions of the ids of each column of rows in the sorted arrays column_ids,
+    of the rows whose ids all exist: foreign keys are not enforced by the app,
+    so rows may reference deleted rows
+    """
+    found = np.ones(len(rows), dtype=bool)
+    positions = []
+    for column, ids in enumerate(column_ids):
+        column_positions, column_found = index_of(ids, rows[:, column])
+        positions.append(column_positions)
+        found &= column_found
+    return [column_positions[found] for column_positions in positions], found
+
+
+def fetch_ids_names(conn, table):
+    """Sorted ids and matching names of a table"""
+    rows = conn.execute(f"SELECT id, nombre FROM {table} ORDER BY id").fetchall()
+    return np.array([row[0] for row in rows], dtype=np.int64), [str(row[1]) for row in rows]
+
+
+def load_problem(conn):
+    """Load the timetable data of conn as a Problem"""
+    group_ids, groups = fetch_ids_names(conn, 'grupos')
+    teacher_ids, teachers = fetch_ids_names(conn, 'profesores')
+    subject_ids, subjects = fetch_ids_names(conn, 'materias')
+    day_ids, _ = fetch_ids_names(conn, 'dias')
+    block_ids, _ = fetch_ids_names(conn, 'bloques')
+    lesson_ids, _ = fetch_ids_names(conn, 'lecciones')
+    constants = dict(conn.execute("SELECT name, value FROM constantes").fetchall())
+
+    demand = np.zeros((len(groups), len(subjects)), dtype=np.int64)
+    rows = np.array(conn.execute(
+        "SELECT grupo_id, materia_id, lecciones FROM grupo_materias"
+    ).fetchall(), dtype=np.int64).reshape(-1, 3)
+    (group, subject), found = row_indices(rows, group_ids, subject_ids)
+    np.add.at(demand, (group, subject), rows[found, 2])
+
+    rows = np.array(conn.execute(
+        "SELECT profesor_id, grupo_id, materia_id FROM prof_grupo_materias"
+    ).fetchall(), dtype=np.int64).reshape(-1, 3)
+    assignments = np.column_stack(row_indices(rows, teacher_ids, group_ids, subject_ids)[0]
+                                  ).reshape(-1, 3)
+
+    slots_per_day = len(block_ids) * len(lesson_ids)
+    availability = np.zeros((len(teachers), len(day_ids) * slots_per_day), dtype=bool)
+    rows = np.array(conn.execute(
+        "SELECT profesor_id, dia_id, bloque_id, leccion_id FROM disponibilidad_profesores"
+    ).fetchall(), dtype=np.int64).reshape(-1, 4)
+    (teacher, day, block, lesson), _ = row_indices(rows, teacher_ids, day_ids, block_ids,
+                                                   lesson_ids)
+    availability[teacher, day * slots_per_day + block * len(lesson_ids) + lesson] = True
+
+    return Problem(groups, teachers, subjects, len(day_ids), constants,
+                   demand, assignments, availability)
+
+
+def violations(check, names, demand, capacity):
+    """Violations of check where demand exceeds capacity"""
+    return [Violation(check, names[i], int(demand[i]), int(capacity[i]))
+            for i in np.flatnonzero(demand > capacity)]
+
+
+def check_problem(problem):
+    """
+    Run the necessary conditions on a Problem.
+
+    Returns:
+        list of Violation, empty if no condition rules out a timetable
+    """
+    demand = problem.demand
+    teacher, group, subject = problem.assignments.T
+    n_teachers, n_slots = problem.availability.shape
+    n_groups = len(problem.groups)
+    n_days = problem.n_days
+    lecc_por_sem = problem.constants.get('lecc_por_sem', n_slots)
+    lecc_por_dia = problem.constants.get('lecc_por_dia', n_slots // max(n_days, 1))
+    if not (n_teachers and n_slots and n_groups and len(problem.subjects) and n_days):
+        # e.g. an empty DB, with nothing to schedule
+        return []
+    result = []
+
+    # subjects of groups with lessons but no teacher
+    taught = np.zeros(demand.shape, dtype=bool)
+    taught[group, subject] = True
+    untaught = (demand > 0) & ~taught
+    result += [
+        Violation('subject without teacher', f"{problem.groups[g]} {problem.subjects[s]}",
+                  int(demand[g, s]), 0)
+        for g, s in zip(*np.nonzero(untaught))
+    ]
+
+    group_demand = demand.sum(axis=1)
+    result += violations('group lessons over lecc_por_sem', problem.groups, group_demand,
+                         np.full(len(group_demand), lecc_por_sem))
+
+    # each teacher teaches all the lessons of the subjects assigned
+    teacher_demand = np.bincount(teacher, weights=demand[group, subject], minlength=n_teachers)
+    free_slots = problem.availability.sum(axis=1)
+    result += violations('teacher lessons over available slots', problem.teachers,
+                         teacher_demand, free_slots)
+
+    # per day, a teacher teaches at most one lesson per available slot
+    # and at most lecc_por_dia lessons to each of its groups
+    available_per_day = problem.availability.reshape(n_teachers, n_days, -1).sum(axis=2)
+    pair_teacher, pair_group = np.divmod(np.unique(teacher * n_groups + group), max(n_groups, 1))
+    groups_per_teacher = np.bincount(pair_teacher, minlength=n_teachers)
+    teacher_capacity = np.minimum(
+        available_per_day, (groups_per_teacher * lecc_por_dia)[:, None]
+    ).sum(axis=1)
+    # only reported when tighter than the available slots
+    result += violations('teacher lessons over daily matching bound', problem.teachers,
+                         np.where(teacher_demand > free_slots, 0, teacher_demand),
+                         teacher_capacity)
+
+    # per day, a group takes at most lecc_por_dia lessons,
+    # on slots where at least one of its teachers is available
+    group_slots = np.zeros((n_groups, n_slots), dtype=bool)
+    np.logical_or.at(group_slots, pair_group, problem.availability[pair_teacher])
+    group_slots_per_day = group_slots.reshape(n_groups, n_days, -1).sum(axis=2)
+    group_capacity = np.minimum(group_slots_per_day, lecc_por_dia).sum(axis=1)
+    result += violations('group lessons over daily matching bound', problem.groups,
+                         group_demand, group_capacity)
+
+    return result
+
+
+def check_feasibility(conn=None):
+    """Load the timetable data and run the necessary conditions on it"""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        return check_problem(load_problem(conn))
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def main():
+    """Main logic"""
+    parser = argparse.ArgumentParser(
+        description='Check necessary conditions for a feasible timetable.'
+    )
+    parser.add_argument('db_file', nargs='?', help='SQLite database file, the app DB by default')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_file) if args.db_file else get_db_connection()
+    try:
+        found = check_feasibility(conn)
+    finally:
+        conn.close()
+    for violation in found:
+        print(f"{violation.check}: {violation.name}"
+              f" needs {violation.demand}, at most {violation.capacity}")
+    print("Infeasible" if found else "No infeasibility found", file=sys.stderr)
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Timetable grids of the stored schedule, horario: one row per dia and one column
+per (bloque, leccion) slot, for a group or a teacher.
+
+Each grid is pivoted in SQL by a single query, and cached by data version,
+so switching between groups and teachers only runs a query the first time.
+Each slot column has a companion <slot>_conflict column, set when a teacher
+of the lesson is not available in that slot, as per disponibilidad_profesores,
+or teaches more than one lesson in it. The teacher grid also has <slot>_available
+columns, so that the slots where the teacher is not available can be shown.
+"""
+
+from src.db import cached, get_db_connection
+
+# view -> (table of the rows shown, horario column selecting them, cell label)
+GRID_VIEWS = {
+    'grupo': ('grupos', 'grupo_id', "l.materia || ' - ' || l.profesor"),
+    'profesor': ('profesores', 'profesor_id', "l.grupo || ' - ' || l.materia"),
+}
+
+LESSONS_QUERY = """
+    SELECT h.dia_id, h.bloque_id, h.leccion_id,
+        g.nombre AS grupo, m.nombre AS materia, p.nombre AS profesor,
+        NOT EXISTS (
+            SELECT 1 FROM disponibilidad_profesores AS d
+            WHERE d.profesor_id = h.profesor_id AND d.dia_id = h.dia_id
+                AND d.bloque_id = h.bloque_id AND d.leccion_id = h.leccion_id
+        ) OR (
+            SELECT COUNT(*) FROM horario AS o
+            WHERE o.profesor_id = h.profesor_id AND o.dia_id = h.dia_id
+                AND o.bloque_id = h.bloque_id AND o.leccion_id = h.leccion_id
+        ) > 1 AS conflict
+    FROM horario AS h
+    JOIN grupos AS g ON g.id = h.grupo_id
+    JOIN materias AS m ON m.id = h.materia_id
+    JOIN profesores AS p ON p.id = h.profesor_id
+    WHERE h.{column} = :id
+"""
+
+
+def slot_column(bloque_id, leccion_id):
+    """Id of the grid column of a slot"""
+    return f"b{bloque_id}l{leccion_id}"
+
+
+def get_slots():
+    """(bloque_id, bloque, leccion_id, leccion) of the slots of a day, in order"""
+    def compute():
+        conn = get_db_connection()
+        try:
+            return [tuple(row) for row in conn.execute(
+                "SELECT b.id, b.nombre, l.id, l.nombre FROM bloques AS b CROSS JOIN lecciones AS l"
+                " ORDER BY b.id, l.id"
+            )]
+        finally:
+            conn.close()
+    return cached('grid_slots', compute=compute)
+
+
+def grid_query(view, slots):
+    """Query pivoting the lessons of a group or teacher, :id, into one row per dia"""
+    _, column, label = GRID_VIEWS[view]
+    selects = []
+    for bloque_id, _, leccion_id, _ in slots:
+        slot = f"l.bloque_id = {int(bloque_id)} AND l.leccion_id = {int(leccion_id)}"
+        name = slot_column(bloque_id, leccion_id)
+        # a teacher may have several lessons in a slot, all shown
+        selects.append(f"group_concat(CASE WHEN {slot} THEN {label} END, ' / ') AS {name}")
+        selects.append(f"MAX(CASE WHEN {slot} THEN l.conflict ELSE 0 END) AS {name}_conflict")
+        if view == 'profesor':
+            selects.append(
+                f"EXISTS (SELECT 1 FROM disponibilidad_profesores AS a WHERE a.profesor_id = :id"
+                f" AND a.dia_id = dias.id AND a.bloque_id = {int(bloque_id)}"
+                f" AND a.leccion_id = {int(leccion_id)}) AS {name}_available"
+            )
+    return (
+        f"WITH l AS ({LESSONS_QUERY.format(column=column)})\n"
+        f"SELECT dias.id AS dia_id, dias.nombre AS dia, {', '.join(selects)}\n"
+        f"FROM dias LEFT JOIN l ON l.dia_id = dias.id\n"
+        f"GROUP BY dias.id ORDER BY dias.id"
+    )
+
+
+def get_grid(view, entity_id):
+    """
+    Grid of a group or teacher
+
+    Returns:
+        list of dicts, one per dia, with the dia and its slot columns
+    """
+    def compute():
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(grid_query(view, get_slots()), {'id': entity_id})
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    return cached('grid', view, entity_id, compute=compute)
+
+
+def get_grid_options(view):
+    """Dropdown options of the groups or teachers, by name"""
+    table = GRID_VIEWS[view][0]
+
+    def compute():
+        conn = get_db_connection()
+        try:
+            return [{'label': name, 'value': entity_id}
+                    for entity_id, name in conn.execute(
+                        f"SELECT id, nombre FROM {table} ORDER BY nombre")]
+        finally:
+            conn.close()
+    return cached('grid_options', view, compute=compute)
@@ -0,0 +1,274 @@
+"""
+Timing instrumentation of the DB queries and the Dash callbacks.
+
+Records latency, rows returned and response size histograms,
+and the shared query cache counters, exposed at /metrics in the Prometheus text format,
+and logs the queries slower than the SLOW_QUERY_SECONDS param.
+"""
+
+import bisect
+from functools import wraps
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from flask import Blueprint, Response, request
+
+from config.params import params
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+
+class Histogram:
+    """Prometheus style histogram, with one series per label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record one value for the series of label_values"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(label_values, ([0] * (len(self.buckets) + 1), 0))
+            counts[index] += 1
+            self._series[label_values] = (counts, total + value)
+
+    def render(self):
+        """Lines of the histogram in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total)
+                      for labels, (counts, total) in self._series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            labels = [f'{name}="{escape_label(value)}"'
+                      for name, value in zip(self.label_names, label_values)]
+            cumulative = 0
+            for bound, count in zip([*self.buckets, '+Inf'], counts):
+                cumulative += count
+                bucket_labels = ','.join([*labels, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_str = f"{{{','.join(labels)}}}" if labels else ''
+            lines.append(f"{self.name}_sum{label_str} {total}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Prometheus style counter, with one series per label values"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """Add amount to the series of label_values"""
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        """Current count of the series of label_values"""
+        with self._lock:
+            return self._series.get(label_values, 0)
+
+    def render(self):
+        """Lines of the counter in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = dict(self._series)
+        for label_values, count in sorted(series.items()):
+            labels = ','.join(f'{name}="{escape_label(value)}"'
+                              for name, value in zip(self.label_names, label_values))
+            lines.append(f"{self.name}{{{labels}}} {count}" if labels else f"{self.name} {count}")
+        return lines
+
+
+def escape_label(value):
+    """Escape a label value for the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+QUERY_SECONDS = Histogram(
+    'tt_db_query_seconds', 'Time spent executing and fetching a DB query',
+    ('statement', 'table'), LATENCY_BUCKETS)
+QUERY_ROWS = Histogram(
+    'tt_db_query_rows', 'Rows returned or changed by a DB query',
+    ('statement', 'table'), ROWS_BUCKETS)
+CALLBACK_SECONDS = Histogram(
+    'tt_callback_seconds', 'Time spent in a Dash callback',
+    ('callback',), LATENCY_BUCKETS)
+CALLBACK_BYTES = Histogram(
+    'tt_callback_response_bytes', 'Size of the Dash callback responses',
+    ('output',), BYTES_BUCKETS)
+HTTP_BYTES = Histogram(
+    'tt_http_response_bytes', 'Size of the other HTTP responses',
+    ('endpoint',), BYTES_BUCKETS)
+HISTOGRAMS = [QUERY_SECONDS, QUERY_ROWS, CALLBACK_SECONDS, CALLBACK_BYTES, HTTP_BYTES]
+
+QUERY_CACHE_REQUESTS = Counter(
+    'tt_query_cache_requests_total',
+    'Lookups in the shared query result cache, by result: hit, miss or bypass',
+    ('kind', 'result'))
+QUERY_CACHE_EVICTIONS = Counter(
+    'tt_query_cache_evictions_total', 'Entries evicted from the shared query result cache', ())
+COUNTERS = [QUERY_CACHE_REQUESTS, QUERY_CACHE_EVICTIONS]
+
+TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+(\w+)', re.IGNORECASE)
+
+
+def query_labels(sql):
+    """(statement kind, main table) of a query, with few distinct values"""
+    words = sql.split(None, 1)
+    statement = words[0].upper() if words else ''
+    match = TABLE_PATTERN.search(sql)
+    return statement, match.group(1) if match else ''
+
+
+def record_query(sql, elapsed, rows):
+    """Record a finished query, logging it when slow"""
+    labels = query_labels(sql)
+    QUERY_SECONDS.observe(elapsed, *labels)
+    QUERY_ROWS.observe(max(rows, 0), *labels)
+    if elapsed >= params.get('SLOW_QUERY_SECONDS', 0.5):
+        logger.warning("Slow query (%.3f s, %d rows): %s", elapsed, rows, sql)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor recording each query when it is done:
+    its execute and fetch time, and the rows fetched or changed
+    """
+
+    _sql = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def _finish(self):
+        """Record the current query, if any"""
+        if self._sql is not None:
+            rows = self._rows if self.description else self.rowcount
+            record_query(self._sql, self._elapsed, rows)
+            self._sql = None
+
+    def _timed_fetch(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        self._elapsed += time.perf_counter() - start
+        return result
+
+    def execute(self, sql, parameters=(), /):
+        self._finish()
+        self._sql, self._elapsed, self._rows = sql, 0.0, 0
+        self._timed_fetch(super().execute, sql, parameters)
+        if not self.description:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters, /):
+        self._finish()
+        self._sql, self._elapsed, self._rows = sql, 0.0, 0
+        self._timed_fetch(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed_fetch(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those of execute(), record their queries"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def timed_callback(func):
+    """Decorator recording the duration of a Dash callback"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            CALLBACK_SECONDS.observe(time.perf_counter() - start, func.__name__)
+    return wrapper
+
+
+def render_metrics():
+    """All the metrics in the Prometheus text format"""
+    lines = []
+    for metric in HISTOGRAMS + COUNTERS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus scraping endpoint"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@metrics_bp.after_app_request
+def record_response_size(response):
+    """Record the size of every response, by Dash callback output or by endpoint"""
+    size = response.content_length
+    if size is not None:
+        if request.path.endswith('/_dash-update-component'):
+            body = request.get_json(silent=True) or {}
+            CALLBACK_BYTES.observe(size, body.get('output', ''))
+        elif request.endpoint != 'metrics.metrics':
+            HTTP_BYTES.observe(size, request.endpoint or '')
+    return response
@@ -0,0 +1,196 @@
+"""
+On demand profiling of the Dash callback requests, driven by the PROFILING params.
+
+When enabled, a sample of the callback requests, plus those sent with an
+X-Profile: 1 header, is profiled either with cProfile, written as .pstats files,
+or with a low overhead stack sampler, written as collapsed stack files
+ready for flamegraph.pl or speedscope.
+Only one cProfile profiler can be active in a process since Python 3.12,
+so the requests arriving while another one is profiled by cProfile are sampled.
+The slowest recent profiled callbacks are listed at /profiling.
+"""
+
+from collections import Counter, deque
+import cProfile
+from datetime import datetime
+import os
+from pathlib import Path
+import random
+import sys
+import threading
+import time
+
+from flask import Blueprint, Response, g, request
+from markupsafe import escape
+
+from config.params import params
+
+profiling_bp = Blueprint('profiling', __name__)
+
+_recent = deque()
+_recent_lock = threading.Lock()
+# held while a request is profiled by cProfile
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    """Samples the stack of a thread at a fixed interval, from a helper thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)    #pylint: disable=protected-access
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def start(self):
+        """Start sampling"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling"""
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, filename):
+        """Write the samples in the collapsed stack format"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def collapse_stack(frame):
+    """Stack of frame as 'root;...;leaf', each frame as file:function:line"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def get_settings():
+    """The PROFILING params, with defaults"""
+    settings = {
+        'enabled': False,
+        'mode': 'cprofile',
+        'sample_rate': 0.01,
+        'interval': 0.005,
+        'dir': 'profiles',
+        'keep': 100,
+    }
+    settings.update(params.get('PROFILING') or {})
+    return settings
+
+
+def is_callback_request():
+    """Whether the current request runs a Dash callback"""
+    return request.path.endswith('/_dash-update-component')
+
+
+@profiling_bp.before_app_request
+def start_profiling():
+    """Start profiling the sampled or requested callback requests"""
+    settings = get_settings()
+    if not settings['enabled'] or not is_callback_request():
+        return
+    if request.headers.get('X-Profile') != '1' and random.random() >= settings['sample_rate']:
+        return
+    profiler = None
+    if settings['mode'] != 'sampling' and _cprofile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active, e.g. of a debugger
+            _cprofile_lock.release()
+            profiler = None
+    if profiler is None:
+        profiler = StackSampler(threading.get_ident(), settings['interval'])
+        profiler.start()
+    g.profiler = profiler
+    g.profile_start = time.perf_counter()
+
+
+@profiling_bp.after_app_request
+def stop_profiling(response):
+    """Stop profiling and write the profile file"""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    elapsed = time.perf_counter() - g.pop('profile_start')
+    settings = get_settings()
+    suffix = 'collapsed' if isinstance(profiler, StackSampler) else 'pstats'
+    stop_profiler(profiler)
+
+    body = request.get_json(silent=True) or {}
+    output = body.get('output', '')
+    now = datetime.now()
+    profile_dir = Path(settings['dir'])
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    filename = profile_dir / f"{now:%Y%m%d-%H%M%S-%f}-{elapsed * 1000:.0f}ms.{suffix}"
+    if isinstance(profiler, StackSampler):
+        profiler.write(filename)
+    else:
+        profiler.dump_stats(filename)
+
+    with _recent_lock:
+        _recent.append({'time': now, 'output': output, 'seconds': elapsed, 'file': filename})
+        while len(_recent) > settings['keep']:
+            old_file = _recent.popleft()['file']
+            if old_file.exists():
+                old_file.unlink()
+    return response
+
+
+def stop_profiler(profiler):
+    """Stop a profiler, letting other requests use cProfile"""
+    if isinstance(profiler, StackSampler):
+        profiler.stop()
+    else:
+        profiler.disable()
+        _cprofile_lock.release()
+
+
+@profiling_bp.teardown_app_request
+def discard_profiling(_exc):
+    """Stop the profiler of a request that ended without response"""
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        stop_profiler(profiler)
+
+
+def get_recent_profiles():
+    """Recent profiled callbacks, slowest first"""
+    with _recent_lock:
+        recent = list(_recent)
+    return sorted(recent, key=lambda entry: entry['seconds'], reverse=True)
+
+
+@profiling_bp.route('/profiling')
+def profiling_page():
+    """Page listing the slowest recent profiled callbacks"""
+    settings = get_settings()
+    rows = ''.join(
+        f"<tr><td>{entry['seconds'] * 1000:.1f}</td>"
+        f"<td>{entry['time']:%Y-%m-%d %H:%M:%S}</td>"
+        f"<td>{escape(entry['output'])}</td>"
+        f"<td>{escape(str(entry['file']))}</td></tr>"
+        for entry in get_recent_profiles()
+    )
+    status = (f"enabled, mode {escape(settings['mode'])},"
+              f" sample rate {settings['sample_rate']}" if settings['enabled'] else "disabled")
+    page = (
+        "<html><head><title>Profiled callbacks</title></head><body>"
+        "<h1>Slowest recent callbacks</h1>"
+        f"<p>Profiling {status}.</p>"
+        "<table border='1'><tr><th>ms</th><th>time</th><th>output</th><th>profile</th></tr>"
+        f"{rows}</table></body></html>"
+    )
+    return Response(page, mimetype='text/html')
@@ -0,0 +1,244 @@
+"""
+Query result cache shared by the worker processes of a host, driven by the QUERY_CACHE params.
+
+Each worker process would otherwise run the same reads, and hold their results,
+on its own. The results are pickled into an SQLite file, in WAL mode so that the
+workers read it concurrently, keyed by the database file, its version, the kind
+of result and its arguments, and the least recently used ones are evicted over max_bytes.
+
+The version of a database is the file change counter of its header, incremented
+by every commit in rollback journal mode, which is the same in all the processes,
+unlike PRAGMA data_version. As a file created again at the same path, e.g. by a
+full load, may reuse the inode and start from the same counter, the version also
+holds the inode and the status change time of the file, changed by every write.
+It is read while a read transaction holds the SHARED lock, so that it matches
+the rows read. Databases in WAL mode do not maintain the counter,
+so their results are not shared.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from config.params import params
+from src.metrics import QUERY_CACHE_EVICTIONS, QUERY_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+CACHE_DDL = """
+CREATE TABLE IF NOT EXISTS query_cache (
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (key)
+    ) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS query_cache_last_used ON query_cache (last_used);
+CREATE TABLE IF NOT EXISTS query_cache_usage (
+    id INTEGER NOT NULL CHECK (id = 1),
+    bytes INTEGER NOT NULL,
+    PRIMARY KEY (id)
+    );
+INSERT OR IGNORE INTO query_cache_usage VALUES (1, 0);
+"""
+
+_MISSING = object()
+
+
+def get_settings():
+    """The QUERY_CACHE params, with defaults"""
+    settings = {
+        'enabled': True,
+        'file': '.cache/query_cache.db',   # shared by the processes of the host
+        'max_bytes': 64 * 1024 * 1024,     # pickled results kept
+        'touch_seconds': 1,     # a hit updates the LRU position at most this often
+        'timeout': 0.1,         # seconds waiting for the cache lock, then it is skipped
+    }
+    settings.update(params.get('QUERY_CACHE') or {})
+    return settings
+
+
+class SharedQueryCache:
+    """LRU cache of pickled values in an SQLite file, holding at most max_bytes of them"""
+
+    def __init__(self, cache_file, max_bytes, touch_seconds=1, timeout=0.1):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.touch_seconds = touch_seconds
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Connection of this process to the cache file, opened on first use"""
+        if self._conn is None or self._pid != os.getpid():
+            cache_dir = os.path.dirname(self.cache_file)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            # a connection inherited from the parent process is not used, nor closed
+            self._conn = sqlite3.connect(self.cache_file, timeout=self.timeout,
+                                         isolation_level=None, check_same_thread=False)
+            self._pid = os.getpid()
+            # losing the last writes of a cache on a crash is harmless
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = OFF")
+            self._conn.executescript(CACHE_DDL)
+        return self._conn
+
+    def get(self, key, default=None):
+        """Value of key, or default if missing"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, last_used FROM query_cache WHERE key = ?",
+                               (key,)).fetchone()
+            if row is None:
+                return default
+            if now - row[1] >= self.touch_seconds:
+                conn.execute("UPDATE query_cache SET last_used = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        """Store the value of key, evicting the least recently used entries over max_bytes"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute("SELECT size FROM query_cache WHERE key = ?", (key,)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?)",
+                             (key, data, len(data), time.time()))
+                conn.execute("UPDATE query_cache_usage SET bytes = bytes + ?",
+                             (len(data) - (old[0] if old else 0),))
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn):
+        """Remove the least recently used entries over max_bytes, in the current transaction"""
+        excess = conn.execute("SELECT bytes FROM query_cache_usage").fetchone()[0] - self.max_bytes
+        evicted = 0
+        while excess > 0:
+            rows = conn.execute("SELECT key, size FROM query_cache ORDER BY last_used LIMIT 32"
+                                ).fetchall()
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM query_cache WHERE key = ?", (key,))
+                conn.execute("UPDATE query_cache_usage SET bytes = bytes - ?", (size,))
+                excess -= size
+                evicted += 1
+        if evicted:
+            QUERY_CACHE_EVICTIONS.inc(amount=evicted)
+
+    def stats(self):
+        """(entries, bytes) in the cache"""
+        with self._lock:
+            conn = self._connection()
+            return (conn.execute("SELECT count(*) FROM query_cache").fetchone()[0],
+                    conn.execute("SELECT bytes FROM query_cache_usage").fetchone()[0])
+
+    def clear(self):
+        """Remove all the entries"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM query_cache")
+            conn.execute("UPDATE query_cache_usage SET bytes = 0")
+            conn.execute("COMMIT")
+
+    def close(self):
+        """Close the connection of this process, reopened on next use"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """The shared query cache of the QUERY_CACHE params, None if disabled"""
+    global _cache   #pylint: disable=global-statement
+    settings = get_settings()
+    if not settings['enabled'] or not settings['file']:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedQueryCache(settings['file'], settings['max_bytes'],
+                                      settings['touch_seconds'], settings['timeout'])
+        return _cache
+
+
+def close_query_cache(_changed=None):
+    """Close the shared query cache, created again from the params on next use"""
+    global _cache   #pylint: disable=global-statement
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+
+params.subscribe(close_query_cache, ['QUERY_CACHE'])
+
+
+def file_version(db_file):
+    """
+    (inode, status change time in ns, file change counter) of a database,
+    None in WAL mode, which does not maintain the counter
+    """
+    with open(db_file, 'rb') as f:
+        header = f.read(28)
+        stat = os.fstat(f.fileno())
+    # file format version numbers 2: WAL mode
+    if len(header) < 28 or header[18] == 2:
+        return None
+    return stat.st_ino, stat.st_ctime_ns, int.from_bytes(header[24:28], 'big')
+
+
+def cached_read(conn, kind, args, compute):
+    """
+    Value of compute(conn), a read of the pooled connection conn,
+    taken from the shared cache when a process already computed it for the same database version
+    """
+    cache = get_query_cache()
+    if cache is None:
+        return compute(conn)
+    conn.execute("BEGIN")
+    try:
+        # the SHARED lock held by the read transaction keeps the version until the rows are read
+        conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        version = file_version(conn.db_file)
+        # not shared either when the path is now another file than the one the connection reads
+        if version is None or version[0] != conn.file_id:
+            QUERY_CACHE_REQUESTS.inc(kind, 'bypass')
+            return compute(conn)
+        key = repr((conn.db_file, version, kind, args))
+        try:
+            value = cache.get(key, _MISSING)
+        except sqlite3.Error as e:
+            # e.g. the cache is locked longer than its timeout: the read is not delayed
+            logger.debug("Query cache skipped: %s", e)
+            QUERY_CACHE_REQUESTS.inc(kind, 'bypass')
+            return compute(conn)
+        if value is not _MISSING:
+            QUERY_CACHE_REQUESTS.inc(kind, 'hit')
+            return value
+        QUERY_CACHE_REQUESTS.inc(kind, 'miss')
+        value = compute(conn)
+    finally:
+        conn.commit()
+    try:
+        cache.put(key, value)
+    except sqlite3.Error as e:
+        logger.debug("Query cache not updated: %s", e)
+    return value
@@ -0,0 +1,229 @@
+"""
+Load and conflict reports of the timetable data, materialized in summary tables.
+
+The summaries are computed with set-based SQL and kept up to date on every write
+by triggers on the base tables, which only recompute the affected rows:
+- rep_carga_grupos: weekly lessons of each group, to compare with lecc_por_sem
+- rep_carga_profesores: weekly lessons assigned to each teacher
+  and the slots where the teacher is available
+- rep_materias_sin_profesor: grupo_materias without an assigned teacher
+"""
+
+from src.db import get_db_connection
+
+SUMMARY_TABLES_DDL = [
+    """CREATE TABLE IF NOT EXISTS rep_carga_grupos (
+    grupo_id INTEGER NOT NULL,
+    lecciones INTEGER NOT NULL,
+    PRIMARY KEY (grupo_id)
+    );""",
+    """CREATE TABLE IF NOT EXISTS rep_carga_profesores (
+    profesor_id INTEGER NOT NULL,
+    lecciones INTEGER NOT NULL,
+    disponibles INTEGER NOT NULL,
+    PRIMARY KEY (profesor_id)
+    );""",
+    """CREATE TABLE IF NOT EXISTS rep_materias_sin_profesor (
+    grupo_materias_id INTEGER NOT NULL,
+    PRIMARY KEY (grupo_materias_id)
+    );""",
+]
+
+
+def refresh_grupo(grupo_id):
+    """Statement recomputing the load of the group grupo_id (an SQL expression)"""
+    return f"""
+        INSERT OR REPLACE INTO rep_carga_grupos (grupo_id, lecciones)
+        SELECT grupos.id,
+               (SELECT COALESCE(SUM(lecciones), 0) FROM grupo_materias
+                WHERE grupo_materias.grupo_id = grupos.id)
+        FROM grupos WHERE grupos.id = {grupo_id};"""
+
+
+def refresh_profesores(condition):
+    """Statement recomputing the load of the teachers matching condition on profesores"""
+    return f"""
+        INSERT OR REPLACE INTO rep_carga_profesores (profesor_id, lecciones, disponibles)
+        SELECT profesores.id,
+               (SELECT COALESCE(SUM(gm.lecciones), 0)
+                FROM prof_grupo_materias pgm
+                JOIN grupo_materias gm
+                  ON gm.grupo_id = pgm.grupo_id AND gm.materia_id = pgm.materia_id
+                WHERE pgm.profesor_id = profesores.id),
+               (SELECT COUNT(*) FROM disponibilidad_profesores dp
+                WHERE dp.profesor_id = profesores.id)
+        FROM profesores WHERE {condition};"""
+
+
+def refresh_profesores_of(grupo_id, materia_id):
+    """Statement recomputing the load of the teachers of a subject of a group"""
+    return refresh_profesores(
+        f"profesores.id IN (SELECT profesor_id FROM prof_grupo_materias"
+        f" WHERE grupo_id = {grupo_id} AND materia_id = {materia_id})"
+    )
+
+
+def refresh_sin_profesor(grupo_id, materia_id):
+    """Statements recomputing whether a subject of a group lacks a teacher"""
+    return f"""
+        DELETE FROM rep_materias_sin_profesor WHERE grupo_materias_id IN
+            (SELECT id FROM grupo_materias
+             WHERE grupo_id = {grupo_id} AND materia_id = {materia_id});
+        INSERT INTO rep_materias_sin_profesor (grupo_materias_id)
+        SELECT gm.id FROM grupo_materias gm
+        WHERE gm.grupo_id = {grupo_id} AND gm.materia_id = {materia_id}
+          AND NOT EXISTS (SELECT 1 FROM prof_grupo_materias pgm
+                          WHERE pgm.grupo_id = gm.grupo_id AND pgm.materia_id = gm.materia_id);"""
+
+
+def trigger_statements():
+    """trigger name -> (event, table, body statements)"""
+    triggers = {}
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        refs = {'INSERT': ['NEW'], 'UPDATE': ['OLD', 'NEW'], 'DELETE': ['OLD']}[event]
+        suffix = event.lower()
+
+        body = []
+        for ref in refs:
+            if ref == 'OLD':
+                body.append(f"DELETE FROM rep_carga_grupos WHERE grupo_id = {ref}.id;")
+            else:
+                body.append(refresh_grupo(f"{ref}.id"))
+        triggers[f"rep_grupos_{suffix}"] = (event, 'grupos', body)
+
+        body = []
+        for ref in refs:
+            if ref == 'OLD':
+                body.append(f"DELETE FROM rep_carga_profesores WHERE profesor_id = {ref}.id;")
+            else:
+                body.append(refresh_profesores(f"profesores.id = {ref}.id"))
+        triggers[f"rep_profesores_{suffix}"] = (event, 'profesores', body)
+
+        body = []
+        for ref in refs:
+            body.append(refresh_grupo(f"{ref}.grupo_id"))
+            body.append(refresh_profesores_of(f"{ref}.grupo_id", f"{ref}.materia_id"))
+            if ref == 'OLD':
+                body.append(f"DELETE FROM rep_materias_sin_profesor"
+                            f" WHERE grupo_materias_id = {ref}.id;")
+            body.append(refresh_sin_profesor(f"{ref}.grupo_id", f"{ref}.materia_id"))
+        triggers[f"rep_grupo_materias_{suffix}"] = (event, 'grupo_materias', body)
+
+        body = []
+        for ref in refs:
+            body.append(refresh_profesores(f"profesores.id = {ref}.profesor_id"))
+            body.append(refresh_sin_profesor(f"{ref}.grupo_id", f"{ref}.materia_id"))
+        triggers[f"rep_prof_grupo_materias_{suffix}"] = (event, 'prof_grupo_materias', body)
+
+        body = [refresh_profesores(f"profesores.id = {ref}.profesor_id") for ref in refs]
+        triggers[f"rep_disponibilidad_profesores_{suffix}"] = (
+            event, 'disponibilidad_profesores', body
+        )
+    return triggers
+
+
+def is_report_table(name):
+    """Whether a table is one of the summaries, kept out of the spec and its migrations"""
+    return name.startswith('rep_')
+
+
+def trigger_ddl():
+    """Statements creating the triggers keeping the summaries up to date"""
+    return [f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN\n" + '\n'.join(body) + "\nEND;"
+            for name, (event, table, body) in trigger_statements().items()]
+
+
+def refresh_statements():
+    """Statements recomputing all the summaries from the base tables"""
+    return [
+        "DELETE FROM rep_carga_grupos;",
+        "DELETE FROM rep_carga_profesores;",
+        "DELETE FROM rep_materias_sin_profesor;",
+        """INSERT INTO rep_carga_grupos (grupo_id, lecciones)
+        SELECT grupos.id, COALESCE(SUM(gm.lecciones), 0)
+        FROM grupos LEFT JOIN grupo_materias gm ON gm.grupo_id = grupos.id
+        GROUP BY grupos.id;""",
+        refresh_profesores('1'),
+        """INSERT INTO rep_materias_sin_profesor (grupo_materias_id)
+        SELECT gm.id FROM grupo_materias gm
+        WHERE NOT EXISTS (SELECT 1 FROM prof_grupo_materias pgm
+                          WHERE pgm.grupo_id = gm.grupo_id AND pgm.materia_id = gm.materia_id);""",
+    ]
+
+
+def refresh_reports(conn):
+    """Recompute all the summaries from the base tables"""
+    with conn:
+        for statement in refresh_statements():
+            conn.execute(statement)
+
+
+def report_triggers(conn):
+    """Names of the triggers of the summaries in the DB of conn"""
+    return {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'rep_%'")}
+
+
+def ensure_reports(conn=None):
+    """
+    Create the summary tables and their triggers if any is missing,
+    which happens on new DBs and after base tables are rebuilt,
+    and then recompute the summaries.
+    All in one transaction holding the write lock, so that processes doing it
+    at once, or writes meanwhile, do not leave the summaries out of date.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        triggers = set(trigger_statements())
+        if report_triggers(conn) >= triggers:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            # created meanwhile by another process
+            if report_triggers(conn) >= triggers:
+                return
+            for statement in SUMMARY_TABLES_DDL:
+                conn.execute(statement)
+            for name in triggers:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            for statement in trigger_ddl() + refresh_statements():
+                conn.execute(statement)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+REPORT_QUERIES = {
+    'carga_grupos': """
+        SELECT grupos.nombre AS grupo, r.lecciones, c.value AS lecc_por_sem,
+               r.lecciones - c.value AS diferencia
+        FROM rep_carga_grupos r
+        JOIN grupos ON grupos.id = r.grupo_id
+        LEFT JOIN constantes c ON c.name = 'lecc_por_sem'
+        ORDER BY abs(r.lecciones - c.value) DESC, grupos.nombre""",
+    'carga_profesores': """
+        SELECT profesores.nombre AS profesor, r.lecciones, r.disponibles,
+               r.disponibles - r.lecciones AS libres
+        FROM rep_carga_profesores r
+        JOIN profesores ON profesores.id = r.profesor_id
+        ORDER BY r.disponibles - r.lecciones, profesores.nombre""",
+    'materias_sin_profesor': """
+        SELECT grupos.nombre AS grupo, materias.nombre AS materia, gm.lecciones
+        FROM rep_materias_sin_profesor r
+        JOIN grupo_materias gm ON gm.id = r.grupo_materias_id
+        JOIN grupos ON grupos.id = gm.grupo_id
+        JOIN materias ON materias.id = gm.materia_id
+        ORDER BY grupos.nombre, materias.nombre""",
+}
+
+
+def get_report(report_name):
+    """Get the rows of a report, as a list of dicts, read from its summary table"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(REPORT_QUERIES[report_name])
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
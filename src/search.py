@@ -0,0 +1,101 @@
+"""
+Full text search over the searchable columns of the tt spec tables.
+
+The FTS5 index and the triggers keeping it in sync are generated from the spec
+by yaml2sql; a row of a table with searchable foreign keys is also found by
+the names of the rows it references. Each word of a query matches as a prefix,
+and the results of all the tables are ranked together by bm25.
+"""
+
+import json
+import re
+
+from config.params import params
+from scripts.DDL.yaml2sql import (
+    SEARCH_INDEX_TABLE,
+    SEARCH_KEYS_TABLE,
+    generate_search_ddl,
+    generate_search_rebuild,
+    generate_search_triggers,
+    primary_key_columns,
+)
+from src.db import get_db_connection
+from src.utils.spec_handling import get_yaml_file_as_dict
+
+SEARCH_WORD = re.compile(r'\w+')
+
+
+def spec_tables():
+    """Tables of the tt spec, by name"""
+    spec = get_yaml_file_as_dict(params['tt_spec'])['DatabaseSpec']
+    return {table['name']: table for table in spec['tables']}
+
+
+def ensure_search_index(conn=None):
+    """
+    Create the search index and its triggers if any is missing,
+    which happens on DBs created before the index and after tables are rebuilt,
+    and then index all the rows again, in one transaction holding the write lock
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        tables = list(spec_tables().values())
+        triggers = set(generate_search_triggers(tables))
+
+        def complete():
+            return {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'search_%'"
+            )} >= triggers
+        if complete():
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            # created meanwhile by another process
+            if complete():
+                return
+            for statement in generate_search_ddl(tables) + generate_search_rebuild(tables):
+                conn.execute(statement)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def fts_query(text):
+    """FTS5 query matching rows with all the words of text, as prefixes, or None without words"""
+    words = SEARCH_WORD.findall(text or '')
+    # quoted, so that words like AND or NEAR are not operators
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+def search(text, limit=20):
+    """
+    Rows matching all the words of text, best first
+
+    Returns:
+        list of dicts with the table, key (the primary key values by column) and label
+        of each row
+    """
+    query = fts_query(text)
+    if query is None:
+        return []
+    tables = spec_tables()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT k.table_name, k.row_key, i.content FROM {SEARCH_INDEX_TABLE} AS i"
+            f" JOIN {SEARCH_KEYS_TABLE} AS k ON k.id = i.rowid"
+            f" WHERE {SEARCH_INDEX_TABLE} MATCH ? ORDER BY i.rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [
+        {
+            'table': table_name,
+            'key': dict(zip(primary_key_columns(tables[table_name]), json.loads(row_key))),
+            'label': content,
+        }
+        for table_name, row_key, content in rows
+    ]
@@ -0,0 +1,129 @@
+"""
+Routing of the requests to the database of a school, so that one process
+serves many schools, driven by the TENANTS params.
+
+A school is selected with the URL prefix /schools/<school>/, removed before
+the request reaches the app, and its database is TENANTS dir/<school>.db.
+A page served under the prefix sends its Dash requests under it too, so that
+each browser tab keeps its school. The school is also remembered in a cookie,
+for the requests sent to unprefixed URLs. Loading the app page without prefix
+goes back to DB_FILE.
+"""
+
+from contextvars import ContextVar
+import json
+import os
+from pathlib import Path
+import re
+
+import dash
+from flask import Blueprint, abort, g, request
+
+from config.params import params
+
+TENANT_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+TENANT_ENVIRON_KEY = 'tt_db.tenant'
+
+# database file of the school of the current request, None for DB_FILE
+current_db_file = ContextVar('current_db_file', default=None)
+
+tenants_bp = Blueprint('tenants', __name__)
+
+
+def get_settings():
+    """The TENANTS params, with defaults"""
+    settings = {
+        'dir': 'data/schools',
+        'prefix': '/schools',
+        'cookie': 'school',
+    }
+    settings.update(params.get('TENANTS') or {})
+    return settings
+
+
+def tenant_db_file(tenant):
+    """
+    Database file of a school
+
+    Raises:
+        ValueError: if the school name is not valid
+    """
+    if not TENANT_NAME.match(tenant):
+        raise ValueError(f"Invalid school name: {tenant}")
+    return str(Path(get_settings()['dir']) / f"{tenant}.db")
+
+
+class TenantPrefixMiddleware:
+    """WSGI middleware removing the school prefix from the request path"""
+
+    def __init__(self, wsgi_app, prefix=None):
+        self.wsgi_app = wsgi_app
+        self.prefix = (prefix or get_settings()['prefix']).rstrip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.prefix):
+            tenant, _, rest = path[len(self.prefix):].partition('/')
+            environ[TENANT_ENVIRON_KEY] = tenant
+            environ['PATH_INFO'] = '/' + rest
+        return self.wsgi_app(environ, start_response)
+
+
+class TenantDash(dash.Dash):
+    """Dash app whose pages served under a school prefix send their requests under it"""
+
+    def interpolate_index(self, **kwargs):
+        tenant = request.environ.get(TENANT_ENVIRON_KEY)
+        if tenant:
+            kwargs['config'] = tenant_config_html(kwargs['config'], tenant)
+        return super().interpolate_index(**kwargs)
+
+
+def tenant_config_html(config_html, tenant):
+    """The _dash-config script of a page, with the requests prefixed by the school"""
+    start = config_html.index('>') + 1
+    end = config_html.rindex('</script>')
+    config = json.loads(config_html[start:end])
+    prefix = get_settings()['prefix'].rstrip('/')
+    config['requests_pathname_prefix'] = f"{prefix}/{tenant}{config['requests_pathname_prefix']}"
+    # so that the JSON cannot close the script element
+    return (config_html[:start] + json.dumps(config).replace('</', '<\\/')
+            + config_html[end:])
+
+
+@tenants_bp.before_app_request
+def select_tenant():
+    """Use the database of the school of the request, if any"""
+    cookie = get_settings()['cookie']
+    tenant = request.environ.get(TENANT_ENVIRON_KEY)
+    if tenant is None and not (request.method == 'GET' and request.path == '/'):
+        tenant = request.cookies.get(cookie)
+    if not tenant:
+        return
+    try:
+        db_file = tenant_db_file(tenant)
+    except ValueError:
+        abort(404)
+    if not os.path.exists(db_file):
+        abort(404)
+    g.tenant_token = current_db_file.set(db_file)
+
+
+@tenants_bp.after_app_request
+def remember_tenant(response):
+    """Remember the school selected by the URL prefix, or forget it on the unprefixed app page"""
+    cookie = get_settings()['cookie']
+    tenant = request.environ.get(TENANT_ENVIRON_KEY)
+    if tenant:
+        response.set_cookie(cookie, tenant, httponly=True, samesite='Lax')
+    elif request.method == 'GET' and request.path == '/' and cookie in request.cookies:
+        response.delete_cookie(cookie)
+    return response
+
+
+@tenants_bp.teardown_app_request
+def reset_tenant(_exc):
+    """Stop using the database of the school of the request"""
+    token = g.pop('tenant_token', None)
+    if token is not None:
+        current_db_file.reset(token)
@@ -3,150 +3,151 @@
 """
 CRUD application for the timetable database tables.
 Includes tabs for all tables in the database with foreign key handling.
+
+Importing this module only defines the callbacks; the Dash app is built by
+create_app, on first use of the app or server attributes, and its layout on
+each page load. A pre-forking server loads the shared state once with
+create_server, e.g. gunicorn --preload 'src.timetable_db_app:create_server()'.
 """
 #pylint: disable=too-many-locals,too-many-statements,too-many-branches
 #pylint: disable=too-many-arguments,too-many-positional-arguments
 
-# import os
+from functools import lru_cache
+import json
+import os
 import sqlite3
 # import pprint as pp
 # import sys
 
 import dash
-from dash import dcc, html, Input, Output, State, dash_table, ALL  #, callback
+from dash import dcc, html, Input, Output, State, dash_table, ALL, callback, clientside_callback
 from dash.exceptions import PreventUpdate
-import pandas as pd
 
 from config.params import params
-
-# --- Database setup ---
-DB_FILE = params['DB_FILE']
-
-def get_db_connection():
-    """Establishes connection to the database."""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def get_table_schema(table_name):
-    """Get the schema (column names and types) for a given table"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        schema = cursor.fetchall()
-        return schema
-    finally:
-        conn.close()
-
-def get_foreign_keys(table_name):
-    """Get foreign key information for a given table"""
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(f"PRAGMA foreign_key_list({table_name})")
-        foreign_keys = cursor.fetchall()
-        return foreign_keys
-    finally:
-        conn.close()
-
-def get_table_data_with_fk_descriptions(table_name):
-    """Get table data with foreign key descriptions joined in"""
-    conn = get_db_connection()
-    try:
-        # Get foreign key information
-        foreign_keys = get_foreign_keys(table_name)
-        
-        # Start with the base table
-        query = f"SELECT {table_name}.*"
-        from_clause = f"FROM {table_name}"
-        
-        # Add joins for each foreign key that references a table with 'name' or 'nombre'
-        for fk in foreign_keys:
-            ref_table = fk['table']
-            ref_col = fk['to']
-            fk_col = fk['from']
-            
-            # Check if the referenced table has a 'name' or 'nombre' column
-            ref_schema = get_table_schema(ref_table)
-            display_col = None
-            
-            for ref_column in ref_schema:
-                if ref_column['name'].lower() in ['nombre', 'name']:
-                    display_col = ref_column['name']
-                    break
-            
-            if display_col:
-                # Add the display column to the SELECT clause
-                alias = f"{fk_col}_description"
-                query += f", {ref_table}.{display_col} AS {alias}"
-                # Add the LEFT JOIN
-                from_clause += f" LEFT JOIN {ref_table} ON {table_name}.{fk_col} = {ref_table}.{ref_col}"
-        
-        full_query = f"{query} {from_clause}"
-        df = pd.read_sql_query(full_query, conn)
-        return df.to_dict('records')
-    finally:
-        conn.close()
-
-def get_dropdown_options(table_name, id_col, display_col=None):
-    """Get options for dropdowns from a table"""
-    conn = get_db_connection()
-    try:
-        if display_col is None:
-            display_col = id_col
-
-        # Get data for the dropdown
-        query = f"SELECT {id_col}, {display_col} FROM {table_name}"
-        df = pd.read_sql_query(query, conn)
-
-        # Format options for dropdown
-        # Note: use row.iloc[index] instead of row[col_name]
-        # because when display_col == id_col row[col_name]
-        # returns a two-column Series instead of a single row value
-        options = [
-            {'label': str(row.iloc[1]),
-             'value': row.iloc[0]
-             }
-            for _, row in df.iterrows()
-        ]
-        return options
-    finally:
-        conn.close()
-
-# --- Dash App ---
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
-server = app.server
+import src.db
+from src.db import (
+    get_dropdown_options,
+    get_foreign_keys,
+    get_table_columns,
+    get_table_data_with_fk_descriptions,
+    get_table_schema,
+)
+from src.api import api_bp
+from src.backup import start_scheduler
+from src.compression import compression_bp
+from src.grid import get_grid, get_grid_options, get_slots, slot_column
+from src.metrics import metrics_bp, timed_callback
+from src.profiling import profiling_bp
+from src.reports import REPORT_QUERIES, ensure_reports, get_report
+from src.search import ensure_search_index, search, spec_tables
+from src.tenants import TenantDash, TenantPrefixMiddleware, tenants_bp
+from src.writer import execute_write
 
 # Define the tables in the database
 tables = [
     'constantes', 'grupos', 'materias', 'profesores', 'grupo_materias',
-    'prof_grupo_materias', 'dias', 'bloques', 'lecciones', 'disponibilidad_profesores'
+    'prof_grupo_materias', 'dias', 'bloques', 'lecciones', 'disponibilidad_profesores',
+    'horario'
 ]
 
-# Create tabs for each table
-tabs = dcc.Tabs(
-    id='tabs',
-    value=tables[0],
-    children=[dcc.Tab(label=table.replace('_', ' ').title(), value=table) for table in tables]
-)
+GRID_TAB = 'grid'
+REPORTS_TAB = 'reports'
+
+# report -> (title, conditional style highlighting its conflicting rows)
+report_styles = {
+    'carga_grupos': ("Lessons per group vs lecc_por_sem",
+                     {'filter_query': '{diferencia} != 0'}),
+    'carga_profesores': ("Teacher load vs available slots",
+                         {'filter_query': '{libres} < 0'}),
+    'materias_sin_profesor': ("Subjects without a teacher", None),
+}
 
 # --- App Layout ---
-app.layout = html.Div([
-    html.H1('Timetable Database Management'),
+def serve_layout():
+    """The page layout, with tabs for each table and one for the reports"""
+    tabs = dcc.Tabs(
+        id='tabs',
+        value=tables[0],
+        children=[dcc.Tab(label=table.replace('_', ' ').title(), value=table)
+                  for table in tables]
+                 + [dcc.Tab(label='Timetable', value=GRID_TAB),
+                    dcc.Tab(label='Reports', value=REPORTS_TAB)]
+    )
+
+    return html.Div([
+        html.H1('Timetable Database Management'),
 
-    tabs,
+        html.Div([
+            dcc.Input(id='search-input', type='search', placeholder='Search...',
+                      debounce=True, style={'width': '300px'}),
+            html.Div(id='search-results', style={'paddingTop': '5px'}),
+            # table and key of the search result to select once its tab is shown
+            dcc.Store(id='search-target'),
+        ], style={'padding': '10px'}),
+
+        tabs,
+
+        html.Div(id='tab-content'),
+    ])
 
-    html.Div(id='tab-content'),
-])
+# --- Dash App ---
+@lru_cache(maxsize=None)
+def create_app():
+    """
+    The Dash app of the process, with the callbacks defined in this module.
+    Created once, since the first Dash app takes all the module callbacks.
+    """
+    app = TenantDash(__name__, suppress_callback_exceptions=True)
+    server = app.server
+    # schools selected by URL prefix, registered first so that all hooks use their DB
+    server.wsgi_app = TenantPrefixMiddleware(server.wsgi_app)
+    server.register_blueprint(tenants_bp)
+    server.register_blueprint(api_bp)
+    server.register_blueprint(metrics_bp)
+    server.register_blueprint(profiling_bp)
+    # registered last so that the other after-request hooks see the compressed responses
+    server.register_blueprint(compression_bp)
+    app.layout = serve_layout
+    return app
+
+def preload():
+    """
+    Load the state shared by the worker processes before they are forked:
+    the modules imported on first use, the parsed spec, and the reports and
+    search index of DB_FILE, closing the DB connections opened meanwhile
+    """
+    import src.feasibility  #pylint: disable=import-outside-toplevel,unused-import
+    spec_tables()
+    ensure_reports()
+    ensure_search_index()
+    # SQLite connections must not be shared with forked processes
+    src.db.close_connections()
+
+def create_server():
+    """The WSGI app of the Dash app, with the shared state preloaded"""
+    preload()
+    return create_app().server
+
+def __getattr__(name):
+    """The app and server attributes, created on first use"""
+    if name == 'app':
+        return create_app()
+    if name == 'server':
+        return create_app().server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Dynamic Tab Content ---
-@app.callback(
+@callback(
     Output('tab-content', 'children'),
     Input('tabs', 'value')
 )
+@timed_callback
 def render_tab_content(tab):
     """Renders the content for each tab based on the selected table"""
+    if tab == GRID_TAB:
+        return render_grid()
+    if tab == REPORTS_TAB:
+        return render_reports()
 
     # Get schema information for the table
     schema = get_table_schema(tab)
@@ -189,6 +190,8 @@ def render_tab_content(tab):
 
     # Create input fields for each column
     input_fields = []
+    # foreign key column -> {value: description}, to add the descriptions client-side
+    fk_labels = {}
     for column in schema:
         col_name = column['name']
         col_type = column['type'].lower()
@@ -219,6 +222,10 @@ def render_tab_content(tab):
                     break
 
             dropdown_options = get_dropdown_options(ref_table, ref_col, display_col)
+            if display_col:
+                fk_labels[col_name] = {
+                    str(option['value']): option['label'] for option in dropdown_options
+                }
 
             input_field = html.Div([
                 html.Label(
@@ -318,27 +325,180 @@ def render_tab_content(tab):
 
         # Store the primary key information
         dcc.Store(id={'type': 'primary-key-info', 'table': tab},
-                  data=[col['name'] for col in schema if col['pk']])
+                  data=[col['name'] for col in schema if col['pk']]),
+
+        # Compact table data and foreign key descriptions, expanded into rows client-side
+        dcc.Store(id={'type': 'table-store', 'table': tab}),
+        dcc.Store(id={'type': 'fk-labels', 'table': tab}, data=fk_labels)
     ])
 
     return tab_content
 
-# --- Callbacks for refreshing data tables ---
-@app.callback(
-    Output({'type': 'data-table', 'table': ALL}, 'data'),
-    Input({'type': 'output-message', 'table': ALL}, 'children'),
-    State({'type': 'data-table', 'table': ALL}, 'id')
+def render_reports():
+    """Renders the reports, read from their precomputed summary tables"""
+    ensure_reports()
+    content = [html.H2("Reports")]
+    for report in REPORT_QUERIES:
+        title, conflict = report_styles[report]
+        rows = get_report(report)
+        columns = list(rows[0]) if rows else []
+        content += [
+            html.H3(f"{title} ({len(rows)})"),
+            dash_table.DataTable(
+                id={'type': 'report-table', 'report': report},
+                columns=[{'name': col.replace('_', ' ').title(), 'id': col} for col in columns],
+                data=rows,
+                page_action='native',
+                page_size=10,
+                style_table={'overflowX': 'auto'},
+                filter_action='native',
+                sort_action='native',
+                style_data_conditional=[{'if': conflict, 'backgroundColor': '#f8d7da'}]
+                                       if conflict else [],
+            ),
+        ]
+
+    # fast necessary conditions, run on each view; numpy is only imported then
+    from src.feasibility import check_feasibility  #pylint: disable=import-outside-toplevel
+    found = check_feasibility()
+    content += [
+        html.H3(f"Feasibility violations ({len(found)})"),
+        dash_table.DataTable(
+            id={'type': 'report-table', 'report': 'feasibility'},
+            columns=[{'name': field.title(), 'id': field} for field in found[0]._fields]
+                    if found else [],
+            data=[violation._asdict() for violation in found],
+            page_action='native',
+            page_size=10,
+            style_table={'overflowX': 'auto'},
+            filter_action='native',
+            sort_action='native',
+        ) if found else html.P("No infeasibility found by the necessary conditions."),
+    ]
+    return html.Div(content)
+
+def render_grid():
+    """Renders the timetable grid of a group or teacher, chosen in the controls"""
+    return html.Div([
+        html.H2("Timetable"),
+        html.Div([
+            dcc.RadioItems(
+                id='grid-view',
+                options=[{'label': 'Group', 'value': 'grupo'},
+                         {'label': 'Teacher', 'value': 'profesor'}],
+                value='grupo',
+                inline=True,
+                style={'marginRight': '20px'}
+            ),
+            dcc.Dropdown(id='grid-entity', clearable=False, style={'width': '250px'}),
+        ], style={'padding': '10px', 'display': 'flex', 'alignItems': 'center'}),
+        dash_table.DataTable(
+            id='grid-table',
+            merge_duplicate_headers=True,
+            style_table={'overflowX': 'auto'},
+            style_cell={'textAlign': 'center', 'whiteSpace': 'normal'},
+        ),
+    ])
+
+# --- Callbacks for the timetable grid ---
+@callback(
+    Output('grid-entity', 'options'),
+    Output('grid-entity', 'value'),
+    Input('grid-view', 'value')
+)
+@timed_callback
+def update_grid_entities(view):
+    """Lists the groups or teachers, selecting the first one."""
+    options = get_grid_options(view)
+    return options, options[0]['value'] if options else None
+
+@callback(
+    Output('grid-table', 'columns'),
+    Output('grid-table', 'data'),
+    Output('grid-table', 'style_data_conditional'),
+    Input('grid-entity', 'value'),
+    State('grid-view', 'value')
 )
-def refresh_tables(_, table_ids):
-    """Refreshes all data tables when CRUD operations are performed."""
-    return [get_table_data_with_fk_descriptions(table_id['table']) for table_id in table_ids]
+@timed_callback
+def update_grid(entity_id, view):
+    """Shows the grid of the selected group or teacher, highlighting its conflicts."""
+    if entity_id is None:
+        raise PreventUpdate
+    columns = [{'name': ['', 'Día'], 'id': 'dia'}]
+    styles = []
+    for bloque_id, bloque, leccion_id, leccion in get_slots():
+        column = slot_column(bloque_id, leccion_id)
+        columns.append({'name': [f"Bloque {bloque}", str(leccion)], 'id': column})
+        if view == 'profesor':
+            styles.append({'if': {'filter_query': f'{{{column}_available}} = 0',
+                                  'column_id': column},
+                           'backgroundColor': '#e9ecef'})
+        # after the availability style, which it overrides
+        styles.append({'if': {'filter_query': f'{{{column}_conflict}} = 1', 'column_id': column},
+                       'backgroundColor': '#f8d7da'})
+    return columns, get_grid(view, entity_id), styles
+
+# --- Callbacks for refreshing data tables ---
+if params.get('COMPACT_TABLE_DATA', True):
+    # Send each table as columns of values, without the foreign key descriptions,
+    # and rebuild the DataTable rows in the browser
+    @callback(
+        Output({'type': 'table-store', 'table': ALL}, 'data'),
+        Input({'type': 'output-message', 'table': ALL}, 'children'),
+        State({'type': 'data-table', 'table': ALL}, 'id')
+    )
+    @timed_callback
+    def refresh_tables(_, table_ids):
+        """Refreshes all data tables when CRUD operations are performed."""
+        return [get_table_columns(table_id['table']) for table_id in table_ids]
+
+    clientside_callback(
+        """
+        function(stores, fkLabelsList) {
+            return stores.map(function(store, t) {
+                if (!store) { return []; }
+                var columns = store.columns, values = store.values;
+                var labels = fkLabelsList[t] || {};
+                var nRows = values.length ? values[0].length : 0;
+                var rows = new Array(nRows);
+                for (var i = 0; i < nRows; i++) {
+                    var row = {};
+                    for (var c = 0; c < columns.length; c++) {
+                        var value = values[c][i];
+                        row[columns[c]] = value;
+                        if (labels[columns[c]]) {
+                            var label = labels[columns[c]][String(value)];
+                            row[columns[c] + '_description'] = label === undefined ? null : label;
+                        }
+                    }
+                    rows[i] = row;
+                }
+                return rows;
+            });
+        }
+        """,
+        Output({'type': 'data-table', 'table': ALL}, 'data'),
+        Input({'type': 'table-store', 'table': ALL}, 'data'),
+        State({'type': 'fk-labels', 'table': ALL}, 'data')
+    )
+else:
+    @callback(
+        Output({'type': 'data-table', 'table': ALL}, 'data'),
+        Input({'type': 'output-message', 'table': ALL}, 'children'),
+        State({'type': 'data-table', 'table': ALL}, 'id')
+    )
+    @timed_callback
+    def refresh_tables(_, table_ids):
+        """Refreshes all data tables when CRUD operations are performed."""
+        return [get_table_data_with_fk_descriptions(table_id['table']) for table_id in table_ids]
 
 # --- Callback for updating page size ---
-@app.callback(
+@callback(
     Output({'type': 'data-table', 'table': ALL}, 'page_size'),
     Input({'type': 'page-size-dropdown', 'table': ALL}, 'value'),
     State({'type': 'data-table', 'table': ALL}, 'id')
 )
+@timed_callback
 def update_page_size(page_sizes, table_ids):
     """Updates the page size for each DataTable when the dropdown value changes."""
     if not page_sizes:
@@ -346,13 +506,14 @@ def update_page_size(page_sizes, table_ids):
     return page_sizes
 
 # --- Callback for displaying selected data in input fields ---
-@app.callback(
+@callback(
     Output({'type': 'input-field', 'name': ALL}, 'value'),
     Input({'type': 'data-table', 'table': ALL}, 'selected_rows'),
     State({'type': 'data-table', 'table': ALL}, 'data'),
     State({'type': 'data-table', 'table': ALL}, 'id'),
     State({'type': 'input-field', 'name': ALL}, 'id')
 )
+@timed_callback
 def display_selected_data(selected_rows_list, data_list, table_ids, input_ids):
     """Fills the input fields with the data from the selected row."""
     ctx = dash.callback_context
@@ -389,12 +550,13 @@ def display_selected_data(selected_rows_list, data_list, table_ids, input_ids):
     return result
 
 # --- Callback for navigating to foreign key tables ---
-@app.callback(
+@callback(
     Output('tabs', 'value'),
     Input({'type': 'fk-navigate', 'name': ALL, 'target': ALL}, 'n_clicks'),
     State({'type': 'fk-navigate', 'name': ALL, 'target': ALL}, 'id'),
     prevent_initial_call=True
 )
+@timed_callback
 def navigate_to_fk_table(n_clicks_list, _button_ids):
     """Navigates to the tab for the referenced foreign key table."""
     ctx = dash.callback_context
@@ -409,8 +571,76 @@ def navigate_to_fk_table(n_clicks_list, _button_ids):
     target_table = trigger_dict['target']
     return target_table
 
+# --- Callbacks for the global search ---
+@callback(
+    Output('search-results', 'children'),
+    Input('search-input', 'value'),
+    prevent_initial_call=True
+)
+@timed_callback
+def show_search_results(text):
+    """Lists the rows matching the search words, as buttons jumping to them."""
+    ensure_search_index()
+    results = search(text)
+    if not results and text and text.strip():
+        return html.Span("No matches.")
+    return [
+        html.Button(
+            f"{result['table'].replace('_', ' ').title()}: {result['label']}",
+            id={'type': 'search-result', 'table': result['table'],
+                'key': json.dumps(result['key'], sort_keys=True)},
+            n_clicks=0,
+            style={'margin': '2px'}
+        )
+        for result in results
+    ]
+
+@callback(
+    Output('tabs', 'value', allow_duplicate=True),
+    Output('search-target', 'data'),
+    Input({'type': 'search-result', 'table': ALL, 'key': ALL}, 'n_clicks'),
+    prevent_initial_call=True
+)
+@timed_callback
+def navigate_to_search_result(n_clicks_list):
+    """Shows the tab of the clicked search result, and remembers the row to select."""
+    ctx = dash.callback_context
+    if not ctx.triggered or not any(n_clicks_list):
+        raise PreventUpdate
+    result_id = ctx.triggered_id
+    return result_id['table'], {'table': result_id['table'], 'key': json.loads(result_id['key'])}
+
+# select the search result row, once its table data is loaded, and show its page
+clientside_callback(
+    """
+    function(dataList, target, tableIds, pageSizes) {
+        var noUpdate = window.dash_clientside.no_update;
+        var selected = tableIds.map(function() { return noUpdate; });
+        var pages = tableIds.map(function() { return noUpdate; });
+        var t = target ? tableIds.findIndex(function(id) { return id.table === target.table; }) : -1;
+        if (t < 0 || !dataList[t] || !dataList[t].length) {
+            return [selected, pages, noUpdate];
+        }
+        var row = dataList[t].findIndex(function(r) {
+            return Object.keys(target.key).every(function(c) { return r[c] == target.key[c]; });
+        });
+        selected[t] = row < 0 ? [] : [row];
+        if (row >= 0) { pages[t] = Math.floor(row / (pageSizes[t] || 10)); }
+        return [selected, pages, null];
+    }
+    """,
+    Output({'type': 'data-table', 'table': ALL}, 'selected_rows'),
+    Output({'type': 'data-table', 'table': ALL}, 'page_current'),
+    Output('search-target', 'data', allow_duplicate=True),
+    Input({'type': 'data-table', 'table': ALL}, 'data'),
+    Input('search-target', 'data'),
+    State({'type': 'data-table', 'table': ALL}, 'id'),
+    State({'type': 'data-table', 'table': ALL}, 'page_size'),
+    prevent_initial_call=True
+)
+
 # --- Callback for clearing input fields ---
-@app.callback(
+@callback(
     Output({'type': 'input-field', 'name': ALL},
            'value',
            allow_duplicate=True
@@ -420,6 +650,7 @@ def navigate_to_fk_table(n_clicks_list, _button_ids):
     State({'type': 'input-field', 'name': ALL}, 'id'),
     prevent_initial_call=True
 )
+@timed_callback
 def clear_input_fields(n_clicks_list, _button_ids, input_ids):
     """Clears all input fields when the Clear button is clicked."""
     ctx = dash.callback_context
@@ -431,7 +662,7 @@ def clear_input_fields(n_clicks_list, _button_ids, input_ids):
 # --- CRUD operation callbacks ---
 
 # Create operation
-@app.callback(
+@callback(
     Output({'type': 'output-message', 'table': ALL},
            'children',
            allow_duplicate=True
@@ -442,6 +673,7 @@ def clear_input_fields(n_clicks_list, _button_ids, input_ids):
     State({'type': 'create-button', 'table': ALL}, 'id'),
     prevent_initial_call=True
 )
+@timed_callback
 def create_entry(n_clicks_list, input_values, input_ids, button_ids):
     """Creates a new entry in the selected table."""
     ctx = dash.callback_context
@@ -469,10 +701,8 @@ def create_entry(n_clicks_list, input_values, input_ids, button_ids):
     columns_str = ', '.join(columns)
     query = f"INSERT INTO {triggered_table} ({columns_str}) VALUES ({placeholders})"
 
-    conn = get_db_connection()
     try:
-        with conn:
-            conn.execute(query, values)
+        execute_write(query, values)
 
         # Create a result list
         # with success message for the triggered table
@@ -501,11 +731,9 @@ def create_entry(n_clicks_list, input_values, input_ids, button_ids):
             else:
                 result.append("")
         return result
-    finally:
-        conn.close()
 
 # Update operation
-@app.callback(
+@callback(
     Output({'type': 'output-message', 'table': ALL},
            'children',
            allow_duplicate=True
@@ -519,6 +747,7 @@ def create_entry(n_clicks_list, input_values, input_ids, button_ids):
     State({'type': 'primary-key-info', 'table': ALL}, 'data'),
     prevent_initial_call=True
 )
+@timed_callback
 def update_entry(n_clicks_list, input_values, input_ids, button_ids, selected_rows_list,
                 data_list, primary_key_info_list):
     """Updates an existing entry in the selected table."""
@@ -580,10 +809,8 @@ def update_entry(n_clicks_list, input_values, input_ids, button_ids, selected_ro
     where_str = ' AND '.join(where_clauses)
     query = f"UPDATE {triggered_table} SET {set_str} WHERE {where_str}"
 
-    conn = get_db_connection()
     try:
-        with conn:
-            conn.execute(query, update_values)
+        execute_write(query, update_values)
 
         # Create a result list
         # with success message for the triggered table
@@ -612,11 +839,9 @@ def update_entry(n_clicks_list, input_values, input_ids, button_ids, selected_ro
             else:
                 result.append("")
         return result
-    finally:
-        conn.close()
 
 # Delete operation
-@app.callback(
+@callback(
     Output({'type': 'output-message', 'table': ALL},
            'children',
            allow_duplicate=True
@@ -628,6 +853,7 @@ def update_entry(n_clicks_list, input_values, input_ids, button_ids, selected_ro
     State({'type': 'primary-key-info', 'table': ALL}, 'data'),
     prevent_initial_call=True
 )
+@timed_callback
 def delete_entry(n_clicks_list, button_ids, selected_rows_list, data_list, primary_key_info_list):
     """Deletes an entry from the selected table."""
     #pylint: disable=too-many-branches
@@ -671,10 +897,8 @@ def delete_entry(n_clicks_list, button_ids, selected_rows_list, data_list, prima
     where_str = ' AND '.join(where_clauses)
     query = f"DELETE FROM {triggered_table} WHERE {where_str}"
 
-    conn = get_db_connection()
     try:
-        with conn:
-            conn.execute(query, delete_values)
+        execute_write(query, delete_values)
 
         # Create a result list with success message for the triggered table
         # and empty strings for others
@@ -704,8 +928,9 @@ def delete_entry(n_clicks_list, button_ids, selected_rows_list, data_list, prima
             else:
                 result.append("")
         return result
-    finally:
-        conn.close()
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # the debug reloader runs the app in a child process, only that one takes snapshots
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_scheduler()
+    create_app().run(debug=True)
@@ -16,12 +16,19 @@ references:
 - https://betterstack.com/community/questions/how-to-create-singleton-in-python/
 """
 
+import threading
+
+
 class Singleton(type):
     """Singleton superclass"""
     _instances = {}
+    _lock = threading.RLock()   # reentrant, for singletons created by singleton constructors
     def __call__(cls, *args, **kwargs):
+        # checked again under the lock, so that concurrent first calls create a single instance
         if cls not in cls._instances:
-            cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
+            with Singleton._lock:
+                if cls not in cls._instances:
+                    cls._instances[cls] = super(Singleton, cls).__call__(*args, **kwargs)
         return cls._instances[cls]
 
 
@@ -1,20 +1,45 @@
-"""Utility functions to handle yaml specs and their validating schemas"""
+"""
+Utility functions to handle yaml specs and their validating schemas.
+jsonschema is only imported when a schema is first used.
+"""
 
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
 from functools import lru_cache
+import os
+from typing import TYPE_CHECKING
 
 import yaml
-import jsonschema as js
+
+if TYPE_CHECKING:
+    import jsonschema as js
+
+from config.params import params
+from src.utils.yaml_loader import load_yaml_file
+
+
+def file_key(filename: str) -> tuple[str, int, int]:
+    """
+    Key identifying a file version: (absolute path, mtime in ns, size),
+    so caches keyed by it are refreshed when the file is edited
+    """
+    stat = os.stat(filename)
+    return os.path.abspath(filename), stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=32)
+def _load_yaml_file(path: str, _mtime_ns: int, _size: int) -> dict:
+    """Read one version of a yaml file, see file_key"""
+    return load_yaml_file(path, cache_dir=params.get('YAML_CACHE_DIR'))
 
 
-@lru_cache(maxsize=4)
 def get_yaml_file_as_dict(filename: str) -> dict:
     """
     Read a yaml file and return its conversion to Dict
     assuming the file contains only one YAML file
     """
-    with open(filename, 'r', encoding="utf-8") as y_file:
-        specs = yaml.safe_load(y_file)
-    return specs
+    return _load_yaml_file(*file_key(filename))
 
 
 def get_yaml_file_as_dict_list(filename: str) -> list[dict]:
@@ -22,9 +47,7 @@ def get_yaml_file_as_dict_list(filename: str) -> list[dict]:
     Read a yaml file and return its conversion to a list of dicts
     given that the file might have more than one YAML documents
     """
-    with open(filename, 'r', encoding="utf-8") as y_file:
-        specs = list(yaml.safe_load_all(y_file))
-    return specs
+    return load_yaml_file(filename, all_docs=True, cache_dir=params.get('YAML_CACHE_DIR'))
 
 
 def put_dict_as_yaml_file(doc: dict, filename: str):
@@ -33,6 +56,28 @@ def put_dict_as_yaml_file(doc: dict, filename: str):
         y_file.write(yaml.dump(doc))
 
 
+@lru_cache(maxsize=16)
+def _compile_validator(path: str, mtime_ns: int, size: int) -> js.protocols.Validator:
+    """Check one version of a schema file and build its validator, see file_key"""
+    import jsonschema as js     #pylint: disable=import-outside-toplevel,redefined-outer-name
+    schema = _load_yaml_file(path, mtime_ns, size)
+    validator_class = js.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def get_validator(schema_filename: str) -> js.protocols.Validator:
+    """
+    Get the validator for a schema file,
+    compiled once per version of the file
+
+    Raises:
+        jsonschema.exceptions.SchemaError:
+            when the contents of the schema_filename is not a valid schema
+    """
+    return _compile_validator(*file_key(schema_filename))
+
+
 def validate_schema(schema_filename: str):
     """
     Validate a YAML schema
@@ -41,10 +86,7 @@ def validate_schema(schema_filename: str):
         jsonschema.exceptions.SchemaError:
             when the contents of the schema_filename is not a valid schema
     """
-    # load the validation schema
-    schema = get_yaml_file_as_dict(schema_filename)
-    # validate the validation schema
-    js.protocols.Validator.check_schema(schema)
+    get_validator(schema_filename)
 
 
 def validate_spec_file(spec_filename: str,
@@ -61,9 +103,56 @@ def validate_spec_file(spec_filename: str,
         `jsonschema.exceptions.ValidationError`: if the instance is invalid
         `jsonschema.exceptions.SchemaError`: if the schema itself is invalid
     """
-    # load the validation schema
-    schema = get_yaml_file_as_dict(schema_filename)
-    # load the spec
+    import jsonschema as js     #pylint: disable=import-outside-toplevel,redefined-outer-name
+    validator = get_validator(schema_filename)
     spec = get_yaml_file_as_dict(spec_filename)
-    # validate
-    js.validate(instance=spec, schema=schema)
+    error = js.exceptions.best_match(validator.iter_errors(spec))
+    if error is not None:
+        raise error
+
+
+def iter_spec_errors(specs: Iterable[dict],
+                     schema_filename: str
+                     ) -> Iterator[tuple[int, js.exceptions.ValidationError]]:
+    """
+    Validate many spec documents against a schema
+
+    Args:
+        specs: spec documents to validate
+        schema_filename: name of the schema to validate with
+
+    Yields:
+        (index of the document in specs, error) for every error found
+
+    Raises:
+        `jsonschema.exceptions.SchemaError`: if the schema itself is invalid
+    """
+    validator = get_validator(schema_filename)
+    for index, spec in enumerate(specs):
+        for error in validator.iter_errors(spec):
+            yield index, error
+
+
+def get_spec_files_errors(spec_filenames: Iterable[str],
+                          schema_filename: str
+                          ) -> dict[str, list[js.exceptions.ValidationError]]:
+    """
+    Validate all the YAML documents of many spec files against a schema
+
+    Args:
+        spec_filenames: names of the specs to validate
+        schema_filename: name of the schema to validate with
+
+    Returns:
+        spec filename -> list of all its errors, empty when valid
+
+    Raises:
+        `jsonschema.exceptions.SchemaError`: if the schema itself is invalid
+    """
+    return {
+        spec_filename: [
+            error for _, error in
+            iter_spec_errors(get_yaml_file_as_dict_list(spec_filename), schema_filename)
+        ]
+        for spec_filename in spec_filenames
+    }
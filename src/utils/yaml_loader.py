@@ -0,0 +1,85 @@
+"""
+Shared YAML loading.
+
+Uses the libyaml based CSafeLoader when PyYAML was built with it,
+falling back to the pure Python SafeLoader otherwise.
+Parsed files can optionally be cached on disk,
+keyed by a hash of their path and content, so repeated processes skip parsing.
+Only the last parsed content of each path is kept.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+import pickle
+import tempfile
+
+import yaml
+
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def load_yaml(stream):
+    """Parse the single YAML document in stream (str, bytes or file)"""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_all_yaml(stream) -> list:
+    """Parse all the YAML documents in stream (str, bytes or file)"""
+    return list(yaml.load_all(stream, Loader=SafeLoader))
+
+
+def _cache_file(cache_dir: str, filename: str, content: bytes, all_docs: bool) -> Path:
+    """Name of the cache file for the given file path and content"""
+    path_digest = hashlib.sha256(os.path.abspath(filename).encode('utf-8')).hexdigest()[:16]
+    digest = hashlib.sha256(content).hexdigest()
+    kind = 'all' if all_docs else 'one'
+    return Path(cache_dir) / f"{path_digest}-{digest}.{kind}.pickle"
+
+
+def _remove_stale(cache_file: Path):
+    """Remove the cache files of the previous contents of the same path"""
+    path_digest, rest = cache_file.name.split('-', 1)
+    kind = rest.split('.')[1]
+    for stale in cache_file.parent.glob(f"{path_digest}-*.{kind}.pickle"):
+        if stale != cache_file:
+            try:
+                stale.unlink()
+            except FileNotFoundError:
+                # removed by a concurrent process
+                pass
+
+
+def load_yaml_file(filename: str, all_docs: bool = False, cache_dir: str | None = None):
+    """
+    Read a yaml file
+
+    Args:
+        filename: name of the yaml file
+        all_docs: return the list of all the documents in the file
+            instead of its single document
+        cache_dir: directory where parsed files are cached, no caching if None.
+            Cache files are pickles, so this directory must not be writable
+            by untrusted users.
+    """
+    with open(filename, 'rb') as y_file:
+        content = y_file.read()
+    parse = load_all_yaml if all_docs else load_yaml
+    if cache_dir is None:
+        return parse(content)
+
+    cache_file = _cache_file(cache_dir, filename, content, all_docs)
+    try:
+        with open(cache_file, 'rb') as c_file:
+            return pickle.load(c_file)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    doc = parse(content)
+    # write to a temporary file first so concurrent readers never see partial files
+    os.makedirs(cache_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile('wb', dir=cache_dir, delete=False) as tmp_file:
+        pickle.dump(doc, tmp_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file.name, cache_file)
+    _remove_stale(cache_file)
+    return doc
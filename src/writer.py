@@ -0,0 +1,185 @@
+"""
+Single writer of each database, driven by the WRITER params.
+
+Write statements are queued to a writer thread, which runs them in batches,
+one transaction per batch, so that concurrent writes are serialized in the
+process instead of competing for the database lock, and share the cost of a
+commit. Each statement runs in its own savepoint, so a failing statement is
+rolled back alone and its error is raised to its caller only. Callers get
+their result once the batch is committed. A statement whose caller stopped
+waiting before its batch started is not run.
+"""
+
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import logging
+import os
+import queue
+import sqlite3
+import threading
+
+from config.params import params
+import src.db
+from src.metrics import InstrumentedConnection
+
+logger = logging.getLogger(__name__)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_settings():
+    """The WRITER params, with defaults"""
+    settings = {
+        'enabled': True,
+        'max_batch': 64,      # statements per transaction
+        'max_delay': 0,       # seconds waiting for more statements, 0 takes those queued
+        'timeout': 10,        # seconds waiting for the database lock, and for a result
+        'idle': 60,           # seconds without writes before the writer thread stops
+    }
+    settings.update(params.get('WRITER') or {})
+    return settings
+
+
+class DBWriter:
+    """Thread running the queued write statements of a database in batched transactions"""
+
+    def __init__(self, db_file, file_id, settings):
+        self.db_file = db_file
+        self.file_id = file_id
+        self.settings = settings
+        self.queue = queue.Queue()
+        self.stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, parameters):
+        """Queue a statement, and return the Future of its row count"""
+        future = Future()
+        self.queue.put((sql, parameters, future))
+        return future
+
+    def _next_batch(self):
+        """The queued statements, waiting for the first one, or None when idle"""
+        try:
+            batch = [self.queue.get(timeout=self.settings['idle'])]
+        except queue.Empty:
+            return None
+        # statements queued while the previous batch was committed join this one
+        while len(batch) < self.settings['max_batch']:
+            try:
+                batch.append(self.queue.get(timeout=self.settings['max_delay'])
+                             if self.settings['max_delay'] else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _stop(self):
+        """Stop taking statements, the next ones starting another writer; under _writers_lock"""
+        self.stopped = True
+        if _writers.get(self.db_file) is self:
+            del _writers[self.db_file]
+
+    def _run(self):
+        batch = []
+        try:
+            conn = sqlite3.connect(self.db_file, timeout=self.settings['timeout'],
+                                   isolation_level=None, factory=InstrumentedConnection)
+            try:
+                while True:
+                    batch = self._next_batch()
+                    if batch is None:
+                        with _writers_lock:
+                            # statements queued meanwhile are still run
+                            if self.queue.empty():
+                                self._stop()
+                                return
+                        continue
+                    self._run_batch(conn, batch)
+            finally:
+                conn.close()
+        except Exception as e:      #pylint: disable=broad-exception-caught
+            logger.error("Writer of %s stopped: %s", self.db_file, e)
+            error = e if isinstance(e, sqlite3.Error) else sqlite3.OperationalError(
+                f"Writer of {self.db_file} stopped: {e}")
+            with _writers_lock:
+                self._stop()
+            # no statement is queued once stopped
+            pending = [future for _, _, future in batch or []]
+            while not self.queue.empty():
+                pending.append(self.queue.get_nowait()[2])
+            for future in pending:
+                if not future.done():
+                    future.set_exception(error)
+
+    @staticmethod
+    def _run_batch(conn, batch):
+        """Run a batch in one transaction, and set the result of each statement once committed"""
+        # the statements given up by their callers are not run
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, parameters, _ in batch:
+                conn.execute("SAVEPOINT statement")
+                try:
+                    results.append(conn.execute(sql, parameters).rowcount)
+                    conn.execute("RELEASE statement")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO statement")
+                    conn.execute("RELEASE statement")
+                    results.append(e)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [e] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def submit(db_file, sql, parameters, settings):
+    """Queue a statement to the writer of a database, started if needed"""
+    # a file replaced since the writer started has another inode
+    file_id = os.stat(db_file).st_ino if os.path.exists(db_file) else None
+    # under the lock, so the writer cannot stop before taking the statement
+    with _writers_lock:
+        writer = _writers.get(db_file)
+        if writer is None or writer.stopped or writer.file_id != file_id:
+            writer = _writers[db_file] = DBWriter(db_file, file_id, settings)
+        return writer.submit(sql, parameters)
+
+
+def execute_write(sql, parameters=()):
+    """
+    Run a write statement on the database of the current school,
+    through its writer when enabled.
+
+    Returns:
+        number of rows changed
+
+    Raises:
+        sqlite3.Error: as raised by the statement, sqlite3.OperationalError if it
+            did not run within the WRITER timeout, and was given up
+    """
+    settings = get_settings()
+    if not settings['enabled']:
+        conn = src.db.get_db_connection()
+        try:
+            with conn:
+                return conn.execute(sql, parameters).rowcount
+        finally:
+            conn.close()
+    future = submit(os.path.abspath(src.db.get_db_file()), sql, parameters, settings)
+    try:
+        return future.result(timeout=settings['timeout'])
+    except FutureTimeoutError:
+        if future.cancel():
+            raise sqlite3.OperationalError(
+                f"Write not run within {settings['timeout']} seconds") from None
+    # its batch started, so it is committed or rolled back within the database lock timeout
+    return future.result()
@@ -0,0 +1,28 @@
+"""Shared test fixtures"""
+
+import shutil
+
+import pytest
+
+from config.params import params
+import src.db
+from src.query_cache import close_query_cache
+
+
+@pytest.fixture(autouse=True)
+def query_cache_file(tmp_path, monkeypatch):
+    """The shared query cache of each test in a file of its own, instead of the one of the app"""
+    monkeypatch.setitem(params, 'QUERY_CACHE',
+                        {**(params.get('QUERY_CACHE') or {}), 'file': str(tmp_path / 'cache.db')})
+    close_query_cache()
+    yield
+    close_query_cache()
+
+
+@pytest.fixture
+def tt_db(tmp_path, monkeypatch):
+    """A scratch copy of the timetable database, used by the data layer"""
+    db_file = str(tmp_path / 'tt.db')
+    shutil.copyfile('data/tt.db', db_file)
+    monkeypatch.setattr(src.db, 'DB_FILE', db_file)
+    return db_file
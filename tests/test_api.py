@@ -0,0 +1,68 @@
+"""Test the read-only JSON API"""
+
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from src.api import api_bp
+
+
+@pytest.fixture
+def client(tt_db):     #pylint: disable=unused-argument
+    """Test client of a server exposing only the API"""
+    server = Flask(__name__)
+    server.register_blueprint(api_bp)
+    return server.test_client()
+
+
+def test_list_tables(client):
+    response = client.get('/api/')
+    assert response.status_code == 200
+    assert 'disponibilidad_profesores' in response.get_json()['tables']
+    assert not {'search_keys', 'search_index'} & set(response.get_json()['tables'])
+
+
+@pytest.mark.parametrize('table', ['search_index_data', 'search_keys', 'rep_carga_grupos'])
+def test_internal_tables_not_served(client, table):
+    assert client.get(f'/api/{table}').status_code == 404
+
+
+def test_rows_with_fk_descriptions(client):
+    doc = client.get('/api/grupo_materias?grupo_id=1').get_json()
+    assert 'grupo_id_description' in doc['columns']
+    assert len(doc['rows']) == 4
+    grupo_desc = doc['columns'].index('grupo_id_description')
+    assert {row[grupo_desc] for row in doc['rows']} == {'inter'}
+
+
+def test_keyset_pagination_visits_all_rows(client):
+    seen = []
+    url = '/api/disponibilidad_profesores?limit=64'
+    while True:
+        doc = client.get(url).get_json()
+        seen.extend(tuple(row) for row in doc['rows'])
+        if doc['next'] is None:
+            break
+        url = f"/api/disponibilidad_profesores?limit=64&cursor={doc['next']}"
+    assert len(seen) == 400
+    assert seen == sorted(set(seen))
+
+
+def test_bad_requests(client):
+    assert client.get('/api/nonexistent').status_code == 404
+    assert client.get('/api/grupos?color=red').status_code == 400
+    assert client.get('/api/grupos?limit=0').status_code == 400
+    assert client.get('/api/grupos?cursor=WzEsMl0').status_code == 400
+
+
+def test_etag_not_modified_until_data_changes(client, tt_db):
+    response = client.get('/api/grupos')
+    etag = response.headers['ETag']
+    assert client.get('/api/grupos', headers={'If-None-Match': etag}).status_code == 304
+
+    with sqlite3.connect(tt_db) as conn:
+        conn.execute("INSERT INTO grupos (id, nombre) VALUES (99, 'nuevo')")
+    response = client.get('/api/grupos', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,69 @@
+"""Test the online snapshots of the DB"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+from config.params import params
+from src import backup
+from src.backup import backup_db, create_snapshot, list_snapshots, restore_snapshot
+
+
+def count_rows(db_file, table):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_snapshot_retention_and_restore(tt_db, tmp_path, monkeypatch):
+    monkeypatch.setitem(params, 'BACKUP',
+                        {'dir': str(tmp_path / 'backups'), 'keep': 2, 'pages': 1})
+    snapshots = [create_snapshot() for _ in range(3)]
+    assert list_snapshots() == snapshots[:0:-1]
+
+    live = sqlite3.connect(tt_db)
+    with live:
+        live.execute("DELETE FROM disponibilidad_profesores")
+    restore_snapshot(snapshots[-1])
+    # connections already open see the restored data
+    assert live.execute("SELECT COUNT(*) FROM disponibilidad_profesores").fetchone()[0] == 400
+    live.close()
+
+
+def test_backup_during_writes_finishes(tt_db, tmp_path):
+    stop = threading.Event()
+
+    def write():
+        conn = sqlite3.connect(tt_db, timeout=10)
+        while not stop.is_set():
+            with conn:
+                conn.execute("UPDATE constantes SET value = value + 1 WHERE name = 'lecc_por_sem'")
+            stop.wait(0.001)
+        conn.close()
+
+    # each write between two steps restarts the backup, until it copies in one step
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        restarts = backup_db(tt_db, tmp_path / 'snapshot.db', pages=1, sleep=0.001,
+                             max_restarts=2)
+    finally:
+        stop.set()
+        thread.join()
+    assert restarts <= 3
+    assert count_rows(tmp_path / 'snapshot.db', 'disponibilidad_profesores') == 400
+
+
+def test_scheduler_logs_failures(monkeypatch, caplog):
+    def fail(*_args):
+        raise OSError("disk full")
+    monkeypatch.setattr(backup, 'create_snapshot', fail)
+    scheduler = backup.BackupScheduler(0.01)
+    with caplog.at_level(logging.ERROR, logger=backup.__name__):
+        scheduler.start()
+        time.sleep(0.1)
+        scheduler.stop()
+    assert "Backup failed: disk full" in caplog.text
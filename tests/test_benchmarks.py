@@ -0,0 +1,19 @@
+"""Smoke test of the benchmark suite, at a tiny scale"""
+
+import src.db
+from benchmarks.run_benchmarks import find_regressions, run_benchmarks
+
+
+def test_run_benchmarks_small():
+    db_file = src.db.DB_FILE
+    run = run_benchmarks(n_groups=3, n_teachers=5, repeat=1)
+    assert src.db.DB_FILE == db_file
+    assert 'crud_callbacks[grupos]' in run['results']
+    assert all(timing['median'] > 0 for timing in run['results'].values())
+
+
+def test_find_regressions():
+    baseline = {'groups': 1, 'teachers': 1, 'results': {'a': {'median': 1.0}, 'b': {'median': 1.0}}}
+    run = {'groups': 1, 'teachers': 1, 'results': {'a': {'median': 1.2}, 'b': {'median': 2.0}}}
+    assert find_regressions(run, baseline, 0.5) == ['b']
+    assert find_regressions({**run, 'groups': 2}, baseline, 0.5) == []
@@ -0,0 +1,38 @@
+"""Test the gzip compression of responses"""
+
+import gzip
+
+from flask import Flask
+import pytest
+
+from src.compression import compression_bp
+
+
+@pytest.fixture
+def client():
+    """Test client of a server with small and large JSON routes"""
+    server = Flask(__name__)
+    server.register_blueprint(compression_bp)
+
+    @server.route('/large')
+    def large():
+        return {'rows': [[i, 'value'] for i in range(1000)]}
+
+    @server.route('/small')
+    def small():
+        return {'rows': []}
+
+    return server.test_client()
+
+
+def test_large_response_compressed(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'"rows"' in gzip.decompress(response.get_data())
+    assert response.content_length == len(response.get_data())
+
+
+def test_not_compressed(client):
+    assert 'Content-Encoding' not in client.get('/large').headers
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
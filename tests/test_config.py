@@ -1,4 +1,12 @@
+import shutil
+import threading
+import time
+
+import pytest
+
 from config.params import Params
+import src.db
+from src.utils.singleton import Singleton
 
 
 def test_params_singleton():
@@ -19,3 +27,86 @@ def test_params_get_with_default():
     """Test get method with default value"""
     params = Params()
     assert params.get('nonexistent', 'default') == 'default'
+
+
+def test_singleton_created_once_by_concurrent_calls():
+    """Test that concurrent first calls create a single instance"""
+
+    class Slow(metaclass=Singleton):
+        def __init__(self):
+            time.sleep(0.01)
+
+    instances = []
+    threads = [threading.Thread(target=lambda: instances.append(Slow())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(instance) for instance in instances}) == 1
+
+
+@pytest.fixture
+def params_file(tmp_path, monkeypatch):
+    """The params read from a copy of params.yaml that tests can change"""
+    params = Params()
+    yaml_file = tmp_path / 'params.yaml'
+    shutil.copyfile(params.yaml_file, yaml_file)
+    monkeypatch.setattr(params, 'yaml_file', yaml_file)
+    params.reload(force=True)
+    yield yaml_file
+    monkeypatch.undo()
+    params.reload(force=True)
+
+
+def test_reload_notifies_changed_params(params_file):
+    """Test that changes to the yaml file are reloaded and notified"""
+    params = Params()
+    notified = []
+    params.subscribe(notified.append, ['SLOW_QUERY_SECONDS'])
+    try:
+        assert params.reload() == set()
+        params_file.write_text(params_file.read_text()
+                               .replace('SLOW_QUERY_SECONDS: 0.5', 'SLOW_QUERY_SECONDS: 2')
+                               .replace('API_PAGE_SIZE: 100', 'API_PAGE_SIZE: 50'))
+        assert params.reload() == {'SLOW_QUERY_SECONDS', 'API_PAGE_SIZE'}
+        assert params['SLOW_QUERY_SECONDS'] == 2
+        assert notified == [{'SLOW_QUERY_SECONDS', 'API_PAGE_SIZE'}]
+    finally:
+        params.unsubscribe(notified.append)
+
+
+def test_invalid_yaml_keeps_params(params_file):
+    """Test that a half edited yaml file is not applied"""
+    params = Params()
+    params_file.write_text("DB_FILE: [")
+    assert params.reload() == set()
+    assert params['DB_FILE'] == 'data/tt.db'
+
+
+def test_reload_resizes_pool(params_file, monkeypatch):
+    """Test that the connection pool applies its reloaded size"""
+    monkeypatch.setattr(src.db._pool, 'max_idle', src.db._pool.max_idle)  #pylint: disable=protected-access
+    params_file.write_text(params_file.read_text().replace('DB_POOL_SIZE: 32', 'DB_POOL_SIZE: 4'))
+    Params().reload()
+    assert src.db._pool.max_idle == 4  #pylint: disable=protected-access
+
+
+def test_subscribers_called_without_lock(params_file, monkeypatch):
+    """Test that the subscribers called by a reload on access can wait for other threads"""
+    params = Params()
+    finished = []
+
+    def subscriber(_changed):
+        # another thread taking the params lock, e.g. to unsubscribe
+        thread = threading.Thread(target=lambda: finished.append(params.unsubscribe(print)))
+        thread.start()
+        thread.join(timeout=1)
+    params.subscribe(subscriber, ['API_PAGE_SIZE'])
+    try:
+        params_file.write_text(params_file.read_text().replace('API_PAGE_SIZE: 100',
+                                                               'API_PAGE_SIZE: 50'))
+        monkeypatch.setattr(params, '_next_check', 0.0)
+        assert params['API_PAGE_SIZE'] == 50
+        assert finished == [None]
+    finally:
+        params.unsubscribe(subscriber)
@@ -0,0 +1,112 @@
+"""Test the data access layer"""
+
+import shutil
+import sqlite3
+
+import pytest
+
+from src.db import (
+    ConnectionPool,
+    SizedLRUCache,
+    decode_cursor,
+    encode_cursor,
+    get_dropdown_options,
+    get_primary_key,
+    get_table_columns,
+    get_table_page,
+)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([3, 'mié', 2.5])
+    assert decode_cursor(cursor, 3) == [3, 'mié', 2.5]
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'WzFd', 'eyJhIjoxfQ'])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_composite_primary_key_order(tt_db):     #pylint: disable=unused-argument
+    assert get_primary_key('disponibilidad_profesores') == \
+        ['profesor_id', 'dia_id', 'bloque_id', 'leccion_id']
+
+
+def test_pages_cover_table_once(tt_db):     #pylint: disable=unused-argument
+    rows = []
+    cursor = None
+    while True:
+        page = get_table_page('disponibilidad_profesores', 30, cursor)
+        rows.extend(page.rows)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(rows) == 400
+    assert len(page.rows) == 400 % 30
+    assert rows == sorted(set(rows))
+
+
+def test_page_with_filter(tt_db):     #pylint: disable=unused-argument
+    page = get_table_page('prof_grupo_materias', 5, filters={'grupo_id': 2})
+    grupo_index = page.columns.index('grupo_id')
+    assert page.rows and all(row[grupo_index] == 2 for row in page.rows)
+
+
+def test_table_columns(tt_db):     #pylint: disable=unused-argument
+    data = get_table_columns('grupo_materias')
+    assert data['columns'] == ['id', 'grupo_id', 'materia_id', 'lecciones']
+    assert len(data['values']) == 4
+    assert data['values'][0][:3] == [1, 2, 3]
+    assert len(set(map(len, data['values']))) == 1
+
+
+def test_pool_reuses_connections_of_recent_files(tmp_path):
+    files = [str(tmp_path / f"{name}.db") for name in 'abc']
+    for db_file in files:
+        shutil.copyfile('data/tt.db', db_file)
+    pool = ConnectionPool(max_idle=2)
+    conn = pool.acquire(files[0])
+    conn.close()
+    assert pool.acquire(files[0]) is conn
+    conn.close()
+    for db_file in files[1:]:
+        pool.acquire(db_file).close()
+    # the connection of the least recently used file was closed
+    new_conn = pool.acquire(files[0])
+    assert new_conn is not conn
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    new_conn.close()
+    pool.clear()
+
+
+def test_pool_reopens_replaced_file(tmp_path):
+    db_file = str(tmp_path / 'tt.db')
+    shutil.copyfile('data/tt.db', db_file)
+    pool = ConnectionPool(max_idle=2)
+    conn = pool.acquire(db_file)
+    conn.close()
+    (tmp_path / 'tt.db').unlink()
+    shutil.copyfile('data/tt.db', db_file)
+    assert pool.acquire(db_file) is not conn
+    pool.clear()
+
+
+def test_sized_cache_stays_within_budget():
+    cache = SizedLRUCache(max_bytes=2000)
+    for i in range(100):
+        cache.get(i, lambda i=i: list(range(i, i + 20)))
+    assert cache.size <= 2000
+    assert cache.get(99, lambda: None) == list(range(99, 119))
+    assert cache.get(0, lambda: 'computed') == 'computed'
+
+
+def test_dropdown_options_cached_until_change(tt_db):
+    options = get_dropdown_options('grupos', 'id', 'nombre')
+    assert get_dropdown_options('grupos', 'id', 'nombre') is options
+    conn = sqlite3.connect(tt_db)
+    with conn:
+        conn.execute("INSERT INTO grupos (id, nombre) VALUES (100, 'nuevo')")
+    conn.close()
+    assert len(get_dropdown_options('grupos', 'id', 'nombre')) == len(options) + 1
@@ -0,0 +1,80 @@
+"""Test the SQLite script runner"""
+
+import io
+import sqlite3
+import sys
+
+import pytest
+
+from scripts.exe_sqlite import iter_statements, main, run_script
+
+SCRIPT = """
+CREATE TABLE t (id INTEGER PRIMARY KEY, txt TEXT);
+CREATE TABLE log (msg TEXT);
+CREATE TRIGGER t_ins AFTER INSERT ON t BEGIN
+    INSERT INTO log VALUES ('a; b');
+END;
+INSERT INTO t VALUES (1, 'x;
+y');
+"""
+
+
+def test_iter_statements():
+    statements = list(iter_statements(SCRIPT.splitlines(keepends=True)))
+    assert len(statements) == 4
+    assert statements[2].endswith('END;')
+
+
+def test_statements_sharing_a_line(tmp_path):
+    script = "CREATE TABLE t(a); INSERT INTO t VALUES (';'); -- done\nINSERT INTO t VALUES (2);"
+    assert list(iter_statements(script.splitlines(keepends=True))) == [
+        "CREATE TABLE t(a);", "INSERT INTO t VALUES (';'); -- done", "INSERT INTO t VALUES (2);"
+    ]
+    db_file = tmp_path / 'db.sqlite'
+    assert run_script(db_file, lines=script.splitlines(keepends=True))
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 2
+
+
+def test_run_script_in_one_transaction(tmp_path):
+    db_file = tmp_path / 'db.sqlite'
+    assert run_script(db_file, lines=SCRIPT.splitlines(keepends=True))
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT txt FROM t").fetchall() == [('x;\ny',)]
+        assert conn.execute("SELECT msg FROM log").fetchall() == [('a; b',)]
+
+
+def test_error_rolls_back_transaction(tmp_path):
+    db_file = tmp_path / 'db.sqlite'
+    script = SCRIPT + "INSERT INTO t VALUES (1, 'duplicate');\n"
+    assert not run_script(db_file, lines=script.splitlines(keepends=True))
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == []
+
+
+def test_per_statement_keeps_going(tmp_path):
+    db_file = tmp_path / 'db.sqlite'
+    script = SCRIPT + "INSERT INTO t VALUES (1, 'duplicate');\nINSERT INTO t VALUES (2, 'z');\n"
+    assert not run_script(db_file, per_statement=True, lines=script.splitlines(keepends=True))
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT count(*) FROM t").fetchone()[0] == 2
+
+
+def test_script_transactions(tmp_path):
+    """The transactions of the script follow the statements batched before them"""
+    db_file = tmp_path / 'db.sqlite'
+    script = "CREATE TABLE t(a);\nBEGIN;\nINSERT INTO t VALUES (1);\nCOMMIT;\nVACUUM;\n"
+    assert run_script(db_file, lines=script.splitlines(keepends=True))
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("SELECT a FROM t").fetchall() == [(1,)]
+
+
+def test_main_reports_failure(tmp_path, monkeypatch, capsys):
+    db_file = tmp_path / 'db.sqlite'
+    sqlite3.connect(db_file).close()
+    monkeypatch.setattr(sys, 'argv', ['exe_sqlite.py', str(db_file)])
+    monkeypatch.setattr(sys, 'stdin', io.StringIO("CREATE TABLE t(a);\nINSERT INTO u VALUES (1);\n"))
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+    assert 'Done creating' not in capsys.readouterr().out
@@ -0,0 +1,73 @@
+"""Test the pre-solve feasibility checker"""
+
+import sqlite3
+
+import pytest
+
+from scripts.data.generate_school import generate_school, write_sqlite
+from src.feasibility import check_feasibility
+
+
+@pytest.fixture
+def school_db(tmp_path):
+    """A feasible synthetic school, with full time teachers"""
+    db_file = str(tmp_path / 'school.db')
+    write_sqlite(generate_school(6, 30, part_time=0), db_file)
+    conn = sqlite3.connect(db_file)
+    yield conn
+    conn.close()
+
+
+def checks(conn):
+    return {(violation.check, violation.name) for violation in check_feasibility(conn)}
+
+
+def test_feasible_school(school_db):
+    assert not checks(school_db)
+
+
+def test_group_over_lecc_por_sem(school_db):
+    school_db.execute("UPDATE grupo_materias SET lecciones = lecciones + 1 WHERE id = 1")
+    assert ('group lessons over lecc_por_sem', 'g0001') in checks(school_db)
+
+
+def test_subject_without_teacher(school_db):
+    school_db.execute("DELETE FROM prof_grupo_materias WHERE grupo_id = 2 AND materia_id = 1")
+    assert ('subject without teacher', 'g0002 edfís') in checks(school_db)
+
+
+def test_teacher_over_available_slots(school_db):
+    profesor_id, = school_db.execute(
+        "SELECT profesor_id FROM prof_grupo_materias WHERE grupo_id = 1 AND materia_id = 3"
+    ).fetchone()
+    school_db.execute("DELETE FROM disponibilidad_profesores WHERE profesor_id = ? AND dia_id > 1",
+                      (profesor_id,))
+    assert ('teacher lessons over available slots', f"p{profesor_id:05d}") in checks(school_db)
+
+
+def test_group_over_daily_matching_bound(school_db):
+    # the teachers of g0001 are only available on the first day
+    school_db.execute("""
+        DELETE FROM disponibilidad_profesores WHERE dia_id > 1 AND profesor_id IN
+            (SELECT profesor_id FROM prof_grupo_materias WHERE grupo_id = 1)""")
+    assert ('group lessons over daily matching bound', 'g0001') in checks(school_db)
+
+
+def test_rows_of_deleted_teacher(school_db):
+    """Rows left referencing a deleted teacher, as foreign keys are not enforced, are ignored"""
+    last_id, = school_db.execute("SELECT max(id) FROM profesores").fetchone()
+    school_db.execute("DELETE FROM profesores WHERE id IN (1, ?)", (last_id,))
+    found = checks(school_db)
+    assert not {name for _, name in found} & {'p00001', f"p{last_id:05d}"}
+    # their subjects are left without teacher
+    assert any(check == 'subject without teacher' for check, _ in found)
+
+
+def test_empty_db(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'empty.db')
+    try:
+        with open('scripts/DDL/tt.sql', encoding='utf-8') as f:
+            conn.executescript(f.read())
+        assert check_feasibility(conn) == []
+    finally:
+        conn.close()
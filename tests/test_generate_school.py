@@ -0,0 +1,34 @@
+"""Test the synthetic school generator"""
+
+import sqlite3
+
+from scripts.data.generate_school import generate_school, to_prolog, write_sqlite
+from scripts.data.prolog_facts_to_sqlite import extract_facts
+
+
+def test_same_seed_same_school():
+    assert generate_school(5, 10, seed=3) == generate_school(5, 10, seed=3)
+    assert generate_school(5, 10, seed=3) != generate_school(5, 10, seed=4)
+
+
+def test_school_is_consistent(tmp_path):
+    school = generate_school(20, 30, seed=1)
+    db_file = tmp_path / 'school.db'
+    write_sqlite(school, db_file)
+    with sqlite3.connect(db_file) as conn:
+        assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+        weekly = conn.execute(
+            "SELECT DISTINCT sum(lecciones) FROM grupo_materias GROUP BY grupo_id"
+        ).fetchall()
+        assert weekly == [(40,)]
+        assert conn.execute("SELECT count(*) FROM prof_grupo_materias").fetchone()[0] == \
+            len(school['grupo_materias'])
+
+
+def test_prolog_facts(tmp_path):
+    school = generate_school(4, 6, seed=2)
+    prolog_file = tmp_path / 'school.pl'
+    prolog_file.write_text(to_prolog(school), encoding='utf-8')
+    facts = extract_facts(prolog_file)
+    assert facts['grupos'] == school['grupos']
+    assert len(facts['grupo_materias']) == len(school['grupo_materias'])
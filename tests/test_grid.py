@@ -0,0 +1,65 @@
+"""Test the timetable grids"""
+
+import pytest
+
+from src.db import get_db_connection
+from src.grid import get_grid, get_grid_options, get_slots, slot_column
+
+
+@pytest.fixture
+def schedule(tt_db):     #pylint: disable=unused-argument
+    """A few lessons of audry (4) and mjose (10), in the first slots of monday"""
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.executemany("INSERT INTO horario VALUES (?, ?, ?, ?, ?, ?)", [
+                (1, 1, 1, 1, 3, 4),     # inter, inglés, audry
+                (2, 1, 1, 1, 3, 4),     # trans, inglés, audry, in the same slot
+                (1, 1, 1, 2, 3, 10),    # inter, inglés, mjose
+            ])
+            # mjose not available in the slot of the lesson
+            conn.execute("DELETE FROM disponibilidad_profesores"
+                         " WHERE profesor_id = 10 AND dia_id = 1 AND bloque_id = 1")
+    finally:
+        conn.close()
+
+
+def test_group_grid(schedule):     #pylint: disable=unused-argument
+    grid = get_grid('grupo', 1)
+    assert [row['dia'] for row in grid] == ['lun', 'mar', 'mie', 'jue', 'vie']
+    assert len(get_slots()) == 8
+    monday = grid[0]
+    assert monday['b1l1'] == 'inglés - audry'
+    assert monday['b1l2'] == 'inglés - mjose'
+    assert monday['b2l1'] is None
+    # audry is double booked, mjose unavailable
+    assert (monday['b1l1_conflict'], monday['b1l2_conflict'], monday['b2l1_conflict']) == (1, 1, 0)
+    assert all(row[slot_column(b, l)] is None for row in grid[1:] for b, _, l, _ in get_slots())
+
+
+def test_teacher_grid(schedule):     #pylint: disable=unused-argument
+    monday = get_grid('profesor', 4)[0]
+    assert sorted(monday['b1l1'].split(' / ')) == ['inter - inglés', 'trans - inglés']
+    assert monday['b1l1_conflict'] == 1
+    mjose = get_grid('profesor', 10)[0]
+    assert mjose['b1l2'] == 'inter - inglés'
+    assert (mjose['b1l2_conflict'], mjose['b1l2_available']) == (1, 0)
+    assert mjose['b2l1_available'] == 1
+
+
+def test_grid_cached_by_data_version(schedule):     #pylint: disable=unused-argument
+    grid = get_grid('grupo', 1)
+    assert get_grid('grupo', 1) is grid
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM horario WHERE grupo_id = 1 AND leccion_id = 2")
+    finally:
+        conn.close()
+    assert get_grid('grupo', 1)[0]['b1l2'] is None
+
+
+def test_grid_options(tt_db):     #pylint: disable=unused-argument
+    options = get_grid_options('profesor')
+    assert len(options) == 12
+    assert {'label': 'audry', 'value': 4} in options
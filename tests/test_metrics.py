@@ -0,0 +1,57 @@
+"""Test the query and callback instrumentation"""
+
+import logging
+
+from flask import Flask
+
+from config.params import params
+from src import metrics
+from src.db import get_dropdown_options, get_table_rows
+
+
+def test_histogram_render():
+    histogram = metrics.Histogram('h', 'help', ('label',), (1, 10))
+    histogram.observe(0.5, 'a')
+    histogram.observe(5, 'a')
+    histogram.observe(50, 'a')
+    lines = histogram.render()
+    assert 'h_bucket{label="a",le="1"} 1' in lines
+    assert 'h_bucket{label="a",le="10"} 2' in lines
+    assert 'h_bucket{label="a",le="+Inf"} 3' in lines
+    assert 'h_sum{label="a"} 55.5' in lines
+    assert 'h_count{label="a"} 3' in lines
+
+
+def get_count(histogram, *labels):
+    counts, _ = histogram._series.get(labels, ([0], 0))    #pylint: disable=protected-access
+    return sum(counts)
+
+
+def test_queries_recorded(tt_db):     #pylint: disable=unused-argument
+    before = get_count(metrics.QUERY_ROWS, 'SELECT', 'profesores')
+    get_dropdown_options('profesores', 'id', 'nombre')
+    get_table_rows('profesores')
+    assert get_count(metrics.QUERY_ROWS, 'SELECT', 'profesores') == before + 2
+
+
+def test_slow_query_logged(tt_db, monkeypatch, caplog):     #pylint: disable=unused-argument
+    monkeypatch.setitem(params, 'SLOW_QUERY_SECONDS', 0)
+    with caplog.at_level(logging.WARNING, logger=metrics.__name__):
+        get_table_rows('dias')
+    assert 'Slow query' in caplog.text and '5 rows' in caplog.text
+
+
+def test_timed_callback():
+    @metrics.timed_callback
+    def sample_callback(value):
+        return value * 2
+    assert sample_callback(21) == 42
+    assert get_count(metrics.CALLBACK_SECONDS, 'sample_callback') == 1
+
+
+def test_metrics_endpoint():
+    server = Flask(__name__)
+    server.register_blueprint(metrics.metrics_bp)
+    response = server.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert '# TYPE tt_db_query_seconds histogram' in response.get_data(as_text=True)
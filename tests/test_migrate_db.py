@@ -0,0 +1,114 @@
+"""Test the migration of a live DB to a changed spec"""
+
+import copy
+import shutil
+import sqlite3
+
+import pytest
+
+from scripts.DDL.migrate_db import apply_migration, db_foreign_keys, plan_migration
+from src.reports import ensure_reports, get_report
+from src.utils.yaml_loader import load_yaml_file
+
+
+@pytest.fixture
+def spec():
+    """A copy of the tt spec that tests can change"""
+    return copy.deepcopy(load_yaml_file('specs/tt.yaml')['DatabaseSpec'])
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """Connection to a scratch copy of the timetable database"""
+    db_file = tmp_path / 'tt.db'
+    shutil.copyfile('data/tt.db', db_file)
+    connection = sqlite3.connect(db_file)
+    yield connection
+    connection.close()
+
+
+def get_table(spec, name):
+    return next(table for table in spec['tables'] if table['name'] == name)
+
+
+def test_unchanged_spec_needs_no_migration(conn, spec):
+    assert plan_migration(conn, spec) == []
+
+
+def test_new_database(spec):
+    conn = sqlite3.connect(':memory:')
+    apply_migration(conn, plan_migration(conn, spec))
+    assert plan_migration(conn, spec) == []
+
+
+def test_appended_column_is_altered(conn, spec):
+    get_table(spec, 'profesores')['columns'].append(
+        {'name': 'email', 'type': 'string'}
+    )
+    statements = plan_migration(conn, spec)
+    assert statements == ["ALTER TABLE profesores ADD COLUMN email TEXT;"]
+    apply_migration(conn, statements)
+    assert plan_migration(conn, spec) == []
+
+
+def test_rebuild_keeps_data(conn, spec):
+    materias = get_table(spec, 'materias')
+    materias['columns'].insert(1, {'name': 'codigo', 'type': 'string'})
+    materias['constraints'] = [c for c in materias['constraints'] if c['type'] != 'UNIQUE']
+    before = conn.execute("SELECT id, nombre FROM materias ORDER BY id").fetchall()
+
+    statements = plan_migration(conn, spec)
+    assert any(statement.startswith("INSERT INTO materias__migration") for statement in statements)
+    apply_migration(conn, statements)
+
+    assert conn.execute("SELECT id, nombre FROM materias ORDER BY id").fetchall() == before
+    assert plan_migration(conn, spec) == []
+    assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+
+
+def test_foreign_key_violation_rolls_back(conn, spec):
+    get_table(spec, 'constantes')['constraints'].append({
+        'type': 'FOREIGN KEY',
+        'columns': ['value'],
+        'references': {'table': 'grupos', 'columns': ['id']},
+    })
+    statements = plan_migration(conn, spec)
+    with pytest.raises(sqlite3.IntegrityError):
+        apply_migration(conn, statements)
+    assert db_foreign_keys(conn, 'constantes') == set()
+    assert conn.execute("SELECT count(*) FROM constantes").fetchone()[0] == 2
+
+
+def test_table_options_rebuild(conn, spec):
+    dias = get_table(spec, 'dias')
+    dias.update(strict=True, without_rowid=True)
+    statements = plan_migration(conn, spec)
+    assert any(statement.startswith("CREATE TABLE dias__migration (")
+               and statement.endswith(") STRICT, WITHOUT ROWID;") for statement in statements)
+    apply_migration(conn, statements)
+    assert plan_migration(conn, spec) == []
+    assert conn.execute("SELECT strict, wr FROM pragma_table_list WHERE name = 'dias'"
+                        ).fetchone() == (1, 1)
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("INSERT INTO dias VALUES ('x', 'dom')")
+
+
+def test_rebuild_with_reports_installed(conn, spec, tt_db):
+    """The report triggers of the other tables are recreated around the rebuild"""
+    conn.close()
+    conn = sqlite3.connect(tt_db)
+    try:
+        ensure_reports()
+        grupos = get_table(spec, 'grupos')
+        grupos['columns'].insert(1, {'name': 'codigo', 'type': 'string'})
+        statements = plan_migration(conn, spec, allow_drop=True)
+        assert not any('rep_carga_grupos' in statement and statement.startswith('DROP TABLE')
+                       for statement in statements)
+        apply_migration(conn, statements)
+        assert plan_migration(conn, spec) == []
+        with conn:
+            conn.execute("INSERT INTO grupos (id, codigo, nombre) VALUES (100, 'n', 'nuevo')")
+        assert {'grupo': 'nuevo', 'lecciones': 0, 'lecc_por_sem': 40, 'diferencia': -40} \
+            in get_report('carga_grupos')
+    finally:
+        conn.close()
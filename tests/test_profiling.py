@@ -0,0 +1,91 @@
+"""Test the profiling of callback requests"""
+
+import pstats
+import threading
+
+from flask import Flask, request
+import pytest
+
+from config.params import params
+from src import profiling
+
+
+EVENTS = {'started': threading.Event(), 'release': threading.Event()}
+
+
+@pytest.fixture
+def client():
+    """Test client of a server with a fake callback route"""
+    server = Flask(__name__)
+    server.register_blueprint(profiling.profiling_bp)
+
+    @server.route('/_dash-update-component', methods=['POST'])
+    def update_component():
+        if (request.get_json(silent=True) or {}).get('wait'):
+            # overlapped by the requests of the test until released
+            EVENTS['started'].set()
+            EVENTS['release'].wait(5)
+        return {'response': sum(i * i for i in range(20000))}
+
+    return server.test_client()
+
+
+def set_profiling(monkeypatch, tmp_path, **settings):
+    monkeypatch.setitem(params, 'PROFILING', {
+        'enabled': True, 'sample_rate': 0, 'dir': str(tmp_path), 'keep': 2, **settings
+    })
+
+
+def post_callback(client, output='out.children'):
+    return client.post('/_dash-update-component', json={'output': output},
+                       headers={'X-Profile': '1'})
+
+
+def test_disabled_by_default(client, tmp_path):
+    assert not params['PROFILING']['enabled']
+    post_callback(client)
+    assert not list(tmp_path.iterdir())
+
+
+def test_cprofile_files_and_retention(client, tmp_path, monkeypatch):
+    set_profiling(monkeypatch, tmp_path, mode='cprofile')
+    for _ in range(3):
+        post_callback(client)
+    profiles = sorted(tmp_path.glob('*.pstats'))
+    assert len(profiles) == 2
+    assert pstats.Stats(str(profiles[0])).total_calls > 0
+    # requests without the header are not sampled at a rate of 0
+    client.post('/_dash-update-component', json={'output': 'out.children'})
+    assert len(list(tmp_path.glob('*.pstats'))) == 2
+
+
+def test_sampling_collapsed_stacks(client, tmp_path, monkeypatch):
+    set_profiling(monkeypatch, tmp_path, mode='sampling', interval=0.0001)
+    post_callback(client, 'sampled.children')
+    profile = next(tmp_path.glob('*.collapsed'))
+    for line in profile.read_text(encoding='utf-8').splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert ';' in stack and int(count) > 0
+    assert 'sampled.children' in client.get('/profiling').get_data(as_text=True)
+
+
+def test_overlapped_requests(client, tmp_path, monkeypatch):
+    """A request arriving while another one is profiled by cProfile is sampled"""
+    set_profiling(monkeypatch, tmp_path, mode='cprofile')
+    for event in EVENTS.values():
+        event.clear()
+    first = threading.Thread(target=lambda: client.post(
+        '/_dash-update-component', json={'output': 'first.children', 'wait': True},
+        headers={'X-Profile': '1'}))
+    first.start()
+    try:
+        assert EVENTS['started'].wait(5)
+        assert post_callback(client, 'second.children').status_code == 200
+    finally:
+        EVENTS['release'].set()
+        first.join()
+    assert len(list(tmp_path.glob('*.pstats'))) == 1
+    assert len(list(tmp_path.glob('*.collapsed'))) == 1
+    # cProfile is available again
+    post_callback(client)
+    assert len(list(tmp_path.glob('*.pstats'))) == 2
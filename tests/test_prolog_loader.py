@@ -0,0 +1,159 @@
+"""Test the spec driven loading of Prolog facts"""
+
+import sqlite3
+
+import pytest
+
+from scripts.data.generate_school import generate_school, to_prolog
+from scripts.data.prolog_facts_to_sqlite import (
+    create_and_load_database, extract_facts, load_prolog_files, parse_prolog, predicate_rows
+)
+
+SQL_FILE = 'scripts/DDL/tt.sql'
+
+
+def test_parse_facts_and_rules():
+    clauses = parse_prolog("""
+        :- module(m, [p/2]).
+        p(1, 'a.b'). % comment
+        p(2, edfís).
+        q(X, Y) :- p(X, _), member(Y, [c, d]).
+        r(X) :- p(X, _), X #> 1.
+    """)
+    assert clauses.facts[('p', 2)] == [(1, 'a.b'), (2, 'edfís')]
+    assert predicate_rows(clauses, 'q', 2) == [(1, 'c'), (1, 'd'), (2, 'c'), (2, 'd')]
+    # constraint goals are not expanded
+    assert predicate_rows(clauses, 'r', 1) == []
+
+
+def test_timetable_base():
+    """The base timetable rows include the ones of data/tt.db"""
+    facts = extract_facts('specs/timetable_base.pl')
+    conn = sqlite3.connect('data/tt.db')
+    try:
+        for table in ('grupos', 'materias', 'profesores', 'dias', 'lecciones', 'constantes',
+                      'disponibilidad_profesores'):
+            columns = {'constantes': 'name, value'}.get(table, '*')
+            stored = conn.execute(f"SELECT {columns} FROM {table}").fetchall()
+            assert {tuple(map(str, row)) for row in facts[table]} == \
+                {tuple(map(str, row)) for row in stored}, table
+        # the groups with numeric names are resolved too
+        stored = set(conn.execute("SELECT * FROM grupo_materias").fetchall())
+        assert stored < set(facts['grupo_materias'])
+    finally:
+        conn.close()
+    # generated by rules
+    assert len(facts['disponibilidad_profesores']) == 400
+
+
+def write_schools(tmp_path, count):
+    files = []
+    for seed in range(count):
+        prolog_file = tmp_path / f"school{seed}.pl"
+        prolog_file.write_text(to_prolog(generate_school(2, 4, seed=seed)), encoding='utf-8')
+        files.append(str(prolog_file))
+    return files
+
+
+def test_load_per_file(tmp_path):
+    files = write_schools(tmp_path, 2)
+    db_files = load_prolog_files(files, SQL_FILE, tmp_path / 'dbs', per_file=True, workers=2)
+    assert [db_file.rsplit('/', 1)[-1] for db_file in db_files] == ['school0.db', 'school1.db']
+    for prolog_file, db_file in zip(files, db_files):
+        conn = sqlite3.connect(db_file)
+        try:
+            count = conn.execute("SELECT count(*) FROM grupo_materias").fetchone()[0]
+        finally:
+            conn.close()
+        assert count == len(extract_facts(prolog_file)['grupo_materias'])
+
+
+def test_load_merged(tmp_path):
+    """Repeated facts are loaded once"""
+    files = write_schools(tmp_path, 1) * 2
+    db_file = str(tmp_path / 'merged.db')
+    load_prolog_files(files, SQL_FILE, db_file, workers=2)
+    conn = sqlite3.connect(db_file)
+    try:
+        count = conn.execute("SELECT count(*) FROM grupo_materias").fetchone()[0]
+    finally:
+        conn.close()
+    assert count == len(extract_facts(files[0])['grupo_materias'])
+
+
+def test_merge_distinct_schools(tmp_path):
+    """Distinct schools give other rows to the same ids, so they are not merged"""
+    db_file = str(tmp_path / 'merged.db')
+    with pytest.raises(ValueError, match=r"share the key \(id\); only partial files"):
+        load_prolog_files(write_schools(tmp_path, 2), SQL_FILE, db_file, workers=2)
+    assert not (tmp_path / 'merged.db').exists()
+
+
+def test_incremental_update(tmp_path, capsys):
+    """Only the tables whose facts changed are written again"""
+    prolog_file = tmp_path / 'base.pl'
+    prolog_file.write_text(open('specs/timetable_base.pl', encoding='utf-8').read()
+                           .replace('grupo_materia_lecciones(2, inter, infor, 1).',
+                                    'grupo_materia_lecciones(2, inter, infor, 2).')
+                           .replace('prof(12, sol).', 'prof(12, sol).\nprof(13, nuevo).'),
+                           encoding='utf-8')
+    db_file = str(tmp_path / 'tt.db')
+    create_and_load_database('specs/timetable_base.pl', SQL_FILE, db_file)
+    assert create_and_load_database('specs/timetable_base.pl', SQL_FILE, db_file,
+                                    incremental=True) == db_file
+    assert 'changed tables: none' in capsys.readouterr().out
+    conn = sqlite3.connect(db_file)
+    try:
+        # kept, as the grupos facts did not change
+        with conn:
+            conn.execute("UPDATE grupos SET nombre = 'intermedio' WHERE id = 1")
+        create_and_load_database(prolog_file, SQL_FILE, db_file, incremental=True)
+        assert 'changed tables: profesores, grupo_materias\n' in capsys.readouterr().out
+        assert conn.execute("SELECT nombre FROM profesores WHERE id = 13").fetchone() == ('nuevo',)
+        assert conn.execute("SELECT lecciones FROM grupo_materias WHERE id = 2").fetchone() == (2,)
+        assert conn.execute("SELECT nombre FROM grupos WHERE id = 1").fetchone() == ('intermedio',)
+        # rows gone are deleted, and the search index follows
+        create_and_load_database('specs/timetable_base.pl', SQL_FILE, db_file, incremental=True)
+        assert conn.execute("SELECT count(*) FROM profesores").fetchone() == (12,)
+        assert conn.execute("SELECT count(*) FROM search_index WHERE search_index MATCH 'nuevo'"
+                            ).fetchone() == (0,)
+    finally:
+        conn.close()
+
+
+def test_update_blocked_by_other_tables(tmp_path):
+    """A row of a table not loaded from the facts keeps its parent, naming the table"""
+    db_file = str(tmp_path / 'tt.db')
+    create_and_load_database('specs/timetable_base.pl', SQL_FILE, db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        with conn:
+            conn.execute("INSERT INTO horario VALUES (1, 1, 1, 2, 1, 1)")
+        prolog_file = tmp_path / 'base.pl'
+        prolog_file.write_text(open('specs/timetable_base.pl', encoding='utf-8').read()
+                               .replace('leccion(2, b).\n', ''), encoding='utf-8')
+        with pytest.raises(ValueError, match='1 horario rows reference deleted lecciones rows'):
+            create_and_load_database(prolog_file, SQL_FILE, db_file, incremental=True)
+        # nothing written
+        assert conn.execute("SELECT count(*) FROM lecciones WHERE id = 2").fetchone() == (1,)
+    finally:
+        conn.close()
+
+
+def test_renumbered_row_keeps_unique_name(tmp_path):
+    """A row moved to another key, keeping its unique name, replaces the old row"""
+    db_file = str(tmp_path / 'tt.db')
+    create_and_load_database('specs/timetable_base.pl', SQL_FILE, db_file)
+    prolog_file = tmp_path / 'base.pl'
+    prolog_file.write_text(open('specs/timetable_base.pl', encoding='utf-8').read()
+                           .replace('grupo(8, 6).', 'grupo(9, 6).'), encoding='utf-8')
+    create_and_load_database(prolog_file, SQL_FILE, db_file, incremental=True)
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("SELECT id FROM grupos WHERE nombre = '6'").fetchall() == [(9,)]
+        assert conn.execute("SELECT count(*) FROM grupo_materias WHERE grupo_id = 8"
+                            ).fetchone() == (0,)
+        assert conn.execute("SELECT count(*) FROM grupo_materias WHERE grupo_id = 9"
+                            ).fetchone()[0] > 0
+    finally:
+        conn.close()
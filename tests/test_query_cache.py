@@ -0,0 +1,106 @@
+"""Test the query result cache shared by the worker processes"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import shutil
+import sqlite3
+
+import pytest
+
+from src import metrics
+from src.db import (
+    close_connections, get_dropdown_options, get_table_columns,
+    get_table_data_with_fk_descriptions
+)
+from src.query_cache import SharedQueryCache, file_version, get_query_cache
+
+
+@pytest.fixture
+def query_cache():
+    """The shared query cache, in a file of the test"""
+    return get_query_cache()
+
+
+def test_lru_eviction(tmp_path):
+    cache = SharedQueryCache(str(tmp_path / 'cache.db'), max_bytes=4000, touch_seconds=0)
+    evicted = metrics.QUERY_CACHE_EVICTIONS.value()
+    for i in range(20):
+        cache.put(f"k{i}", list(range(i, i + 100)))
+        # used, so kept
+        assert cache.get('k0') == list(range(100))
+    entries, size = cache.stats()
+    assert size <= 4000
+    assert metrics.QUERY_CACHE_EVICTIONS.value() == evicted + 20 - entries
+    assert cache.get('k0') == list(range(100))
+    assert cache.get('k1', 'missing') == 'missing'
+    assert cache.get('k19') == list(range(19, 119))
+    cache.close()
+
+
+def test_file_version_changes_on_commit(tt_db):
+    version = file_version(tt_db)
+    conn = sqlite3.connect(tt_db)
+    try:
+        assert file_version(tt_db) == version
+        with conn:
+            conn.execute("INSERT INTO grupos (id, nombre) VALUES (100, 'nuevo')")
+        assert file_version(tt_db)[2] == version[2] + 1
+        conn.execute("PRAGMA journal_mode = WAL")
+        assert file_version(tt_db) is None
+    finally:
+        conn.close()
+
+
+def read_table_data(table):
+    return get_table_data_with_fk_descriptions(table)
+
+
+def test_shared_by_processes(tt_db, query_cache):     #pylint: disable=unused-argument
+    def count(result):
+        return metrics.QUERY_CACHE_REQUESTS.value('table_data', result)
+    hits, misses = count('hit'), count('miss')
+    # forked, so that the worker has the params and DB_FILE of the test
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork')) as executor:
+        rows = executor.submit(read_table_data, 'prof_grupo_materias').result()
+    assert get_table_data_with_fk_descriptions('prof_grupo_materias') == rows
+    assert (count('hit'), count('miss')) == (hits + 1, misses)
+
+    conn = sqlite3.connect(tt_db)
+    with conn:
+        conn.execute("DELETE FROM prof_grupo_materias WHERE profesor_id = 4")
+    conn.close()
+    assert len(get_table_data_with_fk_descriptions('prof_grupo_materias')) < len(rows)
+    assert count('miss') == misses + 1
+
+
+def test_dropdown_options_shared(tt_db, query_cache):     #pylint: disable=unused-argument
+    options = get_dropdown_options('profesores', 'id', 'nombre')
+    entries, _ = query_cache.stats()
+    assert entries == 1
+    assert {'label': 'audry', 'value': 4} in options
+
+
+def test_file_created_again(tt_db, tmp_path, query_cache):     #pylint: disable=unused-argument
+    """A file written again in place, with the same change counter, is another version"""
+    rows = get_table_data_with_fk_descriptions('prof_grupo_materias')
+    version = file_version(tt_db)
+    other_db = tmp_path / 'other.db'
+    shutil.copyfile(tt_db, other_db)
+    conn = sqlite3.connect(other_db)
+    with conn:
+        conn.execute("DELETE FROM prof_grupo_materias WHERE profesor_id = 4")
+    conn.close()
+    # as a new load starting from the same counter
+    with open(other_db, 'r+b') as f:
+        f.seek(24)
+        f.write(version[2].to_bytes(4, 'big'))
+    close_connections()
+    shutil.copyfile(other_db, tt_db)
+    assert file_version(tt_db)[::2] == version[::2]
+    assert len(get_table_data_with_fk_descriptions('prof_grupo_materias')) < len(rows)
+
+
+def test_table_columns_shared(tt_db, query_cache):     #pylint: disable=unused-argument
+    data = get_table_columns('grupo_materias')
+    assert query_cache.stats()[0] == 1
+    assert get_table_columns('grupo_materias') == data
@@ -0,0 +1,83 @@
+"""Test the materialized reports"""
+
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+
+from src.db import get_db_connection
+from src.reports import ensure_reports, get_report, refresh_reports
+
+SUMMARY_TABLES = ['rep_carga_grupos', 'rep_carga_profesores', 'rep_materias_sin_profesor']
+
+
+def summaries(conn):
+    return {table: [tuple(row) for row in conn.execute(f"SELECT * FROM {table} ORDER BY 1")]
+            for table in SUMMARY_TABLES}
+
+
+def test_writes_keep_summaries_up_to_date(tt_db):     #pylint: disable=unused-argument
+    ensure_reports()
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("INSERT INTO grupo_materias (id, grupo_id, materia_id, lecciones)"
+                         " VALUES (1000, 3, 1, 4)")
+            conn.execute("INSERT INTO prof_grupo_materias VALUES (1, 2, 1)")
+            conn.execute("UPDATE grupo_materias SET lecciones = lecciones + 2 WHERE grupo_id = 2")
+            conn.execute("DELETE FROM disponibilidad_profesores WHERE profesor_id = 2")
+            conn.execute("DELETE FROM prof_grupo_materias WHERE grupo_id = 1")
+        incremental = summaries(conn)
+        refresh_reports(conn)
+        assert summaries(conn) == incremental
+    finally:
+        conn.close()
+
+
+def test_reports_show_conflicts(tt_db):     #pylint: disable=unused-argument
+    ensure_reports()
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("INSERT INTO grupo_materias (id, grupo_id, materia_id, lecciones)"
+                         " VALUES (1000, 3, 1, 45)")
+            conn.execute("DELETE FROM disponibilidad_profesores WHERE profesor_id = 1")
+    finally:
+        conn.close()
+    # group id 3 is named '1'
+    grupos = {row['grupo']: row for row in get_report('carga_grupos')}
+    assert grupos['1']['diferencia'] == 45 - grupos['1']['lecc_por_sem']
+    profesores = get_report('carga_profesores')
+    assert profesores[0]['disponibles'] == 0 and profesores[0]['libres'] <= 0
+    sin_profesor = get_report('materias_sin_profesor')
+    assert [(row['grupo'], row['lecciones']) for row in sin_profesor] == [('1', 45)]
+
+
+def test_concurrent_ensure_reports(tt_db):
+    """Processes creating the triggers at once, while others write, keep the summaries right"""
+    def ensure():
+        conn = sqlite3.connect(tt_db, timeout=10)
+        try:
+            ensure_reports(conn)
+        finally:
+            conn.close()
+
+    def write(grupo_materias_id):
+        conn = sqlite3.connect(tt_db, timeout=10)
+        try:
+            with conn:
+                conn.execute("UPDATE grupo_materias SET lecciones = lecciones + 1 WHERE id = ?",
+                             (grupo_materias_id,))
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(8) as executor:
+        futures = [executor.submit(ensure) for _ in range(8)]
+        futures += [executor.submit(write, i) for i in range(1, 9)]
+        for future in futures:
+            future.result()
+    conn = get_db_connection()
+    try:
+        incremental = summaries(conn)
+        refresh_reports(conn)
+        assert summaries(conn) == incremental
+    finally:
+        conn.close()
@@ -0,0 +1,99 @@
+"""Test the full text search index"""
+
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+
+from scripts.DDL.yaml2sql import generate_search_ddl, generate_search_rebuild
+from src.db import get_db_connection
+from src.search import ensure_search_index, fts_query, search, spec_tables
+
+
+def index_contents(conn):
+    return sorted(tuple(row) for row in conn.execute(
+        "SELECT k.table_name, k.row_key, i.content"
+        " FROM search_index AS i JOIN search_keys AS k ON k.id = i.rowid"
+    ))
+
+
+def test_fts_query_quotes_prefixes():
+    assert fts_query("ing  AND-tr") == '"ing"* "AND"* "tr"*'
+    assert fts_query(" - ") is None
+
+
+def test_search_by_prefix_across_tables(tt_db):    #pylint: disable=unused-argument
+    results = search("ingl")
+    assert results[0] == {'table': 'materias', 'key': {'id': 3}, 'label': 'inglés'}
+    assert {result['table'] for result in results} == {
+        'materias', 'grupo_materias', 'prof_grupo_materias'
+    }
+    # all the words must match, accents are ignored
+    assert [result['key'] for result in search("tra ingles")] == [
+        {'id': 7}, {'profesor_id': 4, 'grupo_id': 2, 'materia_id': 3}
+    ]
+
+
+def test_writes_keep_index_up_to_date(tt_db):     #pylint: disable=unused-argument
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("INSERT INTO materias (id, nombre) VALUES (100, 'química')")
+            conn.execute("INSERT INTO grupo_materias (id, grupo_id, materia_id, lecciones)"
+                         " VALUES (100, 1, 100, 2)")
+            conn.execute("UPDATE grupos SET nombre = 'internacional' WHERE id = 1")
+            conn.execute("DELETE FROM prof_grupo_materias WHERE grupo_id = 2")
+        incremental = index_contents(conn)
+        with conn:
+            for statement in generate_search_rebuild(list(spec_tables().values())):
+                conn.execute(statement)
+        assert index_contents(conn) == incremental
+    finally:
+        conn.close()
+    assert [result['key'] for result in search("quim intern")] == [{'id': 100}]
+    assert search("audry") == [{'table': 'profesores', 'key': {'id': 4}, 'label': 'audry'}]
+
+
+def test_missing_index_is_created(tt_db):
+    conn = sqlite3.connect(tt_db)
+    with conn:
+        conn.execute("DROP TABLE search_index")
+        conn.execute("DROP TABLE search_keys")
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'"
+                                    " AND name LIKE 'search_%'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+    conn.close()
+    ensure_search_index()
+    assert search("audry")[0]['key'] == {'id': 4}
+
+
+def test_search_ddl_only_with_searchable_columns():
+    assert generate_search_ddl([{'name': 't', 'columns': [{'name': 'c', 'type': 'string'}]}]) == []
+
+
+def test_concurrent_ensure_search_index(tt_db):
+    """Processes creating the missing index at once create it once, all of them succeeding"""
+    conn = sqlite3.connect(tt_db)
+    with conn:
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'"
+                                    " AND name LIKE 'search_%'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+    conn.close()
+
+    def ensure():
+        conn = sqlite3.connect(tt_db, timeout=10)
+        try:
+            ensure_search_index(conn)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(8) as executor:
+        for future in [executor.submit(ensure) for _ in range(8)]:
+            future.result()
+    conn = sqlite3.connect(tt_db)
+    try:
+        indexed = index_contents(conn)
+        with conn:
+            for statement in generate_search_rebuild(list(spec_tables().values())):
+                conn.execute(statement)
+        assert index_contents(conn) == indexed
+    finally:
+        conn.close()
@@ -0,0 +1,48 @@
+"""Test the columnar snapshots of the timetable DB"""
+
+from pathlib import Path
+import sqlite3
+
+import pytest
+
+from scripts.data.snapshot import export_snapshot, load_snapshot, read_snapshot_table
+
+pytest.importorskip('pyarrow')
+
+SPEC_FILE = Path('specs/tt.yaml')
+
+
+def table_rows(db_file, table):
+    conn = sqlite3.connect(db_file)
+    try:
+        return sorted(conn.execute(f"SELECT * FROM {table}").fetchall())
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('fmt', ['arrow', 'parquet'])
+def test_snapshot_round_trip(tmp_path, fmt):
+    counts = export_snapshot(SPEC_FILE, Path('data/tt.db'), tmp_path / 'snapshot', fmt)
+    assert counts['disponibilidad_profesores'] == 400
+
+    assert load_snapshot(SPEC_FILE, tmp_path / 'snapshot', tmp_path / 'tt.db') == counts
+    for table in counts:
+        assert table_rows(tmp_path / 'tt.db', table) == table_rows('data/tt.db', table)
+
+
+def test_snapshot_types_from_spec(tmp_path):
+    export_snapshot(SPEC_FILE, Path('data/tt.db'), tmp_path)
+    schema = read_snapshot_table(tmp_path / 'grupo_materias.arrow').schema
+    assert [str(field.type) for field in schema] == ['int64'] * 4
+    assert not schema.field('grupo_id').nullable
+
+
+def test_incomplete_snapshot_keeps_db(tmp_path):
+    export_snapshot(SPEC_FILE, Path('data/tt.db'), tmp_path / 'snapshot')
+    (tmp_path / 'snapshot' / 'horario.arrow').unlink()
+    db_file = tmp_path / 'tt.db'
+    db_file.write_bytes(Path('data/tt.db').read_bytes())
+    with pytest.raises(FileNotFoundError):
+        load_snapshot(SPEC_FILE, tmp_path / 'snapshot', db_file)
+    assert db_file.read_bytes() == Path('data/tt.db').read_bytes()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['snapshot', 'tt.db']
@@ -3,6 +3,8 @@
 
 from config.params import params
 from src.utils.spec_handling import (
+    get_spec_files_errors,
+    get_validator,
     get_yaml_file_as_dict,
     validate_schema,
     validate_spec_file,
@@ -15,3 +17,30 @@ def test_schema():
 
 def test_tt_spec():
     validate_spec_file(params.get('tt_spec'), params.get('db_spec_schema'))
+
+
+def test_validator_compiled_once():
+    schema_filename = params.get('db_spec_schema')
+    assert get_validator(schema_filename) is get_validator(schema_filename)
+
+
+def test_spec_files_errors(tmp_path):
+    bad_spec = tmp_path / 'bad.yaml'
+    bad_spec.write_text(
+        "---\nDatabaseSpec:\n  tables:\n    - name: t1\n"
+        "---\nDatabaseSpec:\n  tables:\n    - columns: []\n    - name: t3\n",
+        encoding='utf-8'
+    )
+    errors = get_spec_files_errors(
+        [params.get('tt_spec'), str(bad_spec)], params.get('db_spec_schema')
+    )
+    assert errors[params.get('tt_spec')] == []
+    assert len(errors[str(bad_spec)]) == 3
+
+
+def test_yaml_cache_refreshed_on_edit(tmp_path):
+    yaml_file = tmp_path / 'doc.yaml'
+    yaml_file.write_text("a: 1\n", encoding='utf-8')
+    assert get_yaml_file_as_dict(str(yaml_file)) == {'a': 1}
+    yaml_file.write_text("a: 22\n", encoding='utf-8')
+    assert get_yaml_file_as_dict(str(yaml_file)) == {'a': 22}
@@ -0,0 +1,44 @@
+"""Test the cold start: modules imported, as measured by python -X importtime"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# imported only on the code paths that need them
+LAZY_MODULES = ['pandas', 'openpyxl', 'jsonschema', 'numpy', 'pyarrow']
+
+
+def import_times(code):
+    """Cumulative import time in µs of each module imported by code, run in a fresh process"""
+    env = {**os.environ, 'PYTHONPATH': os.getcwd()}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, env=env, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line.split('|')
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize('module', ['src.timetable_db_app', 'src.db', 'scripts.DDL.yaml2sql'])
+def test_import_skips_lazy_modules(module):
+    times = import_times(f"import {module}")
+    assert module in times
+    assert not set(LAZY_MODULES) & set(times)
+
+
+def test_params_are_read_on_first_access():
+    times = import_times("import config.params")
+    assert 'config.params' in times and 'yaml' not in times
+    times = import_times("from config.params import params; params['DB_FILE']")
+    assert 'yaml' in times
+
+
+def test_app_is_created_on_first_use():
+    code = ("import src.timetable_db_app as m; assert 'app' not in vars(m);"
+            " assert m.server is m.app.server is m.create_app().server")
+    assert 'src.timetable_db_app' in import_times(code)
@@ -0,0 +1,82 @@
+"""Test the routing of requests to the database of each school"""
+
+import json
+import shutil
+import sqlite3
+
+from flask import Flask
+import pytest
+
+from config.params import params
+from src.api import api_bp
+from src.tenants import TenantPrefixMiddleware, tenants_bp
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client of a server with the API, serving two schools"""
+    monkeypatch.setitem(params, 'TENANTS',
+                        {'dir': str(tmp_path), 'prefix': '/schools', 'cookie': 'school'})
+    for school in ('norte', 'sur'):
+        shutil.copyfile('data/tt.db', tmp_path / f"{school}.db")
+    conn = sqlite3.connect(tmp_path / 'sur.db')
+    with conn:
+        conn.execute("INSERT INTO grupos (id, nombre) VALUES (100, 'sur')")
+    conn.close()
+
+    server = Flask(__name__)
+    server.wsgi_app = TenantPrefixMiddleware(server.wsgi_app)
+    server.register_blueprint(tenants_bp)
+    server.register_blueprint(api_bp)
+    return server.test_client()
+
+
+def group_names(response):
+    doc = response.get_json()
+    return {row[doc['columns'].index('nombre')] for row in doc['rows']}
+
+
+def test_prefix_selects_school(client):
+    assert 'sur' not in group_names(client.get('/schools/norte/api/grupos'))
+    assert 'sur' in group_names(client.get('/schools/sur/api/grupos'))
+
+
+def test_cookie_keeps_school(client):
+    client.get('/schools/sur/api/grupos')
+    assert client.get_cookie('school').value == 'sur'
+    # as the requests sent without prefix
+    assert 'sur' in group_names(client.get('/api/grupos'))
+
+
+@pytest.mark.parametrize('school', ['oeste', '..', 'a.b'])
+def test_unknown_school(client, school):
+    assert client.get(f'/schools/{school}/api/grupos').status_code == 404
+
+
+def dash_config(response):
+    html = response.get_data(as_text=True)
+    start = html.index('>', html.index('id="_dash-config"')) + 1
+    return json.loads(html[start:html.index('</script>', start)])
+
+
+def test_tabs_keep_their_school(client):
+    """Each tab sends its Dash callbacks under the prefix of its page, not to the last school"""
+    from src.timetable_db_app import create_app  #pylint: disable=import-outside-toplevel
+    dash_client = create_app().server.test_client()
+    assert dash_config(dash_client.get('/schools/norte/')
+                       )['requests_pathname_prefix'] == '/schools/norte/'
+    # a second tab opens the other school
+    assert dash_config(dash_client.get('/schools/sur/')
+                       )['requests_pathname_prefix'] == '/schools/sur/'
+    assert dash_client.get_cookie('school').value == 'sur'
+    # the first tab lists its groups
+    response = dash_client.post('/schools/norte/_dash-update-component', json={
+        'output': '..grid-entity.options...grid-entity.value..',
+        'outputs': [{'id': 'grid-entity', 'property': 'options'},
+                    {'id': 'grid-entity', 'property': 'value'}],
+        'inputs': [{'id': 'grid-view', 'property': 'value', 'value': 'grupo'}],
+        'changedPropIds': ['grid-view.value'],
+    })
+    assert response.status_code == 200
+    options = response.get_json()['response']['grid-entity']['options']
+    assert 'sur' not in {option['label'] for option in options}
@@ -0,0 +1,83 @@
+"""Test the single writer of the database"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import sqlite3
+import threading
+
+import pytest
+
+from config.params import params
+from src.writer import DBWriter, execute_write
+
+
+def count_grupos(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM grupos").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_failing_statement_rolled_back_alone(tt_db):
+    batch = [
+        ("INSERT INTO grupos (id, nombre) VALUES (100, 'a')", (), Future()),
+        ("INSERT INTO grupos (id, nombre) VALUES (100, 'b')", (), Future()),
+        ("UPDATE grupos SET nombre = 'c' WHERE id = ?", (100,), Future()),
+    ]
+    conn = sqlite3.connect(tt_db, isolation_level=None)
+    DBWriter._run_batch(conn, batch)     #pylint: disable=protected-access
+    conn.close()
+
+    assert batch[0][2].result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        batch[1][2].result()
+    assert batch[2][2].result() == 1
+    assert count_grupos(tt_db) == 9
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_concurrent_writes(tt_db, monkeypatch, enabled):
+    monkeypatch.setitem(params, 'WRITER', {'enabled': enabled})
+
+    def create(grupo_id):
+        return execute_write("INSERT INTO grupos (id, nombre) VALUES (?, ?)",
+                             (grupo_id, f"g{grupo_id}"))
+
+    with ThreadPoolExecutor(8) as executor:
+        assert list(executor.map(create, range(100, 150))) == [1] * 50
+    assert count_grupos(tt_db) == 58
+    with pytest.raises(sqlite3.IntegrityError):
+        create(100)
+
+
+def test_timed_out_write_not_run(tt_db, monkeypatch):
+    """A write given up by its caller raises a database error, and is not run later"""
+    monkeypatch.setitem(params, 'WRITER', {'timeout': 0.1})
+    release = threading.Event()
+    run_batch = DBWriter._run_batch     #pylint: disable=protected-access
+
+    def slow_run_batch(conn, batch):
+        release.wait(5)
+        run_batch(conn, batch)
+    monkeypatch.setattr(DBWriter, '_run_batch', staticmethod(slow_run_batch))
+    with pytest.raises(sqlite3.OperationalError, match='not run within'):
+        execute_write("INSERT INTO grupos (id, nombre) VALUES (100, 'tarde')")
+    release.set()
+    monkeypatch.setattr(DBWriter, '_run_batch', staticmethod(run_batch))
+    # run after the statement given up, in the same writer
+    assert execute_write("UPDATE grupos SET nombre = nombre WHERE id = 1") == 1
+    assert count_grupos(tt_db) == 8
+
+
+def test_failed_writer_replaced(tt_db, monkeypatch):
+    """A writer failing to open its database fails its statements, and the next one starts anew"""
+    connect = sqlite3.connect
+
+    def failing_connect(*args, **kwargs):
+        raise sqlite3.OperationalError('unable to open database file')
+    monkeypatch.setattr(sqlite3, 'connect', failing_connect)
+    with pytest.raises(sqlite3.OperationalError, match='unable to open'):
+        execute_write("INSERT INTO grupos (id, nombre) VALUES (100, 'a')")
+    monkeypatch.setattr(sqlite3, 'connect', connect)
+    assert execute_write("INSERT INTO grupos (id, nombre) VALUES (100, 'a')") == 1
+    assert count_grupos(tt_db) == 9
@@ -0,0 +1,39 @@
+"""Test the shared YAML loader"""
+
+from src.utils import yaml_loader
+from src.utils.yaml_loader import load_all_yaml, load_yaml, load_yaml_file
+
+
+def test_load_yaml():
+    assert load_yaml("a: [1, two]\n") == {'a': [1, 'two']}
+    assert load_all_yaml("---\na: 1\n---\nb: 2\n") == [{'a': 1}, {'b': 2}]
+
+
+def test_disk_cache(tmp_path, monkeypatch):
+    cache_dir = tmp_path / 'cache'
+    yaml_file = tmp_path / 'doc.yaml'
+    yaml_file.write_text("a: 1\n", encoding='utf-8')
+
+    assert load_yaml_file(str(yaml_file), cache_dir=str(cache_dir)) == {'a': 1}
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def no_parse(_stream):
+        raise AssertionError("parsed again")
+    with monkeypatch.context() as patch:
+        patch.setattr(yaml_loader, 'load_yaml', no_parse)
+        # served from the cache
+        assert load_yaml_file(str(yaml_file), cache_dir=str(cache_dir)) == {'a': 1}
+
+    # the entry of the previous content is removed
+    yaml_file.write_text("a: 2\n", encoding='utf-8')
+    assert load_yaml_file(str(yaml_file), cache_dir=str(cache_dir)) == {'a': 2}
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # kept by path and kind
+    other_file = tmp_path / 'other.yaml'
+    other_file.write_text("b: 1\n", encoding='utf-8')
+    assert load_yaml_file(str(other_file), cache_dir=str(cache_dir)) == {'b': 1}
+    yaml_file.write_text("---\na: 2\n---\nb: 3\n", encoding='utf-8')
+    assert load_yaml_file(str(yaml_file), all_docs=True, cache_dir=str(cache_dir)) == \
+        [{'a': 2}, {'b': 3}]
+    assert len(list(cache_dir.iterdir())) == 3